@@ -9,7 +9,7 @@ CREATE SCHEMA IF NOT EXISTS mart;
 CREATE TABLE IF NOT EXISTS core.competitor_links (
     asin_main VARCHAR(10) NOT NULL,
     asin_comp VARCHAR(10) NOT NULL,
-    created_at TIMESTAMP DEFAULT NOW(),
+    created_at TIMESTAMPTZ DEFAULT NOW(),
     PRIMARY KEY (asin_main, asin_comp)
 );
 
@@ -28,7 +28,7 @@ CREATE TABLE IF NOT EXISTS mart.competitor_comparison_daily (
     reviews_gap INTEGER,
     buybox_diff NUMERIC(10,2),
     extras JSONB,
-    created_at TIMESTAMP DEFAULT NOW(),
+    created_at TIMESTAMPTZ DEFAULT NOW(),
     PRIMARY KEY (asin_main, asin_comp, date)
 );
 
@@ -44,12 +44,21 @@ CREATE TABLE IF NOT EXISTS mart.competition_reports (
     summary JSONB NOT NULL,
     evidence JSONB,
     model VARCHAR(50),
-    generated_at TIMESTAMP DEFAULT NOW()
+    generated_at TIMESTAMPTZ DEFAULT NOW()
 );
 
 -- Index for performance
 CREATE INDEX IF NOT EXISTS idx_competition_reports_asin_version 
-ON mart.competition_reports(asin_main, version DESC);
+ON mart.competition_reports(asin_main, version DESC) INCLUDE (model, generated_at);
+
+-- Upgrade timestamp columns created by earlier versions of this script
+-- (existing values are interpreted as UTC)
+ALTER TABLE core.competitor_links
+    ALTER COLUMN created_at TYPE TIMESTAMPTZ USING created_at AT TIME ZONE 'UTC';
+ALTER TABLE mart.competitor_comparison_daily
+    ALTER COLUMN created_at TYPE TIMESTAMPTZ USING created_at AT TIME ZONE 'UTC';
+ALTER TABLE mart.competition_reports
+    ALTER COLUMN generated_at TYPE TIMESTAMPTZ USING generated_at AT TIME ZONE 'UTC';
 
 -- Success message
 DO $$
@@ -1,9 +1,10 @@
 """Competition API endpoints."""
 
 import logging
+import orjson
 from typing import Optional, List
-from datetime import datetime
-from fastapi import APIRouter, HTTPException, Query, Path
+from datetime import datetime, timedelta, timezone
+from fastapi import APIRouter, HTTPException, Query, Path, Response
 from pydantic import ValidationError
 
 from src.main.models.competition import (
@@ -14,9 +15,13 @@ from src.main.models.competition import (
     PeerGap,
     CompetitionReportSummary
 )
-from src.main.services.comparison import comparison_service
+from src.main.services.comparison import (
+    comparison_service,
+    COMPETITION_RESPONSE_CACHE_KEY,
+    COMPETITION_RESPONSE_CACHE_TTL
+)
 from src.main.services.cache import cache
-from src.main.services.reports import report_service
+from src.main.services.reports import report_service, LATEST_REPORT_CACHE_KEY, LATEST_REPORT_CACHE_TTL
 from src.main.api.metrics import record_competition_request, record_cache_operation
 
 logger = logging.getLogger(__name__)
@@ -125,23 +130,14 @@ async def get_competition_data(
         # Record API request
         await record_competition_request("competition_data")
         
-        # Check cache first
-        cache_key = f"competition:{asin_main}:{days_back}d"
-        cached_data = await cache.get(cache_key)
+        # Check cache first; hits are already-serialized response JSON, returned without re-encoding
+        cache_key = COMPETITION_RESPONSE_CACHE_KEY.format(asin_main=asin_main, days_back=days_back)
+        cached_response = await cache.get_raw(cache_key)
         
-        if cached_data:
+        if cached_response:
             record_cache_operation("competition_data", "hit")
             logger.info(f"Returning cached competition data for {asin_main}")
-            
-            return CompetitionResponse(
-                data=CompetitionData(
-                    asin_main=asin_main,
-                    date_range=f"last_{days_back}_days",
-                    peers=[PeerGap(**peer) for peer in cached_data.get("peers", [])]
-                ),
-                cached=True,
-                stale_at=datetime.now()  # TODO: Calculate proper stale time
-            )
+            return Response(content=cached_response, media_type="application/json")
         
         record_cache_operation("competition_data", "miss")
         
@@ -181,6 +177,14 @@ async def get_competition_data(
         
         logger.info(f"Retrieved competition data for {asin_main}: {len(peers)} competitors")
         
+        # Cache the response as later hits will see it
+        cached_copy = CompetitionResponse(
+            data=competition_data,
+            cached=True,
+            stale_at=datetime.now() + timedelta(seconds=COMPETITION_RESPONSE_CACHE_TTL)
+        )
+        await cache.set_raw(cache_key, cached_copy.model_dump_json().encode(), ttl=COMPETITION_RESPONSE_CACHE_TTL)
+        
         return CompetitionResponse(
             data=competition_data,
             cached=False,
@@ -262,28 +266,28 @@ async def get_competition_report(
         
         # Check cache first for latest report
         if version == "latest":
-            cache_key = f"report:{asin_main}:latest"
-            cached_report = await cache.get(cache_key)
+            cache_key = LATEST_REPORT_CACHE_KEY.format(asin_main=asin_main)
+            cached_report = await cache.get_raw(cache_key)
             
             if cached_report:
                 record_cache_operation("report", "hit")
                 logger.info(f"Returning cached report for {asin_main}")
-                return CompetitionReportSummary(**cached_report)
+                return CompetitionReportSummary(**orjson.loads(cached_report))
             
             record_cache_operation("report", "miss")
         
         # Get report from database
         from src.main.database import get_db_session
-        from src.main.models.competition import CompetitionReport
+        from src.main.models.mart import CompetitionReports
         from sqlalchemy import select
         
         async with get_db_session() as session:
             if version == "latest":
                 # Get latest version
                 result = await session.execute(
-                    select(CompetitionReport)
-                    .where(CompetitionReport.asin_main == asin_main)
-                    .order_by(CompetitionReport.version.desc())
+                    select(CompetitionReports)
+                    .where(CompetitionReports.asin_main == asin_main)
+                    .order_by(CompetitionReports.version.desc())
                     .limit(1)
                 )
             else:
@@ -291,10 +295,10 @@ async def get_competition_report(
                 try:
                     version_int = int(version)
                     result = await session.execute(
-                        select(CompetitionReport)
+                        select(CompetitionReports)
                         .where(
-                            CompetitionReport.asin_main == asin_main,
-                            CompetitionReport.version == version_int
+                            CompetitionReports.asin_main == asin_main,
+                            CompetitionReports.version == version_int
                         )
                     )
                 except ValueError:
@@ -319,10 +323,10 @@ async def get_competition_report(
             
             # Cache latest report
             if version == "latest":
-                await cache.set(
-                    f"report:{asin_main}:latest",
-                    report_summary.dict(),
-                    ttl=21600  # 6 hours
+                await cache.set_raw(
+                    LATEST_REPORT_CACHE_KEY.format(asin_main=asin_main),
+                    report_summary.model_dump_json().encode(),
+                    ttl=LATEST_REPORT_CACHE_TTL
                 )
             
             logger.info(f"Retrieved competition report for {asin_main} version {report.version}")
@@ -359,17 +363,17 @@ async def refresh_competition_report(
         # Check for recent report unless forced
         if not force:
             from src.main.database import get_db_session
-            from src.main.models.competition import CompetitionReport
+            from src.main.models.mart import CompetitionReports
             from sqlalchemy import select
             from datetime import timedelta
             
             async with get_db_session() as session:
-                recent_cutoff = datetime.now() - timedelta(hours=6)  # 6 hours
+                recent_cutoff = datetime.now(timezone.utc) - timedelta(hours=6)  # 6 hours
                 result = await session.execute(
-                    select(CompetitionReport)
+                    select(CompetitionReports)
                     .where(
-                        CompetitionReport.asin_main == asin_main,
-                        CompetitionReport.generated_at >= recent_cutoff
+                        CompetitionReports.asin_main == asin_main,
+                        CompetitionReports.generated_at >= recent_cutoff
                     )
                     .limit(1)
                 )
@@ -402,8 +406,7 @@ async def refresh_competition_report(
                 detail=f"Failed to save competition report for {asin_main}"
             )
         
-        # Clear related caches
-        await cache.delete_pattern(f"report:{asin_main}:*")
+        # save_report() has already written the new version through to the latest-report cache
         
         logger.info(f"Generated competition report version {version} for {asin_main}")
         
@@ -433,14 +436,14 @@ async def list_report_versions(
     """
     try:
         from src.main.database import get_db_session
-        from src.main.models.competition import CompetitionReport
+        from src.main.models.mart import CompetitionReports
         from sqlalchemy import select
         
         async with get_db_session() as session:
             result = await session.execute(
-                select(CompetitionReport.version, CompetitionReport.generated_at, CompetitionReport.model)
-                .where(CompetitionReport.asin_main == asin_main)
-                .order_by(CompetitionReport.version.desc())
+                select(CompetitionReports.version, CompetitionReports.generated_at, CompetitionReports.model)
+                .where(CompetitionReports.asin_main == asin_main)
+                .order_by(CompetitionReports.version.desc())
                 .limit(limit)
             )
             
@@ -108,7 +108,7 @@ async def get_job_status(job_id: str):
         if not job:
             raise HTTPException(status_code=404, detail="Job not found")
         
-        return JobExecutionResponse.from_orm(job)
+        return JobExecutionResponse.from_ingest_run(job)
         
     except HTTPException:
         raise
@@ -195,7 +195,15 @@ async def get_active_alerts(
     try:
         alerts = await alert_service.get_active_alerts(asin=asin, limit=limit)
         
-        return [PriceAlertResponse.from_orm(alert) for alert in alerts]
+        responses = []
+        for alert in alerts:
+            response = PriceAlertResponse.model_validate(alert)
+            if response.message is None:
+                # Messages are formatted on read rather than stored at detection time
+                response.message = alert_service.format_alert_message(response)
+            responses.append(response)
+        
+        return responses
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get alerts: {e}")
@@ -15,7 +15,7 @@ from src.main.models.product import (
     Product, ProductMetricsDaily, ProductResponse, ProductWithMetrics,
     BatchProductRequest, BatchProductResponse, BatchProductItem
 )
-from src.main.services.cache import cache
+from src.main.services.cache import cache, PRODUCT_INDEX_KEY
 from src.main.api.metrics import record_product_request, record_cache_operation, record_batch_request
 
 logger = logging.getLogger(__name__)
@@ -94,13 +94,14 @@ async def get_product(asin: str) -> ProductResponse:
             product = await fetch_product_with_metrics(asin)
             if not product:
                 raise HTTPException(status_code=404, detail="Product not found")
-            return product.dict()
+            return product.model_dump()
         
         data, cached, stale_at = await cache.get_or_set(
             cache_key,
             fetch_func,
             ttl_seconds=86400,  # 24 hours
             stale_seconds=3600,  # 1 hour
+            index_keys=(PRODUCT_INDEX_KEY.format(asin=asin),),
         )
         
         # Handle case where cache returns None
@@ -139,20 +140,15 @@ async def fetch_products_batch(asins: List[str]) -> dict:
             products_result = await db.execute(products_query)
             products = {p.asin: p for p in products_result.scalars().all()}
             
-            # Fetch latest metrics for all ASINs in one query
+            # Fetch only the latest metrics row per ASIN (DISTINCT ON) in one query
             metrics_query = (
                 select(ProductMetricsDaily)
                 .where(ProductMetricsDaily.asin.in_(asins))
                 .order_by(ProductMetricsDaily.asin, ProductMetricsDaily.date.desc())
+                .distinct(ProductMetricsDaily.asin)
             )
             metrics_result = await db.execute(metrics_query)
-            all_metrics = metrics_result.scalars().all()
-            
-            # Group metrics by ASIN and get the latest
-            latest_metrics = {}
-            for metric in all_metrics:
-                if metric.asin not in latest_metrics:
-                    latest_metrics[metric.asin] = metric
+            latest_metrics = {metric.asin: metric for metric in metrics_result.scalars().all()}
             
             # Build response data
             results = {}
@@ -204,9 +200,10 @@ async def get_products_batch(request: BatchProductRequest) -> BatchProductRespon
         cache_results = {}
         uncached_asins = []
         
+        cached_by_key = await cache.get_many([f"product:{asin}:summary" for asin in asins])
+        
         for asin in asins:
-            cache_key = f"product:{asin}:summary"
-            cached_data = await cache.get(cache_key)
+            cached_data = cached_by_key.get(f"product:{asin}:summary")
             
             if cached_data:
                 try:
@@ -234,7 +231,10 @@ async def get_products_batch(request: BatchProductRequest) -> BatchProductRespon
             for asin, product_data in db_results.items():
                 if product_data:
                     cache_key = f"product:{asin}:summary"
-                    await cache.set(cache_key, product_data.dict(), ttl=86400)
+                    await cache.set(
+                        cache_key, product_data.model_dump(), ttl=86400,
+                        index_keys=(PRODUCT_INDEX_KEY.format(asin=asin),)
+                    )
         
         # Build response items
         for asin in asins:
@@ -21,9 +21,21 @@ class Settings(BaseSettings):
     
     # Database Configuration
     database_url: str
+    db_pool_size: int = 20
+    db_max_overflow: int = 0
+    # asyncpg server-side prepared statement cache; set to 0 behind pgbouncer in transaction mode
+    db_statement_cache_size: int = 1024
+    # Rows per multi-VALUES INSERT when SQLAlchemy batches executemany inserts (still capped by the bind limit)
+    db_insertmanyvalues_page_size: int = 1000
+    # Reported in pg_stat_activity for this service's connections
+    db_application_name: str = "amazon_tool"
     
     # Redis Configuration  
     redis_url: str = "redis://localhost:6379"
+    # Shared pool for cache commands and publishes; the invalidation subscriber holds one connection
+    redis_max_connections: int = 32
+    # Seconds a command waits for a free pooled connection before raising
+    redis_pool_timeout: float = 5.0
     
     # Application Configuration
     log_level: str = "INFO"
@@ -41,9 +53,21 @@ class Settings(BaseSettings):
     api_host: str = "0.0.0.0"
     api_port: int = 8000
     
+    # Partition retention (days); None keeps all partitions
+    metrics_retention_days: Optional[int] = None
+    raw_events_retention_days: Optional[int] = None
+    # Opt-in: create raw_events partitions UNLOGGED (no WAL; contents are lost on crash and not replicated)
+    raw_events_unlogged: bool = False
+    # TOAST compression for raw_events.payload (Postgres 14+); None keeps the server default (pglz)
+    raw_events_payload_compression: Optional[str] = "lz4"
+    # Days populated concurrently by mart backfills; keep below db_pool_size
+    mart_backfill_concurrency: int = 4
+    
     # Cache Configuration
     cache_ttl_seconds: int = 86400  # 24 hours
     cache_stale_seconds: int = 3600  # 1 hour
+    # In-process LRU of fresh get_or_set entries in front of Redis; 0 disables it
+    cache_l1_max_entries: int = 1024
     
     # OpenAI Configuration (M5)
     openai_api_key: Optional[str] = None
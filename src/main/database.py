@@ -2,7 +2,8 @@
 
 import asyncio
 import logging
-from typing import AsyncGenerator, Optional
+from datetime import date, timedelta
+from typing import AsyncGenerator, List, Optional, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import declarative_base
 from sqlalchemy import text
@@ -20,8 +21,12 @@ engine: Optional[object] = None
 SessionLocal: Optional[async_sessionmaker] = None
 
 
-async def init_db() -> None:
-    """Initialize database connection and session factory."""
+async def init_db(ensure_partitions: bool = True) -> None:
+    """
+    Initialize database connection and session factory.
+    ensure_partitions=False skips the time partition pass, for callers that run
+    maintain_time_partitions (which includes it) right afterwards.
+    """
     global engine, SessionLocal
     
     try:
@@ -35,10 +40,28 @@ async def init_db() -> None:
         engine = create_async_engine(
             database_url,
             echo=settings.log_level.upper() == "DEBUG",
-            pool_size=5,
-            max_overflow=10,
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
             pool_pre_ping=True,
             pool_recycle=3600,
+            # asyncpg has no psycopg2-style executemany_mode; ORM/executemany inserts are batched
+            # into multi-VALUES statements through insertmanyvalues instead
+            insertmanyvalues_page_size=settings.db_insertmanyvalues_page_size,
+            connect_args={
+                # asyncpg's own prepared statement cache plus SQLAlchemy's adapter-level cache
+                "statement_cache_size": settings.db_statement_cache_size,
+                "prepared_statement_cache_size": settings.db_statement_cache_size,
+                "server_settings": {
+                    # product_metrics_daily and raw_events are range-partitioned: let joins and
+                    # aggregates between matching partitions run per partition (off by default in Postgres)
+                    "enable_partitionwise_join": "on",
+                    "enable_partitionwise_aggregate": "on",
+                    # JIT compilation costs more than it saves on these short queries and slows
+                    # asyncpg's type introspection on new connections
+                    "jit": "off",
+                    "application_name": settings.db_application_name,
+                },
+            },
         )
         
         # Create session factory
@@ -55,12 +78,17 @@ async def init_db() -> None:
         async with engine.begin() as conn:
             # Create schemas first
             await conn.execute(text("CREATE SCHEMA IF NOT EXISTS staging"))
+            await conn.execute(text("CREATE SCHEMA IF NOT EXISTS staging_raw"))
             await conn.execute(text("CREATE SCHEMA IF NOT EXISTS core"))
             await conn.execute(text("CREATE SCHEMA IF NOT EXISTS mart"))
             
             # Create all tables
             await conn.run_sync(Base.metadata.create_all)
             
+            # Create time partitions for the partitioned tables
+            if ensure_partitions:
+                await ensure_time_partitions(conn)
+            
             # Test connection
             await conn.execute(text("SELECT 1"))
         
@@ -106,6 +134,245 @@ async def check_db_health() -> bool:
         return False
 
 
+# Time-partitioned tables: (qualified table name, partition granularity)
+PARTITIONED_TABLES: Tuple[Tuple[str, str], ...] = (
+    ("core.product_metrics_daily", "month"),
+    ("staging_raw.raw_events", "week"),
+)
+
+# Range partition key column of each partitioned table
+PARTITION_KEYS = {
+    "core.product_metrics_daily": "date",
+    "staging_raw.raw_events": "fetched_at",
+}
+
+# Re-fetchable staging tables whose partitions skip WAL (partitioned parents cannot be UNLOGGED)
+UNLOGGED_PARTITIONED_TABLES = ("staging_raw.raw_events",)
+
+
+def _partition_bounds(granularity: str, day: date) -> Tuple[date, date, str]:
+    """Return (start, end, name suffix) of the partition containing day."""
+    if granularity == "month":
+        start = day.replace(day=1)
+        end = (start + timedelta(days=32)).replace(day=1)
+        return start, end, start.strftime("p%Y_%m")
+
+    start = day - timedelta(days=day.weekday())
+    end = start + timedelta(days=7)
+    iso_year, iso_week, _ = start.isocalendar()
+    return start, end, f"p{iso_year}w{iso_week:02d}"
+
+
+def _partition_ddl(table: str, granularity: str, day: date, unlogged: bool = False) -> str:
+    """Build CREATE TABLE ... PARTITION OF for the partition containing day."""
+    start, end, suffix = _partition_bounds(granularity, day)
+    return (
+        f"CREATE {'UNLOGGED ' if unlogged else ''}TABLE IF NOT EXISTS {table}_{suffix} PARTITION OF {table} "
+        f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    )
+
+
+async def _is_partitioned(conn, table: str) -> bool:
+    """Return whether table exists as a partitioned parent (relkind 'p')."""
+    schema, name = table.split(".")
+    result = await conn.execute(text("""
+        SELECT c.relkind
+        FROM pg_class c
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE n.nspname = :schema AND c.relname = :name
+    """), {"schema": schema, "name": name})
+    return result.scalar() == "p"
+
+
+async def _default_has_rows(conn, table: str, start: date, end: date) -> bool:
+    """Return whether the DEFAULT partition of table holds rows in [start, end)."""
+    column = PARTITION_KEYS[table]
+    try:
+        async with conn.begin_nested():
+            result = await conn.execute(text(
+                f"SELECT EXISTS (SELECT 1 FROM {table}_default "
+                f"WHERE {column} >= :start AND {column} < :end)"
+            ), {"start": start, "end": end})
+            return bool(result.scalar())
+    except SQLAlchemyError:
+        # No DEFAULT partition yet
+        return False
+
+
+async def _move_default_rows(conn, table: str, start: date, end: date, create_statement: str) -> None:
+    """
+    Create the range partition for [start, end) when the DEFAULT partition already holds rows in it:
+    detach the default, create the range partition, move the rows into it and reattach the default.
+    """
+    column = PARTITION_KEYS[table]
+    default = f"{table}_default"
+    async with conn.begin_nested():
+        await conn.execute(text(f"ALTER TABLE {table} DETACH PARTITION {default}"))
+        await conn.execute(text(create_statement))
+        # Rows reinserted through the parent are routed to the new partition
+        result = await conn.execute(text(
+            f"WITH moved AS (DELETE FROM {default} WHERE {column} >= :start AND {column} < :end RETURNING *) "
+            f"INSERT INTO {table} SELECT * FROM moved"
+        ), {"start": start, "end": end})
+        await conn.execute(text(f"ALTER TABLE {table} ATTACH PARTITION {default} DEFAULT"))
+    logger.info(f"Moved {result.rowcount} rows of {table} from {default} into its [{start}, {end}) partition")
+
+
+async def ensure_time_partitions(conn, today: Optional[date] = None, periods_ahead: int = 1) -> List[str]:
+    """
+    Create the current and upcoming range partitions for each partitioned table.
+    A DEFAULT partition catches rows outside the pre-created ranges (e.g. backfills); rows it
+    already holds for a range being created are moved into the new partition.
+    Tables that predate partitioning (plain heap tables, which create_all leaves as they are)
+    are skipped.
+    Returns the DDL statements executed.
+    """
+    today = today or date.today()
+    statements = []
+
+    for table, granularity in PARTITIONED_TABLES:
+        if not await _is_partitioned(conn, table):
+            logger.warning(
+                f"{table} is not a partitioned table; skipping partition creation. "
+                f"Convert it to PARTITION BY RANGE with a migration to enable partitioning."
+            )
+            continue
+
+        unlogged = settings.raw_events_unlogged and table in UNLOGGED_PARTITIONED_TABLES
+        day = today
+        for _ in range(periods_ahead + 1):
+            start, end, _ = _partition_bounds(granularity, day)
+            statement = _partition_ddl(table, granularity, day, unlogged)
+            day = end
+
+            # A savepoint per partition: one failure must not abort the surrounding transaction
+            try:
+                async with conn.begin_nested():
+                    await conn.execute(text(statement))
+            except SQLAlchemyError as e:
+                if not await _default_has_rows(conn, table, start, end):
+                    logger.error(f"Could not create partition for {table} ({statement}): {e}")
+                    continue
+                try:
+                    await _move_default_rows(conn, table, start, end, statement)
+                except SQLAlchemyError as move_error:
+                    raise RuntimeError(
+                        f"Could not move {table}_default rows in [{start}, {end}) into a new partition; "
+                        f"move them manually before creating it: {move_error}"
+                    ) from move_error
+            statements.append(statement)
+
+        default_statement = (
+            f"CREATE {'UNLOGGED ' if unlogged else ''}TABLE IF NOT EXISTS {table}_default PARTITION OF {table} DEFAULT"
+        )
+        try:
+            async with conn.begin_nested():
+                await conn.execute(text(default_statement))
+        except SQLAlchemyError as e:
+            logger.error(f"Could not create partition for {table} ({default_statement}): {e}")
+            continue
+        statements.append(default_statement)
+
+    return statements
+
+
+# pg_attribute.attcompression codes for the SET COMPRESSION methods
+_COMPRESSION_CODES = {"pglz": "p", "lz4": "l"}
+
+
+async def ensure_payload_compression(conn) -> Optional[str]:
+    """
+    Apply raw_events_payload_compression to staging_raw.raw_events.payload (Postgres 14+).
+    SET COMPRESSION takes an ACCESS EXCLUSIVE lock and recurses to every partition, so it is
+    issued only when the parent column does not already use the configured method.
+    Returns the statement executed, if any.
+    """
+    compression = settings.raw_events_payload_compression
+    if not compression or (conn.dialect.server_version_info or (0,)) < (14,):
+        return None
+
+    result = await conn.execute(text("""
+        SELECT a.attcompression
+        FROM pg_attribute a
+        JOIN pg_class c ON c.oid = a.attrelid
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE n.nspname = 'staging_raw' AND c.relname = 'raw_events' AND a.attname = 'payload'
+    """))
+    if result.scalar() == _COMPRESSION_CODES.get(compression):
+        return None
+
+    # Metadata-only; applies to newly written values
+    statement = f"ALTER TABLE staging_raw.raw_events ALTER COLUMN payload SET COMPRESSION {compression}"
+    await conn.execute(text(statement))
+    return statement
+
+
+async def drop_expired_partitions(conn, table: str, granularity: str, retention_days: int,
+                                  today: Optional[date] = None) -> List[str]:
+    """Detach and drop partitions of table that end before the retention window."""
+    cutoff = (today or date.today()) - timedelta(days=retention_days)
+    schema, name = table.split(".")
+
+    result = await conn.execute(text("""
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        JOIN pg_class p ON p.oid = i.inhparent
+        JOIN pg_namespace n ON n.oid = p.relnamespace
+        WHERE n.nspname = :schema AND p.relname = :name
+    """), {"schema": schema, "name": name})
+
+    dropped = []
+    for (partition_name,) in result.fetchall():
+        suffix = partition_name[len(name) + 1:]
+        if suffix == "default":
+            continue
+
+        try:
+            if granularity == "month":
+                start = date(int(suffix[1:5]), int(suffix[6:8]), 1)
+            else:
+                start = date.fromisocalendar(int(suffix[1:5]), int(suffix[6:8]), 1)
+        except ValueError:
+            logger.warning(f"Skipping partition with unexpected name: {schema}.{partition_name}")
+            continue
+
+        _, end, _ = _partition_bounds(granularity, start)
+        if end <= cutoff:
+            await conn.execute(text(f"ALTER TABLE {table} DETACH PARTITION {schema}.{partition_name}"))
+            await conn.execute(text(f"DROP TABLE {schema}.{partition_name}"))
+            dropped.append(f"{schema}.{partition_name}")
+
+    if dropped:
+        logger.info(f"Dropped {len(dropped)} expired partitions of {table}: {dropped}")
+    return dropped
+
+
+async def maintain_time_partitions() -> dict:
+    """Pre-create upcoming partitions, apply configured retention and payload compression."""
+    if not engine:
+        raise RuntimeError("Database not initialized")
+
+    retention = {
+        "core.product_metrics_daily": settings.metrics_retention_days,
+        "staging_raw.raw_events": settings.raw_events_retention_days,
+    }
+
+    async with engine.begin() as conn:
+        created = await ensure_time_partitions(conn)
+        compression = await ensure_payload_compression(conn)
+        dropped = []
+        for table, granularity in PARTITIONED_TABLES:
+            if retention.get(table):
+                dropped.extend(await drop_expired_partitions(conn, table, granularity, retention[table]))
+
+    return {
+        "partitions_ensured": len(created),
+        "partitions_dropped": dropped,
+        "payload_compression_applied": compression is not None,
+    }
+
+
 def get_db_session():
     """Get a database session context manager for direct use (not dependency injection)."""
     if not SessionLocal:
@@ -9,8 +9,9 @@ import logging
 
 from src.main.database import get_db_session
 from src.main.models.product import Product as ProductModel, ProductMetricsDaily
-from src.main.models.mart import ProductSummary
-from src.main.models.competition import CompetitorComparisonDaily, CompetitionReport
+from src.main.models.mart import (
+    ProductMetricsRollup, CompetitorComparisonDaily, CompetitionReports as CompetitionReport
+)
 from src.main.graphql.types import ProductMetrics, ProductRollup, ProductDelta, PeerGap, Range
 
 logger = logging.getLogger(__name__)
@@ -97,9 +98,15 @@ class ProductRollupLoader(DataLoader):
                 # Calculate rollup period (for now, use a simple approach)
                 end_date = date.today()
                 
+                # Latest 30-day rollup row per ASIN (DISTINCT ON)
                 result = await session.execute(
-                    select(ProductSummary)
-                    .where(ProductSummary.asin.in_(asins))
+                    select(ProductMetricsRollup)
+                    .where(
+                        ProductMetricsRollup.asin.in_(asins),
+                        ProductMetricsRollup.duration == '30d'
+                    )
+                    .order_by(ProductMetricsRollup.asin, ProductMetricsRollup.as_of.desc())
+                    .distinct(ProductMetricsRollup.asin)
                 )
                 
                 summaries = result.scalars().all()
@@ -107,15 +114,15 @@ class ProductRollupLoader(DataLoader):
                 # Create mapping for (asin, range) -> rollup
                 rollup_map = {}
                 for summary in summaries:
-                    # Use summary data to create rollup
+                    # Use rollup data to create rollup
                     if summary.asin not in rollup_map:
                         rollup_map[summary.asin] = ProductRollup(
-                            as_of=summary.latest_metrics_date or date.today(),
-                            price_avg=float(summary.avg_price_30d) if summary.avg_price_30d else None,
-                            price_min=float(summary.min_price_30d) if summary.min_price_30d else None,
-                            price_max=float(summary.max_price_30d) if summary.max_price_30d else None,
-                            bsr_avg=float(summary.avg_bsr_30d) if summary.avg_bsr_30d else None,
-                            rating_avg=float(summary.latest_rating) if summary.latest_rating else None
+                            as_of=summary.as_of or date.today(),
+                            price_avg=float(summary.price_avg) if summary.price_avg else None,
+                            price_min=float(summary.price_min) if summary.price_min else None,
+                            price_max=float(summary.price_max) if summary.price_max else None,
+                            bsr_avg=float(summary.bsr_avg) if summary.bsr_avg else None,
+                            rating_avg=float(summary.rating_avg) if summary.rating_avg else None
                         )
                 
                 logger.debug(f"Loaded rollup data from Supabase for {len(rollup_map)} ASINs")
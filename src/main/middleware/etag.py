@@ -102,7 +102,7 @@ async def add_etag_to_response(request: Request, data: Any, cache_key: str = Non
             return Response(status_code=304, headers={'ETag': etag})
         
         # Create JSON response with ETag
-        response_data = data.dict() if hasattr(data, 'dict') else data
+        response_data = data.model_dump() if hasattr(data, 'model_dump') else data
         response = JSONResponse(content=response_data)
         
         # Set ETag headers
@@ -114,5 +114,5 @@ async def add_etag_to_response(request: Request, data: Any, cache_key: str = Non
     except Exception as e:
         logger.error(f"Error creating ETag response: {e}")
         # Fallback to regular JSON response
-        response_data = data.dict() if hasattr(data, 'dict') else data
+        response_data = data.model_dump() if hasattr(data, 'model_dump') else data
         return JSONResponse(content=response_data)
\ No newline at end of file
@@ -2,8 +2,8 @@
 
 from datetime import datetime, date
 from typing import Optional, List
-from sqlalchemy import Column, String, DateTime
-from pydantic import BaseModel, Field
+from sqlalchemy import Column, String, DateTime, func
+from pydantic import BaseModel, ConfigDict, Field
 
 from src.main.database import Base
 
@@ -16,7 +16,7 @@ class CompetitorLink(Base):
 
     asin_main = Column(String, primary_key=True)
     asin_comp = Column(String, primary_key=True)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     def __repr__(self):
         return f"<CompetitorLink(main='{self.asin_main}', comp='{self.asin_comp}')>"
@@ -30,7 +30,7 @@ class CompetitorLink(Base):
 class CompetitorLinkRequest(BaseModel):
     """Request model for setting up competitor relationships."""
     asin_main: str = Field(..., description="Main product ASIN")
-    competitor_asins: List[str] = Field(..., min_items=1, max_items=10, description="List of competitor ASINs")
+    competitor_asins: List[str] = Field(..., min_length=1, max_length=10, description="List of competitor ASINs")
 
 
 class CompetitorLinkResponse(BaseModel):
@@ -38,9 +38,8 @@ class CompetitorLinkResponse(BaseModel):
     asin_main: str
     competitor_asins: List[str]
     created_count: int = Field(..., description="Number of new competitor links created")
-    
-    class Config:
-        from_attributes = True
+
+    model_config = ConfigDict(from_attributes=True)
 
 
 class PeerGap(BaseModel):
@@ -58,9 +57,8 @@ class CompetitionData(BaseModel):
     asin_main: str = Field(..., description="Main product ASIN")
     date_range: str = Field(..., description="Date range for analysis")
     peers: List[PeerGap] = Field(..., description="Competitor comparison data")
-    
-    class Config:
-        from_attributes = True
+
+    model_config = ConfigDict(from_attributes=True)
 
 
 class CompetitionResponse(BaseModel):
@@ -68,9 +66,8 @@ class CompetitionResponse(BaseModel):
     data: CompetitionData
     cached: bool = Field(..., description="Whether data was served from cache")
     stale_at: Optional[datetime] = Field(None, description="When cached data becomes stale")
-    
-    class Config:
-        from_attributes = True
+
+    model_config = ConfigDict(from_attributes=True)
 
 
 class CompetitionReportSummary(BaseModel):
@@ -80,5 +77,4 @@ class CompetitionReportSummary(BaseModel):
     summary: dict = Field(..., description="Report summary data")
     generated_at: datetime
     
-    class Config:
-        from_attributes = True
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True)
\ No newline at end of file
@@ -2,9 +2,9 @@
 
 from datetime import datetime, date
 from typing import Optional, List
-from sqlalchemy import Column, String, DateTime, Numeric, Integer, Date, Text, Index, ForeignKey
-from sqlalchemy.dialects.postgresql import JSONB
-from pydantic import BaseModel, Field
+from sqlalchemy import Column, String, DateTime, Numeric, Integer, Date, Text, Boolean, Index, ForeignKey, func, text
+from sqlalchemy.dialects.postgresql import JSONB, UUID
+from pydantic import BaseModel, ConfigDict, Field
 
 from src.main.database import Base
 
@@ -85,7 +85,10 @@ class CompetitionReports(Base):
 
     __tablename__ = "competition_reports"
     __table_args__ = (
-        Index("idx_reports_asin_version", "asin_main", "version"),
+        # Latest-report lookups (ORDER BY version DESC LIMIT 1) scan forward; summary/evidence
+        # JSONB stay out of INCLUDE since they can exceed the B-tree tuple size limit
+        Index("idx_reports_asin_version_desc", "asin_main", text("version DESC"),
+              postgresql_include=["model", "generated_at"]),
         {"schema": "mart"}
     )
 
@@ -95,12 +98,42 @@ class CompetitionReports(Base):
     summary = Column(JSONB, nullable=False)
     evidence = Column(JSONB, nullable=True)
     model = Column(String, nullable=True)
-    generated_at = Column(DateTime, default=datetime.utcnow)
+    generated_at = Column(DateTime(timezone=True), server_default=func.now())
 
     def __repr__(self):
         return f"<CompetitionReports(asin='{self.asin_main}', version={self.version})>"
 
 
+class PriceAlerts(Base):
+    """Price/BSR anomaly alerts written by AlertService to mart.price_alerts."""
+
+    __tablename__ = "price_alerts"
+    __table_args__ = (
+        # Active-alert listings filter on is_resolved and read newest first
+        Index("idx_price_alerts_active_created", "is_resolved", text("created_at DESC")),
+        Index("idx_price_alerts_asin_created", "asin", text("created_at DESC")),
+        {"schema": "mart"}
+    )
+
+    id = Column(UUID(as_uuid=False), primary_key=True, server_default=func.gen_random_uuid())
+    asin = Column(String, ForeignKey('core.products.asin', ondelete='CASCADE'), nullable=False)
+    alert_type = Column(String, nullable=False)  # price_spike, price_drop, bsr_jump, bsr_improve
+    severity = Column(String, nullable=False)  # low, medium, high
+    current_value = Column(Numeric(12, 2), nullable=True)
+    previous_value = Column(Numeric(12, 2), nullable=True)
+    change_percent = Column(Numeric(10, 2), nullable=True)
+    threshold_exceeded = Column(Numeric(6, 2), nullable=True)
+    baseline_value = Column(Numeric(12, 2), nullable=True)  # 30-day average from the rollups
+    message = Column(Text, nullable=True)  # Formatted on read by AlertService.format_alert_message
+    is_resolved = Column(Boolean, nullable=False, server_default=text("false"))
+    resolved_at = Column(DateTime(timezone=True), nullable=True)
+    resolved_by = Column(String, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    def __repr__(self):
+        return f"<PriceAlerts(asin='{self.asin}', type='{self.alert_type}', severity='{self.severity}')>"
+
+
 # Pydantic models for API responses
 class ProductMetricsRollupResponse(BaseModel):
     """Product metrics rollup API response model."""
@@ -116,8 +149,7 @@ class ProductMetricsRollupResponse(BaseModel):
     price_change_pct: Optional[float]
     bsr_change_pct: Optional[float]
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class ProductMetricsDeltaResponse(BaseModel):
@@ -132,8 +164,7 @@ class ProductMetricsDeltaResponse(BaseModel):
     reviews_delta: Optional[int]
     buybox_delta: Optional[float]
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class CompetitorComparisonResponse(BaseModel):
@@ -148,8 +179,7 @@ class CompetitorComparisonResponse(BaseModel):
     buybox_diff: Optional[float]
     extras: Optional[dict]
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class CompetitionReportResponse(BaseModel):
@@ -162,13 +192,12 @@ class CompetitionReportResponse(BaseModel):
     model: Optional[str]
     generated_at: datetime
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 # Legacy response models for backward compatibility
 class PriceAlertResponse(BaseModel):
-    """Legacy price alert response - maps to core.alerts."""
+    """Legacy price alert response - maps to mart.price_alerts."""
     id: str
     asin: str
     alert_type: str
@@ -177,11 +206,10 @@ class PriceAlertResponse(BaseModel):
     previous_value: Optional[float]
     change_percent: Optional[float]
     message: Optional[str]
-    is_resolved: str
+    is_resolved: bool
     created_at: datetime
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 # Materialized view representation (for documentation)
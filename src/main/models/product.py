@@ -1,13 +1,17 @@
 """Product data models."""
 
+import re
 from datetime import datetime, date
 from typing import Optional, List, Union
-from sqlalchemy import Column, String, DateTime, Numeric, Integer, Text, Date, ForeignKey
+from sqlalchemy import Column, String, DateTime, Numeric, Integer, Text, Date, ForeignKey, Index, func, text
 from sqlalchemy.dialects.postgresql import JSONB
-from pydantic import BaseModel, Field, validator
+from pydantic import BaseModel, ConfigDict, Field, field_validator
 
 from src.main.database import Base
 
+# ASINs are 10 uppercase alphanumeric characters
+_ASIN_RE = re.compile(r'^[A-Z0-9]{10}$')
+
 
 class Product(Base):
     """Product SQLAlchemy model matching Supabase schema."""
@@ -20,7 +24,7 @@ class Product(Base):
     brand = Column(String, nullable=True)
     category = Column(String, nullable=True)
     image_url = Column(Text, nullable=True)
-    first_seen_at = Column(DateTime(timezone=True), default=Text("now()"))
+    first_seen_at = Column(DateTime(timezone=True), server_default=func.now())
     last_seen_at = Column(DateTime(timezone=True), nullable=True)
     source_meta = Column(JSONB, nullable=True)
     
@@ -32,17 +36,31 @@ class ProductMetricsDaily(Base):
     """Daily product metrics SQLAlchemy model matching Supabase schema."""
 
     __tablename__ = "product_metrics_daily"
-    __table_args__ = {"schema": "core"}
+    __table_args__ = (
+        # Covering index: "latest N days for ASIN X" is served by an index-only scan
+        Index(
+            "idx_pmd_asin_date_covering", "asin", text("date DESC"),
+            postgresql_include=["price", "bsr", "rating", "reviews_count", "buybox_price"]
+        ),
+        # Rows arrive in date order: BRIN serves the mart's date = / BETWEEN filters within a
+        # partition at a fraction of a B-tree's size and write cost
+        Index(
+            "idx_pmd_date_brin", "date", postgresql_using="brin",
+            postgresql_with={"pages_per_range": 32}
+        ),
+        # Monthly range partitions are created by database.ensure_time_partitions()
+        {"schema": "core", "postgresql_partition_by": "RANGE (date)"}
+    )
 
-    asin = Column(String, ForeignKey('core.products.asin', ondelete='CASCADE'), primary_key=True, index=True)
-    date = Column(Date, primary_key=True, index=True)  # Fixed: Date instead of DateTime
+    asin = Column(String, ForeignKey('core.products.asin', ondelete='CASCADE'), primary_key=True)
+    date = Column(Date, primary_key=True)  # Fixed: Date instead of DateTime
     price = Column(Numeric(10, 2), nullable=True)
     bsr = Column(Integer, nullable=True)
     rating = Column(Numeric(2, 1), nullable=True)
     reviews_count = Column(Integer, nullable=True)
     buybox_price = Column(Numeric(10, 2), nullable=True)
     job_id = Column(String, ForeignKey('core.ingest_runs.job_id', ondelete='SET NULL'), nullable=True)
-    created_at = Column(DateTime(timezone=True), default=Text("now()"))
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     def __repr__(self):
         return f"<ProductMetricsDaily(asin='{self.asin}', date='{self.date}')>"
@@ -57,7 +75,7 @@ class ProductFeatures(Base):
     asin = Column(String, ForeignKey('core.products.asin', ondelete='CASCADE'), primary_key=True)
     bullets = Column(JSONB, nullable=True)  # Feature bullet points as JSONB
     attributes = Column(JSONB, nullable=True)  # Product attributes as JSONB
-    extracted_at = Column(DateTime(timezone=True), default=Text("now()"))
+    extracted_at = Column(DateTime(timezone=True), server_default=func.now())
 
     def __repr__(self):
         return f"<ProductFeatures(asin='{self.asin}')>"
@@ -83,9 +101,8 @@ class ProductWithMetrics(ProductBase):
     last_updated: Optional[datetime] = Field(None, description="Last metrics update")
     bullets: Optional[List[str]] = Field(None, description="Product feature bullets")
     attributes: Optional[dict] = Field(None, description="Product attributes")
-    
-    class Config:
-        from_attributes = True
+
+    model_config = ConfigDict(from_attributes=True)
 
 
 class ProductResponse(BaseModel):
@@ -93,22 +110,25 @@ class ProductResponse(BaseModel):
     data: ProductWithMetrics
     cached: bool = Field(..., description="Whether data was served from cache")
     stale_at: Optional[datetime] = Field(None, description="When cached data becomes stale")
-    
-    class Config:
-        from_attributes = True
+
+    model_config = ConfigDict(from_attributes=True)
 
 
 class BatchProductRequest(BaseModel):
     """Batch product request model."""
-    asins: List[str] = Field(..., min_items=1, max_items=50, description="List of ASINs to fetch")
+    asins: List[str] = Field(..., min_length=1, max_length=50, description="List of ASINs to fetch")
     
-    @validator('asins')
+    @field_validator('asins')
+    @classmethod
     def validate_asins(cls, v):
-        """Validate ASIN format."""
+        """Validate ASIN format and normalize to uppercase."""
+        normalized = []
         for asin in v:
-            if not asin or len(asin.strip()) != 10 or not asin.strip().isalnum():
+            candidate = asin.strip().upper()
+            if not _ASIN_RE.match(candidate):
                 raise ValueError(f"Invalid ASIN format: {asin}")
-        return [asin.strip().upper() for asin in v]
+            normalized.append(candidate)
+        return normalized
 
 
 class BatchProductItem(BaseModel):
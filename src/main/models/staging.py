@@ -1,11 +1,13 @@
 """Staging and job tracking models matching Supabase schema."""
 
-from datetime import datetime
-from typing import Optional, Dict, Any
-from sqlalchemy import Column, String, DateTime, Text, Integer, ForeignKey, Numeric
+from datetime import datetime, timezone
+from typing import Optional, Dict, Any, List
+from sqlalchemy import select, Column, String, DateTime, Text, Integer, ForeignKey, Numeric, Index, CheckConstraint, func
 from sqlalchemy.dialects.postgresql import JSONB
-from pydantic import BaseModel, Field
+from sqlalchemy.orm import column_property, synonym
+from pydantic import BaseModel, ConfigDict, Field
 import enum
+import orjson
 
 from src.main.database import Base
 
@@ -23,16 +25,23 @@ class IngestRuns(Base):
     """Job tracking SQLAlchemy model matching Supabase core.ingest_runs."""
 
     __tablename__ = "ingest_runs"
-    __table_args__ = {"schema": "core"}
+    __table_args__ = (
+        # Plain string + CHECK instead of a PG ENUM: no per-row Enum conversion, no ALTER TYPE migrations
+        CheckConstraint(
+            "status IN ('PENDING', 'RUNNING', 'SUCCESS', 'PARTIAL', 'FAILED')",
+            name="ck_ingest_runs_status"
+        ),
+        {"schema": "core"}
+    )
 
     id = Column(Integer, primary_key=True)
     job_id = Column(String, unique=True, nullable=False, index=True)
     source = Column(String, nullable=False)
     source_run_id = Column(String, nullable=True)
-    started_at = Column(DateTime, nullable=False, default=datetime.utcnow)
-    finished_at = Column(DateTime, nullable=True)
+    started_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    finished_at = Column(DateTime(timezone=True), nullable=True)
     cost = Column(Numeric(10, 2), nullable=True, default=0)  # Numeric type to match Supabase
-    status = Column(String, nullable=False, default='SUCCESS')  # SUCCESS, PARTIAL, FAILED
+    status = Column(String(16), nullable=False, default='SUCCESS')  # PENDING, RUNNING, SUCCESS, PARTIAL, FAILED
     meta = Column(JSONB, nullable=True)
 
     def __repr__(self):
@@ -43,48 +52,98 @@ class RawEvents(Base):
     """Raw events SQLAlchemy model matching Supabase staging_raw.raw_events."""
 
     __tablename__ = "raw_events"
-    __table_args__ = {"schema": "staging_raw"}
-
-    id = Column(Integer, primary_key=True)
+    __table_args__ = (
+        # Append-only table: BRIN keeps fetched_at range scans sequential at a fraction of B-tree size
+        Index("idx_raw_events_fetched_at_brin", "fetched_at", postgresql_using="brin"),
+        # Weekly range partitions are created by database.ensure_time_partitions()
+        {"schema": "staging_raw", "postgresql_partition_by": "RANGE (fetched_at)"}
+    )
+
+    # Partitioned tables must carry the partition key in the primary key
+    id = Column(Integer, primary_key=True, autoincrement=True)
     job_id = Column(String, ForeignKey('core.ingest_runs.job_id', ondelete='SET NULL'), nullable=True)
     source = Column(String, nullable=False)
-    fetched_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    fetched_at = Column(DateTime(timezone=True), primary_key=True, nullable=False, server_default=func.now())
     asin = Column(String, nullable=True, index=True)
     url = Column(Text, nullable=True)
     payload = Column(JSONB, nullable=False)
 
+    COPY_COLUMNS = ("job_id", "source", "fetched_at", "asin", "url", "payload")
+
     def __repr__(self):
         return f"<RawEvents(id={self.id}, asin='{self.asin}', source='{self.source}')>"
 
+    @classmethod
+    async def allocate_ids(cls, session, count: int) -> List[int]:
+        """Reserve count ids from the id sequence in one round trip, for rows loaded by COPY."""
+        if count <= 0:
+            return []
+
+        table = f"{cls.__table__.schema}.{cls.__table__.name}"
+        result = await session.execute(
+            select(func.nextval(func.pg_get_serial_sequence(table, "id")))
+            .select_from(func.generate_series(1, count))
+        )
+        return list(result.scalars().all())
 
-# Legacy models for backward compatibility
-class JobExecution(IngestRuns):
-    """Legacy alias for IngestRuns - for backward compatibility."""
-    pass
+    @classmethod
+    async def bulk_insert(cls, session, rows: List[Dict[str, Any]], ids: Optional[List[int]] = None) -> int:
+        """
+        Insert raw events with a single COPY on the session's asyncpg connection.
+        Each row needs 'source' and 'payload'; 'job_id', 'asin', 'url' and 'fetched_at' are optional.
+        ids (see allocate_ids) are copied into the id column instead of using the sequence default.
+        Returns number of rows copied.
+        """
+        if not rows:
+            return 0
+
+        fetched_at = datetime.now(timezone.utc)
+        records = [
+            (
+                row.get('job_id'),
+                row['source'],
+                row.get('fetched_at') or fetched_at,
+                row.get('asin'),
+                row.get('url'),
+                orjson.dumps(row['payload']).decode(),
+            )
+            for row in rows
+        ]
+        columns = cls.COPY_COLUMNS
+        if ids is not None:
+            records = [(event_id, *record) for event_id, record in zip(ids, records)]
+            columns = ("id", *columns)
+
+        connection = await session.connection()
+        raw_connection = await connection.get_raw_connection()
+        await raw_connection.driver_connection.copy_records_to_table(
+            cls.__table__.name,
+            schema_name=cls.__table__.schema,
+            columns=columns,
+            records=records,
+        )
+        return len(records)
 
 
-class RawProductEvent(RawEvents):
-    """Legacy alias for RawEvents with compatibility properties."""
+# Legacy models for backward compatibility
+# Plain alias (not a subclass) so no second mapper is configured for core.ingest_runs
+JobExecution = IngestRuns
 
-    @property
-    def event_type(self):
-        """Extract event type from payload for backward compatibility."""
-        return self.payload.get('event_type', 'product_update')
 
-    @property
-    def raw_data(self):
-        """Alias for payload for backward compatibility."""
-        return self.payload
+class RawProductEvent(RawEvents):
+    """Legacy alias for RawEvents with compatibility columns.
 
-    @property
-    def ingested_at(self):
-        """Alias for fetched_at for backward compatibility."""
-        return self.fetched_at
+    The legacy names are mapped as SQL expressions/synonyms rather than Python
+    properties, so ``event_type`` is extracted from the JSONB payload server-side
+    and can be selected on its own without loading the full payload.
+    """
 
-    @property
-    def processed_at(self):
-        """Legacy processed_at property."""
-        return None  # Not in new schema
+    event_type = column_property(
+        func.coalesce(RawEvents.__table__.c.payload["event_type"].astext, "product_update")
+    )
+    raw_data = synonym("payload")
+    ingested_at = synonym("fetched_at")
+    processed_at = None  # Not in new schema
 
 
 # Pydantic models for API requests/responses
@@ -106,8 +165,7 @@ class IngestRunResponse(BaseModel):
     status: str
     meta: Optional[Dict[str, Any]]
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class RawEventRequest(BaseModel):
@@ -126,8 +184,7 @@ class RawEventResponse(BaseModel):
     asin: Optional[str]
     url: Optional[str]
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 # Legacy models for backward compatibility
@@ -181,9 +238,9 @@ class JobExecutionResponse(BaseModel):
 
     @classmethod
     def from_ingest_run(cls, ingest_run: IngestRuns):
-        """Create from IngestRuns model."""
+        """Create from IngestRuns model (trusted DB row, so validation is skipped)."""
         meta = ingest_run.meta or {}
-        return cls(
+        return cls.model_construct(
             job_id=ingest_run.job_id,
             job_name=meta.get('job_name', 'unknown'),
             status=ingest_run.status.lower(),
@@ -195,5 +252,4 @@ class JobExecutionResponse(BaseModel):
             error_message=meta.get('error_message')
         )
 
-    class Config:
-        from_attributes = True
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True)
\ No newline at end of file
@@ -1,15 +1,17 @@
 """Alert detection service for price and BSR anomalies."""
 
-import uuid
-from datetime import datetime, date, timedelta
-from typing import Dict, Any, List, Optional, Tuple
-from sqlalchemy import select, and_
-from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime, date, timedelta, timezone
+from typing import Dict, Any, List, Optional
+from sqlalchemy import (
+    select, insert, and_, or_, func, cast, literal, literal_column, union_all,
+    Numeric, Float, String, Boolean, DateTime
+)
+from sqlalchemy.orm import aliased
 import logging
 
 from src.main.database import get_db_session
 from src.main.models.product import ProductMetricsDaily
-from src.main.models.mart import ProductSummary, PriceAlerts
+from src.main.models.mart import ProductMetricsRollup, PriceAlerts
 
 logger = logging.getLogger(__name__)
 
@@ -17,6 +19,8 @@ logger = logging.getLogger(__name__)
 class AlertRule:
     """Configuration for alert detection rules."""
     
+    __slots__ = ('alert_type', 'threshold_pct', 'severity')
+    
     def __init__(self, alert_type: str, threshold_pct: float, severity: str):
         self.alert_type = alert_type
         self.threshold_pct = threshold_pct
@@ -34,6 +38,24 @@ DEFAULT_ALERT_RULES = [
     AlertRule("bsr_improve", -30.0, "low"),       # BSR improvement > 30%
 ]
 
+# Columns populated by the detection INSERT ... SELECT
+# (message is left NULL and formatted on read by format_alert_message)
+ALERT_INSERT_COLUMNS = (
+    'id', 'asin', 'alert_type', 'severity', 'current_value', 'previous_value',
+    'change_percent', 'threshold_exceeded', 'baseline_value', 'created_at'
+)
+
+# Rollup window whose averages are stored as each alert's baseline_value
+BASELINE_ROLLUP_DURATION = '30d'
+
+# Alert type -> (metric it applies to, whether it fires on increases rather than decreases)
+ALERT_TYPE_DIRECTIONS = {
+    "price_spike": ("price", True),
+    "price_drop": ("price", False),
+    "bsr_jump": ("bsr", True),
+    "bsr_improve": ("bsr", False),
+}
+
 
 class AlertService:
     """Service for detecting and managing product alerts."""
@@ -48,156 +70,130 @@ class AlertService:
         """
         logger.info(f"Processing alerts for {target_date}")
         
-        alerts_created = 0
         previous_date = target_date - timedelta(days=1)
         
         async with get_db_session() as session:
-            # Get products with metrics for both dates
-            comparison_query = select(
-                ProductMetricsDaily.asin,
-                ProductMetricsDaily.price.label('current_price'),
-                ProductMetricsDaily.bsr.label('current_bsr')
-            ).where(ProductMetricsDaily.date == target_date)
-            
-            current_metrics = await session.execute(comparison_query)
-            
-            for current in current_metrics:
-                try:
-                    alerts = await self._detect_product_alerts(
-                        session, current.asin, target_date, previous_date,
-                        current.current_price, current.current_bsr
-                    )
-                    
-                    for alert_data in alerts:
-                        await self._create_alert(session, alert_data)
-                        alerts_created += 1
-                        
-                except Exception as e:
-                    logger.error(f"Failed to process alerts for {current.asin}: {e}")
-            
+            # Detection runs in Postgres: one INSERT ... SELECT compares every product against
+            # every rule, so no metric rows are shipped to Python
+            result = await session.execute(
+                self._build_alert_insert(target_date, previous_date, datetime.now(timezone.utc))
+            )
+            alerts_created = max(result.rowcount or 0, 0)
             await session.commit()
         
         logger.info(f"Created {alerts_created} alerts for {target_date}")
         return alerts_created
     
-    async def _detect_product_alerts(self, session: AsyncSession, asin: str, 
-                                   target_date: date, previous_date: date,
-                                   current_price: Optional[float], 
-                                   current_bsr: Optional[int]) -> List[Dict[str, Any]]:
-        """Detect alerts for a single product."""
-        alerts = []
+    def _build_alert_insert(self, target_date: date, previous_date: date, now: datetime):
+        """
+        Build the INSERT ... SELECT that detects and stores alerts for target_date server-side.
+        Current metrics are joined to previous_date metrics and the 30-day rollup as of target_date
+        (the baseline), unpivoted into one (asin, metric, current, previous, baseline, change_pct)
+        row per metric, and joined to the configured rules - one alert row per rule met.
+        """
+        current = aliased(ProductMetricsDaily, name='curr')
+        previous = aliased(ProductMetricsDaily, name='prev')
+        baseline = aliased(ProductMetricsRollup, name='baseline')
         
-        # Get previous day metrics
-        previous_query = select(ProductMetricsDaily).where(
-            and_(
-                ProductMetricsDaily.asin == asin,
-                ProductMetricsDaily.date == previous_date
+        def metric_changes(metric, current_value, previous_value, baseline_value):
+            # Only metrics present and non-zero on both days can be compared; the numeric 100.0
+            # keeps the percentage exact for integer metrics such as BSR
+            return select(
+                current.asin.label('asin'),
+                literal(metric, String).label('metric'),
+                cast(current_value, Numeric).label('current_value'),
+                cast(previous_value, Numeric).label('previous_value'),
+                func.nullif(baseline_value, 0).label('baseline_value'),
+                ((cast(current_value, Numeric) - previous_value) * literal_column("100.0") / previous_value)
+                .label('change_pct')
+            ).select_from(current).join(
+                previous,
+                and_(previous.asin == current.asin, previous.date == previous_date)
+            ).outerjoin(
+                baseline,
+                and_(
+                    baseline.asin == current.asin,
+                    baseline.duration == BASELINE_ROLLUP_DURATION,
+                    baseline.as_of == target_date
+                )
+            ).where(
+                current.date == target_date,
+                current_value != 0,
+                previous_value != 0
             )
-        )
-        previous_result = await session.execute(previous_query)
-        previous_metrics = previous_result.scalar_one_or_none()
-        
-        if not previous_metrics:
-            return alerts  # No comparison data available
         
-        # Get 30-day baseline from product summary
-        summary_query = select(ProductSummary).where(ProductSummary.asin == asin)
-        summary_result = await session.execute(summary_query)
-        summary = summary_result.scalar_one_or_none()
+        changes = union_all(
+            metric_changes("price", current.price, previous.price, baseline.price_avg),
+            metric_changes("bsr", current.bsr, previous.bsr, baseline.bsr_avg)
+        ).cte('changes')
         
-        # Check price alerts
-        if current_price and previous_metrics.price:
-            price_alerts = self._check_price_alerts(
-                asin, float(current_price), float(previous_metrics.price),
-                float(summary.avg_price_30d) if summary and summary.avg_price_30d else None
-            )
-            alerts.extend(price_alerts)
+        rules = self._rules_relation()
         
-        # Check BSR alerts
-        if current_bsr and previous_metrics.bsr:
-            bsr_alerts = self._check_bsr_alerts(
-                asin, current_bsr, previous_metrics.bsr,
-                float(summary.avg_bsr_30d) if summary and summary.avg_bsr_30d else None
+        detected = select(
+            func.gen_random_uuid(),
+            changes.c.asin,
+            rules.c.alert_type,
+            rules.c.severity,
+            changes.c.current_value,
+            changes.c.previous_value,
+            func.round(changes.c.change_pct, 2),
+            rules.c.threshold_pct,
+            changes.c.baseline_value,
+            literal(now, DateTime(timezone=True))
+        ).select_from(changes).join(
+            rules,
+            and_(
+                rules.c.metric == changes.c.metric,
+                or_(
+                    and_(rules.c.fires_on_increase, changes.c.change_pct >= rules.c.threshold_pct),
+                    and_(~rules.c.fires_on_increase, changes.c.change_pct <= rules.c.threshold_pct)
+                )
             )
-            alerts.extend(bsr_alerts)
+        )
         
-        return alerts
+        return insert(PriceAlerts).from_select(list(ALERT_INSERT_COLUMNS), detected)
     
-    def _check_price_alerts(self, asin: str, current_price: float, 
-                           previous_price: float, baseline_price: Optional[float]) -> List[Dict[str, Any]]:
-        """Check for price-related alerts."""
-        alerts = []
-        
-        # Calculate percentage change
-        price_change_pct = (current_price - previous_price) / previous_price * 100
-        
-        for rule in self.alert_rules:
-            if rule.alert_type in ["price_spike", "price_drop"]:
-                threshold_met = False
-                
-                if rule.alert_type == "price_spike" and price_change_pct >= rule.threshold_pct:
-                    threshold_met = True
-                elif rule.alert_type == "price_drop" and price_change_pct <= rule.threshold_pct:
-                    threshold_met = True
-                
-                if threshold_met:
-                    alert_data = {
-                        'id': str(uuid.uuid4()),
-                        'asin': asin,
-                        'alert_type': rule.alert_type,
-                        'severity': rule.severity,
-                        'current_value': current_price,
-                        'previous_value': previous_price,
-                        'change_percent': round(price_change_pct, 2),
-                        'threshold_exceeded': rule.threshold_pct,
-                        'baseline_value': baseline_price,
-                        'message': self._generate_alert_message(
-                            rule.alert_type, asin, current_price, 
-                            previous_price, price_change_pct
-                        ),
-                        'created_at': datetime.now()
-                    }
-                    alerts.append(alert_data)
+    def _rules_relation(self):
+        """
+        The configured rules as a (alert_type, severity, threshold_pct, metric, fires_on_increase)
+        relation: one SELECT of literals per rule, combined with UNION ALL.
+        """
+        def rule_select(alert_type, severity, threshold_pct, metric, fires_on_increase):
+            return select(
+                literal(alert_type, String).label('alert_type'),
+                literal(severity, String).label('severity'),
+                literal(threshold_pct, Float).label('threshold_pct'),
+                literal(metric, String).label('metric'),
+                literal(fires_on_increase, Boolean).label('fires_on_increase')
+            )
         
-        return alerts
+        rule_selects = [
+            rule_select(rule.alert_type, rule.severity, rule.threshold_pct, *ALERT_TYPE_DIRECTIONS[rule.alert_type])
+            for rule in self.alert_rules if rule.alert_type in ALERT_TYPE_DIRECTIONS
+        ]
+        if not rule_selects:
+            # An all-NULL row matches nothing, keeping the statement valid without rules
+            return rule_select(None, None, None, None, None).subquery('rules')
+        if len(rule_selects) == 1:
+            return rule_selects[0].subquery('rules')
+        return union_all(*rule_selects).subquery('rules')
     
-    def _check_bsr_alerts(self, asin: str, current_bsr: int, 
-                         previous_bsr: int, baseline_bsr: Optional[float]) -> List[Dict[str, Any]]:
-        """Check for BSR-related alerts."""
-        alerts = []
-        
-        # Calculate percentage change (positive = worse rank, negative = better rank)
-        bsr_change_pct = (current_bsr - previous_bsr) / previous_bsr * 100
-        
-        for rule in self.alert_rules:
-            if rule.alert_type in ["bsr_jump", "bsr_improve"]:
-                threshold_met = False
-                
-                if rule.alert_type == "bsr_jump" and bsr_change_pct >= rule.threshold_pct:
-                    threshold_met = True
-                elif rule.alert_type == "bsr_improve" and bsr_change_pct <= rule.threshold_pct:
-                    threshold_met = True
-                
-                if threshold_met:
-                    alert_data = {
-                        'id': str(uuid.uuid4()),
-                        'asin': asin,
-                        'alert_type': rule.alert_type,
-                        'severity': rule.severity,
-                        'current_value': float(current_bsr),
-                        'previous_value': float(previous_bsr),
-                        'change_percent': round(bsr_change_pct, 2),
-                        'threshold_exceeded': rule.threshold_pct,
-                        'baseline_value': baseline_bsr,
-                        'message': self._generate_bsr_alert_message(
-                            rule.alert_type, asin, current_bsr, 
-                            previous_bsr, bsr_change_pct
-                        ),
-                        'created_at': datetime.now()
-                    }
-                    alerts.append(alert_data)
+    def format_alert_message(self, alert: Any) -> str:
+        """
+        Format the human-readable message for a stored alert.
+        Messages are not persisted at detection time; they are built from the alert's columns when read.
+        """
+        metric = ALERT_TYPE_DIRECTIONS.get(alert.alert_type, ("price",))[0]
+        change_pct = alert.change_percent or 0.0
         
-        return alerts
+        if metric == "bsr":
+            return self._generate_bsr_alert_message(
+                alert.alert_type, alert.asin, int(alert.current_value),
+                int(alert.previous_value), change_pct
+            )
+        return self._generate_alert_message(
+            alert.alert_type, alert.asin, alert.current_value, alert.previous_value, change_pct
+        )
     
     def _generate_alert_message(self, alert_type: str, asin: str, 
                               current_price: float, previous_price: float, 
@@ -221,16 +217,11 @@ class AlertService:
         else:
             return f"BSR change detected for {asin}: {change_pct:.1f}% change"
     
-    async def _create_alert(self, session: AsyncSession, alert_data: Dict[str, Any]):
-        """Create alert record in database."""
-        alert = PriceAlerts(**alert_data)
-        session.add(alert)
-    
     async def get_active_alerts(self, asin: Optional[str] = None, 
                               limit: int = 100) -> List[PriceAlerts]:
         """Get active (unresolved) alerts."""
         async with get_db_session() as session:
-            query = select(PriceAlerts).where(PriceAlerts.is_resolved == "false")
+            query = select(PriceAlerts).where(PriceAlerts.is_resolved.is_(False))
             
             if asin:
                 query = query.where(PriceAlerts.asin == asin)
@@ -249,8 +240,8 @@ class AlertService:
                 update(PriceAlerts)
                 .where(PriceAlerts.id == alert_id)
                 .values(
-                    is_resolved="true",
-                    resolved_at=datetime.now(),
+                    is_resolved=True,
+                    resolved_at=datetime.now(timezone.utc),
                     resolved_by=resolved_by
                 )
             )
@@ -259,52 +250,51 @@ class AlertService:
     
     async def get_alert_summary(self, days: int = 7) -> Dict[str, Any]:
         """Get alert summary statistics for the last N days."""
-        cutoff_date = datetime.now() - timedelta(days=days)
+        cutoff_date = datetime.now(timezone.utc) - timedelta(days=days)
         
         async with get_db_session() as session:
-            from sqlalchemy import func
+            from sqlalchemy import tuple_
             
+            # One pass: per (type, severity) rows plus a grand-total row via GROUPING SETS,
+            # with the active count computed alongside by a filtered aggregate
             summary_query = select(
                 PriceAlerts.alert_type,
                 PriceAlerts.severity,
-                func.count().label('count')
+                func.grouping(PriceAlerts.alert_type, PriceAlerts.severity).label('level'),
+                func.count().label('count'),
+                func.count().filter(PriceAlerts.is_resolved.is_(False)).label('active')
             ).where(
                 PriceAlerts.created_at >= cutoff_date
             ).group_by(
-                PriceAlerts.alert_type, 
-                PriceAlerts.severity
+                func.grouping_sets(
+                    tuple_(PriceAlerts.alert_type, PriceAlerts.severity),
+                    tuple_()
+                )
             )
             
             result = await session.execute(summary_query)
-            alert_counts = result.all()
             
-            # Get total counts
-            total_query = select(func.count()).where(PriceAlerts.created_at >= cutoff_date)
-            total_alerts = await session.scalar(total_query)
-            
-            active_query = select(func.count()).where(
-                and_(
-                    PriceAlerts.created_at >= cutoff_date,
-                    PriceAlerts.is_resolved == "false"
-                )
-            )
-            active_alerts = await session.scalar(active_query)
+            total_alerts = 0
+            active_alerts = 0
+            alert_breakdown = []
+            for row in result.all():
+                if row.level:
+                    total_alerts = row.count
+                    active_alerts = row.active
+                else:
+                    alert_breakdown.append({
+                        'alert_type': row.alert_type,
+                        'severity': row.severity, 
+                        'count': row.count
+                    })
             
             return {
                 'total_alerts': total_alerts,
                 'active_alerts': active_alerts,
                 'resolved_alerts': total_alerts - active_alerts,
-                'alert_breakdown': [
-                    {
-                        'alert_type': row.alert_type,
-                        'severity': row.severity, 
-                        'count': row.count
-                    }
-                    for row in alert_counts
-                ],
+                'alert_breakdown': alert_breakdown,
                 'period_days': days
             }
 
-
 # Global alert service instance
 alert_service = AlertService()
\ No newline at end of file
@@ -3,8 +3,12 @@
 import asyncio
 import json
 import logging
+import struct
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import Any, Dict, Optional, Tuple, Callable, Set
+from fnmatch import fnmatchcase
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Callable, Set
 
 # Handle Redis import gracefully - Redis might not be installed in test environments
 try:
@@ -16,48 +20,100 @@ except ImportError:
     RedisError = Exception
     REDIS_AVAILABLE = False
 
+# orjson is much faster on the hot cache path; fall back to stdlib json where it is not installed
+try:
+    import orjson
+    
+    def _dumps(value: Any) -> bytes:
+        return orjson.dumps(value, default=str)
+    
+    def _dumps_text(value: Any) -> str:
+        return orjson.dumps(value, default=str).decode()
+    
+    _loads = orjson.loads
+except ImportError:
+    orjson = None
+    
+    def _dumps(value: Any) -> str:
+        return json.dumps(value, default=str)
+    
+    _dumps_text = _dumps
+    _loads = json.loads
+
+# zstd compression of large cache entries is optional; without it entries are stored uncompressed
+try:
+    import zstandard
+    
+    _zstd_compressor = zstandard.ZstdCompressor(level=3)
+    _zstd_decompressor = zstandard.ZstdDecompressor()
+    ZSTD_AVAILABLE = True
+except ImportError:
+    zstandard = None
+    _zstd_compressor = None
+    _zstd_decompressor = None
+    ZSTD_AVAILABLE = False
+
 from src.main.config import settings
 
 logger = logging.getLogger(__name__)
 
-# Global Redis connections
+# Wire format of cache entries; bump when the to_bytes layout changes.
+# Older layouts (0x01-0x03) fail to decode and are refetched.
+CACHE_FORMAT_VERSION = b"\x04"
+# Header: version, flags, cached_at (epoch microseconds), ttl_seconds, stale_seconds
+_CACHE_HEADER = struct.Struct(">cBqII")
+# Header flag: data payload is zstd-compressed
+CACHE_FLAG_ZSTD = 0x01
+# Payloads smaller than this are not worth the compression overhead
+CACHE_COMPRESS_MIN_BYTES = 2048
+
+# SCAN page size and UNLINK batch size for delete_pattern / delete_by_index
+DELETE_PATTERN_BATCH_SIZE = 500
+
+# Pending background SWR refreshes and the workers draining them (also the per-process
+# cap on concurrent refreshes hitting the origin); refreshes beyond the queue are dropped
+REFRESH_QUEUE_SIZE = 10000
+BACKGROUND_REFRESH_WORKERS = 32
+
+# Pending invalidation messages buffered between the pub/sub reader and its workers
+INVALIDATION_QUEUE_SIZE = 1000
+INVALIDATION_WORKERS = 4
+
+# Tag sets listing every cache key written for a product, so invalidation needs no keyspace SCAN
+PRODUCT_INDEX_KEY = "idx:product:{asin}"
+
+# Global Redis connection pool, shared by cache commands, publishes and the invalidation subscriber
 redis_client: Optional[Any] = None
-redis_pubsub_client: Optional[Any] = None
 
 
 async def init_redis() -> None:
-    """Initialize Redis connections."""
-    global redis_client, redis_pubsub_client
+    """Initialize Redis connection pool."""
+    global redis_client
     
     if not REDIS_AVAILABLE:
         logger.warning("Redis module not available - cache service will work without Redis")
         redis_client = None
-        redis_pubsub_client = None
         return
     
     try:
-        # Main Redis client for caching
-        redis_client = redis.from_url(
+        # Values are binary CacheEntry payloads, so skip UTF-8 decoding.
+        # PUBLISH is a regular command; SUBSCRIBE checks out its own connection from this pool.
+        # The pool blocks at max_connections (up to redis_pool_timeout) instead of raising
+        # "Too many connections" when requests, refresh and invalidation workers peak together
+        pool = redis.BlockingConnectionPool.from_url(
             settings.redis_url,
-            decode_responses=True,
+            decode_responses=False,
+            max_connections=settings.redis_max_connections,
+            timeout=settings.redis_pool_timeout,
             retry_on_timeout=True,
             socket_keepalive=True,
             socket_keepalive_options={},
         )
+        redis_client = redis.Redis(connection_pool=pool)
         
-        # Separate Redis client for pub/sub
-        redis_pubsub_client = redis.from_url(
-            settings.redis_url,
-            decode_responses=True,
-            retry_on_timeout=True,
-            socket_keepalive=True,
-            socket_keepalive_options={},
-        )
-        
-        # Test connections
+        # Test connection
         await redis_client.ping()
-        await redis_pubsub_client.ping()
-        logger.info("Redis connections initialized successfully")
+        logger.info("Redis connection pool initialized successfully")
         
     except RedisError as e:
         logger.error(f"Failed to initialize Redis: {e}")
@@ -68,17 +124,13 @@ async def init_redis() -> None:
 
 
 async def close_redis() -> None:
-    """Close Redis connections."""
-    global redis_client, redis_pubsub_client
+    """Close Redis connection pool."""
+    global redis_client
     
     if redis_client:
         await redis_client.close()
         redis_client = None
     
-    if redis_pubsub_client:
-        await redis_pubsub_client.close()
-        redis_pubsub_client = None
-    
     logger.info("Redis connections closed")
 
 
@@ -101,11 +153,62 @@ async def check_redis_health() -> bool:
 class CacheEntry:
     """Cache entry with metadata for SWR pattern."""
     
+    # One entry is built per cache read - slots skip the per-instance __dict__
+    __slots__ = ('_data', '_payload', '_compressed', 'ttl_seconds', 'stale_seconds',
+                 '_cached_at', '_cached_us', '_expires_ts', '_stale_ts')
+    
     def __init__(self, data: Any, cached_at: datetime, ttl_seconds: int, stale_seconds: int):
-        self.data = data
-        self.cached_at = cached_at
+        self._data = data
+        self._payload = None
+        self._compressed = False
         self.ttl_seconds = ttl_seconds
         self.stale_seconds = stale_seconds
+        self._cached_at = cached_at
+        self._set_cached_us(round(cached_at.timestamp() * 1_000_000))
+    
+    @classmethod
+    def from_timestamp(cls, data: Any, cached_us: int, ttl_seconds: int, stale_seconds: int) -> "CacheEntry":
+        """Create from an epoch timestamp in integer microseconds; cached_at is only built if read."""
+        entry = cls.__new__(cls)
+        entry._data = data
+        entry._payload = None
+        entry._compressed = False
+        entry.ttl_seconds = ttl_seconds
+        entry.stale_seconds = stale_seconds
+        entry._cached_at = None
+        entry._set_cached_us(cached_us)
+        return entry
+    
+    def _set_cached_us(self, cached_us: int) -> None:
+        # Epoch deadlines, so freshness checks are float compares against one time.time() per cache op
+        self._cached_us = cached_us
+        cached_ts = cached_us / 1_000_000
+        self._expires_ts = cached_ts + self.ttl_seconds
+        self._stale_ts = cached_ts + self.stale_seconds
+    
+    @property
+    def data(self) -> Any:
+        """Cached value; entries read with from_bytes decode their payload on first access."""
+        if self._payload is not None:
+            payload = self._payload
+            if self._compressed:
+                if not ZSTD_AVAILABLE:
+                    raise ValueError("Compressed cache entry but zstandard is not installed")
+                try:
+                    payload = _zstd_decompressor.decompress(payload)
+                except zstandard.ZstdError as e:
+                    raise ValueError(f"Corrupt compressed cache entry: {e}") from e
+            self._data = _loads(payload)
+            self._payload = None
+        return self._data
+    
+    @property
+    def cached_at(self) -> datetime:
+        """When the entry was cached (local naive time, like datetime.now())."""
+        if self._cached_at is None:
+            seconds, microseconds = divmod(self._cached_us, 1_000_000)
+            self._cached_at = datetime.fromtimestamp(seconds).replace(microsecond=microseconds)
+        return self._cached_at
     
     @property
     def expires_at(self) -> datetime:
@@ -117,15 +220,13 @@ class CacheEntry:
         """When the cache entry becomes stale (soft expiration for SWR)."""
         return self.cached_at + timedelta(seconds=self.stale_seconds)
     
-    @property
-    def is_expired(self) -> bool:
-        """Check if cache entry is hard expired."""
-        return datetime.now() > self.expires_at
+    def is_expired(self, now_ts: Optional[float] = None) -> bool:
+        """Check if cache entry is hard expired at now_ts (epoch seconds, defaults to now)."""
+        return (time.time() if now_ts is None else now_ts) > self._expires_ts
     
-    @property
-    def is_stale(self) -> bool:
-        """Check if cache entry is stale (needs background refresh)."""
-        return datetime.now() > self.stale_at
+    def is_stale(self, now_ts: Optional[float] = None) -> bool:
+        """Check if cache entry is stale (needs background refresh) at now_ts (epoch seconds, defaults to now)."""
+        return (time.time() if now_ts is None else now_ts) > self._stale_ts
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary for JSON serialization."""
@@ -145,6 +246,47 @@ class CacheEntry:
             ttl_seconds=data["ttl_seconds"],
             stale_seconds=data["stale_seconds"],
         )
+    
+    def to_bytes(self) -> bytes:
+        """
+        Encode for Redis: a fixed binary header (version, flags, cached_at as epoch microseconds,
+        ttl, stale) followed by the JSON-encoded data, zstd-compressed when large.
+        """
+        payload = _dumps(self.data)
+        if isinstance(payload, str):
+            payload = payload.encode()
+        
+        flags = 0
+        if ZSTD_AVAILABLE and len(payload) > CACHE_COMPRESS_MIN_BYTES:
+            payload = _zstd_compressor.compress(payload)
+            flags |= CACHE_FLAG_ZSTD
+        
+        return _CACHE_HEADER.pack(
+            CACHE_FORMAT_VERSION, flags, self._cached_us, self.ttl_seconds, self.stale_seconds
+        ) + payload
+    
+    @classmethod
+    def from_bytes(cls, raw: Any) -> "CacheEntry":
+        """
+        Decode a Redis value written by to_bytes, or a legacy to_dict JSON entry.
+        Only the fixed header is parsed here - freshness checks need no JSON decoding and
+        the data payload is decoded on first access, so expired entries are never decoded.
+        """
+        if isinstance(raw, str):
+            raw = raw.encode()
+        
+        if raw[:1] != CACHE_FORMAT_VERSION:
+            return cls.from_dict(_loads(raw))
+        
+        try:
+            _, flags, cached_us, ttl_seconds, stale_seconds = _CACHE_HEADER.unpack_from(raw)
+        except struct.error as e:
+            raise ValueError(f"Truncated cache entry header: {e}") from e
+        
+        entry = cls.from_timestamp(None, cached_us, ttl_seconds, stale_seconds)
+        entry._payload = raw[_CACHE_HEADER.size:]
+        entry._compressed = bool(flags & CACHE_FLAG_ZSTD)
+        return entry
 
 
 class CacheService:
@@ -153,6 +295,16 @@ class CacheService:
     def __init__(self):
         self._background_tasks = set()
         self._invalidation_listeners: Set[Callable] = set()
+        # In-flight fetch-and-set tasks per key, shared by concurrent misses (singleflight)
+        self._inflight: Dict[str, asyncio.Task] = {}
+        # Keys with a stale-while-revalidate refresh already scheduled
+        self._refreshing: Set[str] = set()
+        # Refresh jobs drained by long-lived workers, started lazily on the running loop
+        self._refresh_queue: Optional[asyncio.Queue] = None
+        self._refresh_loop: Optional[asyncio.AbstractEventLoop] = None
+        # In-process L1: fresh entries served without a Redis round trip until they go stale
+        self._l1: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._l1_max_entries = settings.cache_l1_max_entries
     
     async def get_or_set(
         self,
@@ -160,9 +312,11 @@ class CacheService:
         fetch_func: Callable[[], Any],
         ttl_seconds: Optional[int] = None,
         stale_seconds: Optional[int] = None,
+        index_keys: Sequence[str] = (),
     ) -> Tuple[Any, bool, Optional[datetime]]:
         """
         Get value from cache or fetch and set it.
+        index_keys name tag sets the key is added to on write, for delete_by_index.
         Returns: (value, cached, stale_at)
         """
         if not redis_client:
@@ -173,43 +327,49 @@ class CacheService:
         ttl_seconds = ttl_seconds or settings.cache_ttl_seconds
         stale_seconds = stale_seconds or settings.cache_stale_seconds
         
+        now_ts = time.time()
+        entry = self._l1_get(key, now_ts)
+        if entry is not None:
+            logger.debug(f"L1 cache hit for key: {key}")
+            return entry.data, True, entry.stale_at
+        
         try:
             # Try to get from cache
             cached_data = await redis_client.get(key)
             
             if cached_data:
                 try:
-                    entry = CacheEntry.from_dict(json.loads(cached_data))
+                    entry = CacheEntry.from_bytes(cached_data)
                     
-                    # Check if hard expired
-                    if entry.is_expired:
+                    # Check if hard expired. Redis drops the key itself at the same deadline (SETEX ttl)
+                    # and the refetch overwrites it, so no DELETE round trip is spent on it here
+                    if entry.is_expired(now_ts):
                         logger.debug(f"Cache entry expired for key: {key}")
-                        # Remove expired entry and fetch fresh data
-                        await redis_client.delete(key)
-                        data = await fetch_func()
-                        await self._set_cache(key, data, ttl_seconds, stale_seconds)
+                        data = await self._fetch_once(key, fetch_func, ttl_seconds, stale_seconds, index_keys)
                         return data, False, None
                     
+                    # Payload is only decoded once the entry is known to be usable
+                    data = entry.data
+                    
                     # Check if stale (needs background refresh)
-                    if entry.is_stale:
+                    if entry.is_stale(now_ts):
                         logger.debug(f"Cache entry stale for key: {key}, refreshing in background")
                         # Return stale data immediately and refresh in background
-                        self._schedule_background_refresh(key, fetch_func, ttl_seconds, stale_seconds)
-                        return entry.data, True, entry.stale_at
+                        self._schedule_background_refresh(key, fetch_func, ttl_seconds, stale_seconds, index_keys)
+                        return data, True, entry.stale_at
                     
                     # Fresh cache hit
                     logger.debug(f"Cache hit for key: {key}")
-                    return entry.data, True, entry.stale_at
+                    self._l1_put(key, entry)
+                    return data, True, entry.stale_at
                     
                 except (json.JSONDecodeError, KeyError, ValueError) as e:
+                    # Treated as a miss; the SETEX below overwrites the invalid entry
                     logger.warning(f"Invalid cache entry for key {key}: {e}")
-                    # Remove invalid entry
-                    await redis_client.delete(key)
             
             # Cache miss - fetch and set
             logger.debug(f"Cache miss for key: {key}")
-            data = await fetch_func()
-            await self._set_cache(key, data, ttl_seconds, stale_seconds)
+            data = await self._fetch_once(key, fetch_func, ttl_seconds, stale_seconds, index_keys)
             return data, False, None
             
         except RedisError as e:
@@ -218,24 +378,134 @@ class CacheService:
             data = await fetch_func()
             return data, False, None
     
-    async def _set_cache(self, key: str, data: Any, ttl_seconds: int, stale_seconds: int) -> None:
-        """Set cache entry with metadata."""
+    async def get_many(
+        self,
+        keys: List[str],
+        fetch_many_func: Optional[Callable[[List[str]], Any]] = None,
+        ttl_seconds: Optional[int] = None,
+        stale_seconds: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """
+        Batched get_or_set: one MGET for all keys, one fetch_many_func(missing_keys) call
+        for the misses and one pipelined SETEX round trip to cache them.
+        fetch_many_func returns a {key: value} dict; stale hits are served and refreshed
+        in the background like get_or_set. Returns {key: value} for every key found or fetched.
+        Without fetch_many_func this is a read-only batched get: misses are left out.
+        """
+        if not keys:
+            return {}
+        
+        if not redis_client:
+            return await fetch_many_func(list(keys)) if fetch_many_func else {}
+        
+        ttl_seconds = ttl_seconds or settings.cache_ttl_seconds
+        stale_seconds = stale_seconds or settings.cache_stale_seconds
+        
+        try:
+            results = {}
+            missing = []
+            now_ts = time.time()
+            
+            for key, cached_data in zip(keys, await redis_client.mget(keys)):
+                entry = None
+                if cached_data:
+                    try:
+                        entry = CacheEntry.from_bytes(cached_data)
+                    except (json.JSONDecodeError, KeyError, ValueError) as e:
+                        logger.warning(f"Invalid cache entry for key {key}: {e}")
+                
+                if entry is None or entry.is_expired(now_ts):
+                    missing.append(key)
+                    continue
+                
+                try:
+                    results[key] = entry.data
+                except (json.JSONDecodeError, ValueError) as e:
+                    logger.warning(f"Invalid cache entry for key {key}: {e}")
+                    missing.append(key)
+                    continue
+                
+                if entry.is_stale(now_ts) and fetch_many_func:
+                    async def _fetch_key(key=key):
+                        return (await fetch_many_func([key])).get(key)
+                    
+                    self._schedule_background_refresh(key, _fetch_key, ttl_seconds, stale_seconds)
+            
+            if missing and fetch_many_func:
+                logger.debug(f"Cache miss for {len(missing)} of {len(keys)} keys")
+                fetched = await fetch_many_func(missing)
+                
+                if fetched:
+                    cached_us = time.time_ns() // 1000
+                    pipe = redis_client.pipeline(transaction=False)
+                    for key, data in fetched.items():
+                        self._l1.pop(key, None)
+                        entry = CacheEntry.from_timestamp(
+                            data=data,
+                            cached_us=cached_us,
+                            ttl_seconds=ttl_seconds,
+                            stale_seconds=stale_seconds,
+                        )
+                        pipe.setex(key, ttl_seconds, entry.to_bytes())
+                    await pipe.execute()
+                    results.update(fetched)
+            
+            return results
+        
+        except RedisError as e:
+            logger.error(f"Redis error for {len(keys)} keys: {e}")
+            # Fall back to direct fetch
+            return await fetch_many_func(list(keys)) if fetch_many_func else {}
+
+    async def _fetch_once(
+        self,
+        key: str,
+        fetch_func: Callable[[], Any],
+        ttl_seconds: int,
+        stale_seconds: int,
+        index_keys: Sequence[str] = (),
+    ) -> Any:
+        """
+        Fetch and cache key, collapsing concurrent misses into a single fetch_func call.
+        Waiters share one task through asyncio.shield, so a cancelled request does not
+        cancel the fetch for the others.
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            async def _fetch_and_set():
+                data = await fetch_func()
+                await self._set_cache(key, data, ttl_seconds, stale_seconds, index_keys)
+                return data
+            
+            task = asyncio.create_task(_fetch_and_set())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        
+        return await asyncio.shield(task)
+    
+    async def _set_cache(self, key: str, data: Any, ttl_seconds: int, stale_seconds: int,
+                         index_keys: Sequence[str] = ()) -> None:
+        """Set cache entry with metadata, adding key to each tag set in index_keys."""
         if not redis_client:
             return
         
         try:
-            entry = CacheEntry(
+            entry = CacheEntry.from_timestamp(
                 data=data,
-                cached_at=datetime.now(),
+                cached_us=time.time_ns() // 1000,
                 ttl_seconds=ttl_seconds,
                 stale_seconds=stale_seconds,
             )
             
-            await redis_client.setex(
-                key,
-                ttl_seconds,
-                json.dumps(entry.to_dict(), default=str)
-            )
+            if index_keys:
+                await self._setex_indexed(key, ttl_seconds, entry.to_bytes(), index_keys)
+            else:
+                await redis_client.setex(
+                    key,
+                    ttl_seconds,
+                    entry.to_bytes()
+                )
+            self._l1_put(key, entry)
             logger.debug(f"Cache set for key: {key}")
             
         except RedisError as e:
@@ -243,19 +513,89 @@ class CacheService:
         except (TypeError, ValueError) as e:
             logger.error(f"Failed to serialize data for key {key}: {e}")
     
+    def _l1_get(self, key: str, now_ts: float) -> Optional[CacheEntry]:
+        """Return the L1 entry for key while it is fresh; stale entries are dropped so Redis decides."""
+        entry = self._l1.get(key)
+        if entry is None:
+            return None
+        
+        if entry.is_stale(now_ts):
+            del self._l1[key]
+            return None
+        
+        self._l1.move_to_end(key)
+        return entry
+    
+    def _l1_put(self, key: str, entry: CacheEntry) -> None:
+        """Store entry in L1, evicting the least recently used key beyond capacity."""
+        if self._l1_max_entries <= 0:
+            return
+        
+        self._l1[key] = entry
+        self._l1.move_to_end(key)
+        if len(self._l1) > self._l1_max_entries:
+            self._l1.popitem(last=False)
+    
+    def _l1_discard_pattern(self, pattern: str) -> None:
+        """Drop L1 entries matching a Redis glob pattern."""
+        for key in [key for key in self._l1 if fnmatchcase(key, pattern)]:
+            del self._l1[key]
+    
+    async def _setex_indexed(self, key: str, ttl_seconds: int, value: bytes, index_keys: Sequence[str]) -> None:
+        """SETEX key and add it to each tag set in one pipelined round trip; tag sets live as long as their newest member."""
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.setex(key, ttl_seconds, value)
+        for index_key in index_keys:
+            pipe.sadd(index_key, key)
+            pipe.expire(index_key, ttl_seconds)
+        await pipe.execute()
+    
     def _schedule_background_refresh(
         self,
         key: str,
         fetch_func: Callable[[], Any],
         ttl_seconds: int,
         stale_seconds: int,
+        index_keys: Sequence[str] = (),
     ) -> None:
-        """Schedule background refresh of cache entry."""
-        task = asyncio.create_task(
-            self._background_refresh(key, fetch_func, ttl_seconds, stale_seconds)
-        )
-        self._background_tasks.add(task)
-        task.add_done_callback(self._background_tasks.discard)
+        """
+        Queue a background refresh of cache entry, unless one is already pending for key.
+        The refresh is dropped when the queue is full; the next stale hit queues it again.
+        """
+        if key in self._refreshing:
+            return
+        
+        try:
+            self._ensure_refresh_workers().put_nowait(
+                (key, fetch_func, ttl_seconds, stale_seconds, index_keys)
+            )
+        except asyncio.QueueFull:
+            logger.debug(f"Refresh queue full, dropping background refresh for key: {key}")
+            return
+        self._refreshing.add(key)
+    
+    def _ensure_refresh_workers(self) -> asyncio.Queue:
+        """Return the refresh queue, starting its workers on first use in the running loop."""
+        loop = asyncio.get_running_loop()
+        if self._refresh_queue is None or self._refresh_loop is not loop:
+            self._refresh_queue = asyncio.Queue(maxsize=REFRESH_QUEUE_SIZE)
+            self._refresh_loop = loop
+            self._refreshing.clear()
+            for _ in range(BACKGROUND_REFRESH_WORKERS):
+                task = asyncio.create_task(self._refresh_worker(self._refresh_queue))
+                self._background_tasks.add(task)
+                task.add_done_callback(self._background_tasks.discard)
+        return self._refresh_queue
+    
+    async def _refresh_worker(self, queue: asyncio.Queue) -> None:
+        """Run queued background refreshes until cancelled."""
+        while True:
+            key, fetch_func, ttl_seconds, stale_seconds, index_keys = await queue.get()
+            try:
+                await self._background_refresh(key, fetch_func, ttl_seconds, stale_seconds, index_keys)
+            finally:
+                self._refreshing.discard(key)
+                queue.task_done()
     
     async def _background_refresh(
         self,
@@ -263,18 +603,20 @@ class CacheService:
         fetch_func: Callable[[], Any],
         ttl_seconds: int,
         stale_seconds: int,
+        index_keys: Sequence[str] = (),
     ) -> None:
         """Background refresh of cache entry."""
         try:
             logger.debug(f"Background refreshing cache for key: {key}")
             data = await fetch_func()
-            await self._set_cache(key, data, ttl_seconds, stale_seconds)
+            await self._set_cache(key, data, ttl_seconds, stale_seconds, index_keys)
             logger.debug(f"Background refresh completed for key: {key}")
         except Exception as e:
             logger.error(f"Background refresh failed for key {key}: {e}")
     
     async def delete(self, key: str) -> bool:
         """Delete cache entry."""
+        self._l1.pop(key, None)
         if not redis_client:
             return False
         
@@ -286,19 +628,62 @@ class CacheService:
             return False
     
     async def delete_pattern(self, pattern: str) -> int:
-        """Delete all keys matching pattern."""
+        """
+        Delete all keys matching pattern.
+        Uses incremental SCAN instead of blocking KEYS, and UNLINKs matches in batches
+        queued on one non-transactional pipeline so memory is reclaimed off the main thread.
+        Matching L1 entries are dropped too, so pub/sub invalidations clear every process's L1.
+        """
+        self._l1_discard_pattern(pattern)
         if not redis_client:
             return 0
         
         try:
-            keys = await redis_client.keys(pattern)
-            if keys:
-                return await redis_client.delete(*keys)
-            return 0
+            pipe = redis_client.pipeline(transaction=False)
+            batch = []
+            
+            async for key in redis_client.scan_iter(match=pattern, count=DELETE_PATTERN_BATCH_SIZE):
+                batch.append(key)
+                if len(batch) >= DELETE_PATTERN_BATCH_SIZE:
+                    pipe.unlink(*batch)
+                    batch = []
+            
+            if batch:
+                pipe.unlink(*batch)
+            
+            return sum(await pipe.execute())
         except RedisError as e:
             logger.error(f"Failed to delete keys with pattern {pattern}: {e}")
             return 0
     
+    async def delete_by_index(self, index_key: str) -> int:
+        """
+        Delete every key recorded in the tag set index_key, and the set itself.
+        Costs O(keys in the set) instead of a SCAN over the whole keyspace.
+        """
+        return len(await self._unlink_index(index_key))
+    
+    async def _unlink_index(self, index_key: str) -> List[str]:
+        """UNLINK the keys in the tag set index_key and the set, drop them from L1 and return them."""
+        if not redis_client:
+            return []
+        
+        try:
+            keys = [key.decode() if isinstance(key, bytes) else key
+                    for key in await redis_client.smembers(index_key)]
+            for key in keys:
+                self._l1.pop(key, None)
+            
+            pipe = redis_client.pipeline(transaction=False)
+            for start in range(0, len(keys), DELETE_PATTERN_BATCH_SIZE):
+                pipe.unlink(*keys[start:start + DELETE_PATTERN_BATCH_SIZE])
+            pipe.unlink(index_key)
+            await pipe.execute()
+            return keys
+        except RedisError as e:
+            logger.error(f"Failed to delete keys indexed by {index_key}: {e}")
+            return []
+    
     async def get(self, key: str) -> Any:
         """Get value from cache (simple get without SWR pattern)."""
         if not redis_client:
@@ -308,12 +693,10 @@ class CacheService:
             cached_data = await redis_client.get(key)
             if cached_data:
                 try:
-                    entry = CacheEntry.from_dict(json.loads(cached_data))
-                    if not entry.is_expired:
+                    entry = CacheEntry.from_bytes(cached_data)
+                    # Expired entries are left to Redis' own TTL, which ends at the same deadline
+                    if not entry.is_expired():
                         return entry.data
-                    else:
-                        # Clean up expired entry
-                        await redis_client.delete(key)
                 except (json.JSONDecodeError, KeyError, ValueError) as e:
                     logger.warning(f"Invalid cache entry for key {key}: {e}")
                     await redis_client.delete(key)
@@ -322,25 +705,29 @@ class CacheService:
             logger.error(f"Redis error for key {key}: {e}")
             return None
     
-    async def set(self, key: str, value: Any, ttl: int = None) -> bool:
-        """Set value in cache (simple set without SWR metadata)."""
+    async def set(self, key: str, value: Any, ttl: int = None, index_keys: Sequence[str] = ()) -> bool:
+        """Set value in cache (simple set without SWR metadata), adding key to each tag set in index_keys."""
+        self._l1.pop(key, None)
         if not redis_client:
             return False
         
         try:
             ttl = ttl or settings.cache_ttl_seconds
-            entry = CacheEntry(
+            entry = CacheEntry.from_timestamp(
                 data=value,
-                cached_at=datetime.now(),
+                cached_us=time.time_ns() // 1000,
                 ttl_seconds=ttl,
                 stale_seconds=ttl // 2  # Default stale time is half of TTL
             )
             
-            await redis_client.setex(
-                key,
-                ttl,
-                json.dumps(entry.to_dict(), default=str)
-            )
+            if index_keys:
+                await self._setex_indexed(key, ttl, entry.to_bytes(), index_keys)
+            else:
+                await redis_client.setex(
+                    key,
+                    ttl,
+                    entry.to_bytes()
+                )
             logger.debug(f"Cache set for key: {key}")
             return True
             
@@ -351,27 +738,62 @@ class CacheService:
             logger.error(f"Failed to serialize data for key {key}: {e}")
             return False
     
-    async def publish_invalidation(self, pattern: str, reason: str = "update") -> bool:
+    async def get_raw(self, key: str) -> Optional[bytes]:
+        """
+        Get raw bytes stored with set_raw: a plain GET with no CacheEntry envelope to decode.
+        Only for keys that are never read through get_or_set/get.
+        """
+        if not redis_client:
+            return None
+        
+        try:
+            return await redis_client.get(key)
+        except RedisError as e:
+            logger.error(f"Redis error for key {key}: {e}")
+            return None
+    
+    async def set_raw(self, key: str, value: bytes, ttl: int = None) -> bool:
+        """
+        Store raw bytes without SWR metadata; expiry is left entirely to the Redis TTL.
+        Only for keys that are never read through get_or_set/get.
+        """
+        if not redis_client:
+            return False
+        
+        try:
+            await redis_client.setex(key, ttl or settings.cache_ttl_seconds, value)
+            logger.debug(f"Cache set for key: {key}")
+            return True
+        except RedisError as e:
+            logger.error(f"Failed to set cache for key {key}: {e}")
+            return False
+    
+    async def publish_invalidation(self, pattern: str, reason: str = "update",
+                                   keys: Optional[Sequence[str]] = None) -> bool:
         """
         Publish cache invalidation event.
         
         Args:
             pattern: Cache key pattern to invalidate (supports wildcards)
             reason: Reason for invalidation (for logging)
+            keys: Exact keys the publisher already deleted from Redis; subscribers only
+                drop them from their L1 instead of scanning for pattern
         """
-        if not redis_pubsub_client:
+        if not redis_client:
             return False
         
         try:
             message = {
                 'pattern': pattern,
                 'reason': reason,
-                'timestamp': datetime.now().isoformat()
+                'timestamp': datetime.now()  # serialized natively by orjson
             }
+            if keys is not None:
+                message['keys'] = list(keys)
             
-            await redis_pubsub_client.publish(
+            await redis_client.publish(
                 'cache_invalidation',
-                json.dumps(message)
+                _dumps_text(message)
             )
             
             logger.info(f"Published cache invalidation for pattern: {pattern} (reason: {reason})")
@@ -382,13 +804,27 @@ class CacheService:
             return False
     
     async def subscribe_to_invalidations(self) -> None:
-        """Subscribe to cache invalidation events and process them."""
-        if not redis_pubsub_client:
+        """
+        Subscribe to cache invalidation events and process them.
+        The reader only enqueues messages; a small worker pool deletes keys and notifies
+        listeners, so a slow listener or a large delete never stalls the subscription.
+        Messages arriving while the queue is full are coalesced by pattern instead of
+        dropped, and the workers apply each coalesced pattern once after their next message.
+        """
+        if not redis_client:
             logger.warning("Redis pub/sub not available for cache invalidation")
             return
         
+        queue: asyncio.Queue = asyncio.Queue(maxsize=INVALIDATION_QUEUE_SIZE)
+        # Overflowed invalidations: pattern -> keys to drop from L1, or None to delete the pattern
+        coalesced: Dict[str, Optional[Set[str]]] = {}
+        workers = [
+            asyncio.create_task(self._invalidation_worker(queue, coalesced))
+            for _ in range(INVALIDATION_WORKERS)
+        ]
+        
         try:
-            pubsub = redis_pubsub_client.pubsub()
+            pubsub = redis_client.pubsub()
             await pubsub.subscribe('cache_invalidation')
             
             logger.info("Subscribed to cache invalidation events")
@@ -396,31 +832,85 @@ class CacheService:
             async for message in pubsub.listen():
                 if message['type'] == 'message':
                     try:
-                        data = json.loads(message['data'])
-                        pattern = data['pattern']
-                        reason = data.get('reason', 'unknown')
-                        
-                        # Invalidate matching cache keys
-                        deleted_count = await self.delete_pattern(pattern)
-                        
-                        logger.info(f"Invalidated {deleted_count} cache keys for pattern: {pattern} (reason: {reason})")
-                        
-                        # Notify listeners
-                        for listener in self._invalidation_listeners:
-                            try:
-                                await listener(pattern, reason, deleted_count)
-                            except Exception as e:
-                                logger.error(f"Error in invalidation listener: {e}")
-                                
-                    except json.JSONDecodeError as e:
-                        logger.error(f"Invalid invalidation message: {e}")
-                    except Exception as e:
-                        logger.error(f"Error processing invalidation message: {e}")
+                        queue.put_nowait(message['data'])
+                    except asyncio.QueueFull:
+                        self._coalesce_invalidation(coalesced, message['data'])
                         
         except RedisError as e:
             logger.error(f"Redis error in invalidation subscription: {e}")
         except Exception as e:
             logger.error(f"Unexpected error in invalidation subscription: {e}")
+        finally:
+            for worker in workers:
+                worker.cancel()
+    
+    async def _invalidation_worker(self, queue: asyncio.Queue, coalesced: Dict[str, Optional[Set[str]]]) -> None:
+        """Process queued invalidation messages, then any coalesced overflow, until cancelled."""
+        while True:
+            raw = await queue.get()
+            try:
+                await self._process_invalidation(raw)
+                # Overflow only happens while the queue is full, so a message processed after it
+                # is always left to drain it
+                while coalesced:
+                    pattern, keys = coalesced.popitem()
+                    await self._apply_invalidation(pattern, "coalesced", keys)
+            except Exception as e:
+                logger.error(f"Error processing coalesced invalidations: {e}")
+            finally:
+                queue.task_done()
+    
+    def _coalesce_invalidation(self, coalesced: Dict[str, Optional[Set[str]]], raw: Any) -> None:
+        """Merge an invalidation message that did not fit in the queue into the coalesced set."""
+        try:
+            data = _loads(raw)
+            pattern = data['pattern']
+        except Exception as e:
+            logger.error(f"Invalid invalidation message: {e}")
+            return
+        
+        keys = data.get('keys')
+        if keys is None:
+            # A pattern delete covers any keyed invalidation of the same pattern
+            coalesced[pattern] = None
+        elif pattern not in coalesced:
+            coalesced[pattern] = set(keys)
+        elif coalesced[pattern] is not None:
+            coalesced[pattern].update(keys)
+        logger.debug(f"Invalidation queue full, coalesced pattern: {pattern}")
+    
+    async def _process_invalidation(self, raw: Any) -> None:
+        """Apply one invalidation message."""
+        try:
+            data = _loads(raw)
+            await self._apply_invalidation(data['pattern'], data.get('reason', 'unknown'), data.get('keys'))
+        except json.JSONDecodeError as e:
+            logger.error(f"Invalid invalidation message: {e}")
+        except Exception as e:
+            logger.error(f"Error processing invalidation message: {e}")
+    
+    async def _apply_invalidation(self, pattern: str, reason: str,
+                                  keys: Optional[Sequence[str]] = None) -> None:
+        """Invalidate pattern (or just the given keys), then notify all listeners concurrently."""
+        # Invalidate matching cache keys
+        if keys is not None:
+            # Already deleted from Redis by the publisher; only this process's L1 copies remain
+            for key in keys:
+                self._l1.pop(key, None)
+            deleted_count = len(keys)
+        else:
+            deleted_count = await self.delete_pattern(pattern)
+        
+        logger.info(f"Invalidated {deleted_count} cache keys for pattern: {pattern} (reason: {reason})")
+        
+        # Notify listeners
+        results = await asyncio.gather(
+            *(listener(pattern, reason, deleted_count) for listener in list(self._invalidation_listeners)),
+            return_exceptions=True,
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                logger.error(f"Error in invalidation listener: {result}")
     
     def add_invalidation_listener(self, listener: Callable) -> None:
         """Add a listener for cache invalidation events."""
@@ -431,9 +921,14 @@ class CacheService:
         self._invalidation_listeners.discard(listener)
     
     async def invalidate_product_cache(self, asin: str) -> bool:
-        """Invalidate all cache entries for a specific product."""
-        pattern = f"product:{asin}:*"
-        return await self.publish_invalidation(pattern, f"product_update:{asin}")
+        """
+        Invalidate all cache entries for a specific product via its tag set.
+        The set is read and unlinked here, once; the broadcast carries the deleted keys so
+        every subscriber clears its own L1 without racing the others for the set.
+        """
+        index_key = PRODUCT_INDEX_KEY.format(asin=asin)
+        keys = await self._unlink_index(index_key)
+        return await self.publish_invalidation(index_key, f"product_update:{asin}", keys=keys)
     
     async def invalidate_competition_cache(self, asin_main: str) -> bool:
         """Invalidate all competition cache entries for a main product."""
@@ -447,7 +942,7 @@ class CacheService:
     
     async def start_invalidation_listener(self) -> None:
         """Start the background invalidation listener."""
-        if not redis_pubsub_client:
+        if not redis_client:
             logger.warning("Cannot start invalidation listener - Redis pub/sub not available")
             return
         
@@ -1,10 +1,10 @@
 """Competitor comparison service for competition analysis."""
 
-from datetime import datetime, date, timedelta
+from collections import defaultdict
+from datetime import datetime, date, timedelta, timezone
 from typing import Dict, Any, List, Optional, Tuple
-from sqlalchemy import select, insert, update, and_
+from sqlalchemy import select, delete, and_, values, column, cast, func, Float, String
 from sqlalchemy.dialects.postgresql import insert as pg_insert
-from sqlalchemy.ext.asyncio import AsyncSession
 import logging
 
 from src.main.database import get_db_session
@@ -15,6 +15,20 @@ from src.main.services.cache import cache
 
 logger = logging.getLogger(__name__)
 
+# Competitor ASINs per main product; links change rarely and every write below invalidates the key
+COMPETITOR_LINKS_CACHE_KEY = "competitor_links:{asin_main}"
+COMPETITOR_LINKS_CACHE_TTL = 3600
+
+# Serialized GET /v1/competitions/{asin_main} responses, stored with cache.set_raw and served as-is
+# (the :raw suffix keeps them apart from CacheEntry-wrapped values). The link endpoints clear
+# competition:{asin}:* on setup/remove; calculate_daily_comparisons and mart population clear it
+# after writing the comparisons the responses embed.
+COMPETITION_RESPONSE_CACHE_KEY = "competition:{asin_main}:{days_back}d:raw"
+COMPETITION_RESPONSE_CACHE_TTL = 14400
+
+# Rows per multi-row comparison UPSERT, keeping each statement well under Postgres' bind parameter limit
+COMPARISON_UPSERT_BATCH_SIZE = 1000
+
 
 class ComparisonError(Exception):
     """Exception raised during comparison processing."""
@@ -29,76 +43,80 @@ class CompetitorComparisonService:
         Setup competitor relationships for a main product.
         Returns count of new links created.
         """
-        created_count = 0
+        if asin_main in competitor_asins:
+            logger.warning(f"Skipping self-reference: {asin_main}")
+        
+        now = datetime.now(timezone.utc)
+        rows = [
+            {'asin_main': asin_main, 'asin_comp': comp_asin, 'created_at': now}
+            for comp_asin in dict.fromkeys(competitor_asins)
+            if comp_asin != asin_main
+        ]
+        if not rows:
+            return 0
         
         async with get_db_session() as session:
-            for comp_asin in competitor_asins:
-                if comp_asin == asin_main:
-                    logger.warning(f"Skipping self-reference: {asin_main}")
-                    continue
-                
-                # Use INSERT ON CONFLICT DO NOTHING for idempotency
-                stmt = pg_insert(CompetitorLink).values(
-                    asin_main=asin_main,
-                    asin_comp=comp_asin,
-                    created_at=datetime.now()
-                )
-                stmt = stmt.on_conflict_do_nothing()
-                
-                result = await session.execute(stmt)
-                if result.rowcount > 0:
-                    created_count += 1
-                    logger.info(f"Created competitor link: {asin_main} -> {comp_asin}")
+            # Concurrent setups for the same main product queue on a transaction-scoped advisory
+            # lock instead of contending (and possibly deadlocking) on the same unique index entries
+            await session.execute(select(func.pg_advisory_xact_lock(func.hashtext(asin_main))))
+            
+            # Single multi-row INSERT ON CONFLICT DO NOTHING; RETURNING yields only new links
+            stmt = pg_insert(CompetitorLink).values(rows)
+            stmt = stmt.on_conflict_do_nothing(
+                index_elements=['asin_main', 'asin_comp']
+            ).returning(CompetitorLink.asin_comp)
+            
+            result = await session.execute(stmt)
+            created = result.scalars().all()
             
             await session.commit()
         
+        created_count = len(created)
+        for comp_asin in created:
+            logger.info(f"Created competitor link: {asin_main} -> {comp_asin}")
+        
+        if created_count:
+            await cache.delete(COMPETITOR_LINKS_CACHE_KEY.format(asin_main=asin_main))
+        
         logger.info(f"Setup complete: {created_count} new competitor links for {asin_main}")
         return created_count
     
     async def get_competitor_links(self, asin_main: str) -> List[str]:
         """Get all competitor ASINs for a main product."""
+        cache_key = COMPETITOR_LINKS_CACHE_KEY.format(asin_main=asin_main)
+        cached_links = await cache.get(cache_key)
+        if cached_links is not None:
+            return cached_links
+        
         async with get_db_session() as session:
             stmt = select(CompetitorLink.asin_comp).where(
                 CompetitorLink.asin_main == asin_main
             )
             result = await session.execute(stmt)
-            return [row[0] for row in result.fetchall()]
+            competitor_asins = [row[0] for row in result.fetchall()]
+        
+        await cache.set(cache_key, competitor_asins, ttl=COMPETITOR_LINKS_CACHE_TTL)
+        return competitor_asins
     
     async def remove_competitor_links(self, asin_main: str, competitor_asins: Optional[List[str]] = None) -> int:
         """
         Remove competitor links. If competitor_asins is None, remove all links for asin_main.
         Returns count of removed links.
         """
+        stmt = delete(CompetitorLink).where(CompetitorLink.asin_main == asin_main)
+        if competitor_asins is not None:
+            # Remove specific links
+            stmt = stmt.where(CompetitorLink.asin_comp.in_(competitor_asins))
+        
         async with get_db_session() as session:
-            if competitor_asins is None:
-                # Remove all links for this main product
-                stmt = select(CompetitorLink).where(CompetitorLink.asin_main == asin_main)
-                result = await session.execute(stmt)
-                links_to_delete = result.scalars().all()
-                
-                for link in links_to_delete:
-                    await session.delete(link)
-                
-                removed_count = len(links_to_delete)
-            else:
-                # Remove specific links
-                removed_count = 0
-                for comp_asin in competitor_asins:
-                    stmt = select(CompetitorLink).where(
-                        and_(
-                            CompetitorLink.asin_main == asin_main,
-                            CompetitorLink.asin_comp == comp_asin
-                        )
-                    )
-                    result = await session.execute(stmt)
-                    link = result.scalar_one_or_none()
-                    
-                    if link:
-                        await session.delete(link)
-                        removed_count += 1
+            result = await session.execute(stmt)
+            removed_count = result.rowcount
             
             await session.commit()
         
+        if removed_count:
+            await cache.delete(COMPETITOR_LINKS_CACHE_KEY.format(asin_main=asin_main))
+        
         logger.info(f"Removed {removed_count} competitor links for {asin_main}")
         return removed_count
     
@@ -110,62 +128,87 @@ class CompetitorComparisonService:
         processed = 0
         failed = 0
         
-        # Get all competitor relationships
+        # Links, metrics and the upserts share one session: a single connection checkout and transaction
         async with get_db_session() as session:
+            # Get all competitor relationships
             links_stmt = select(CompetitorLink)
             links_result = await session.execute(links_stmt)
             competitor_links = links_result.scalars().all()
-        
-        if not competitor_links:
-            logger.info(f"No competitor links found for date {target_date}")
-            return 0, 0
-        
-        logger.info(f"Processing {len(competitor_links)} competitor comparisons for {target_date}")
-        
-        async with get_db_session() as session:
+            
+            if not competitor_links:
+                logger.info(f"No competitor links found for date {target_date}")
+                return 0, 0
+            
+            logger.info(f"Processing {len(competitor_links)} competitor comparisons for {target_date}")
+            
+            asins = {link.asin_main for link in competitor_links} | {link.asin_comp for link in competitor_links}
+            
+            # One query for both sides of every link instead of two SELECTs per link; joining a
+            # VALUES list lets the planner hash-join the ASINs rather than expand a long IN list
+            asin_values = values(column('asin', String), name='v').data([(asin,) for asin in asins])
+            metrics_stmt = select(ProductMetricsDaily).join(
+                asin_values, ProductMetricsDaily.asin == asin_values.c.asin
+            ).where(ProductMetricsDaily.date == target_date)
+            metrics_result = await session.execute(metrics_stmt)
+            metrics_map = {m.asin: m for m in metrics_result.scalars().all()}
+            
+            competitors_by_main: Dict[str, List[str]] = defaultdict(list)
             for link in competitor_links:
-                try:
-                    await self._calculate_single_comparison(session, link, target_date)
-                    processed += 1
-                except Exception as e:
-                    logger.error(f"Failed to calculate comparison for {link.asin_main} -> {link.asin_comp}: {e}")
-                    failed += 1
+                competitors_by_main[link.asin_main].append(link.asin_comp)
             
-            await session.commit()
+            rows = []
+            for asin_main, competitor_asins in competitors_by_main.items():
+                # Main-side metrics resolved once and shared by all of its competitors
+                main_metrics = metrics_map.get(asin_main)
+                for asin_comp in competitor_asins:
+                    try:
+                        row = self._build_comparison_row(
+                            asin_main, asin_comp, main_metrics, metrics_map.get(asin_comp), target_date
+                        )
+                    except Exception as e:
+                        logger.error(f"Failed to calculate comparison for {asin_main} -> {asin_comp}: {e}")
+                        failed += 1
+                        continue
+                    
+                    if row is None:
+                        failed += 1
+                    else:
+                        rows.append(row)
+            
+            try:
+                for i in range(0, len(rows), COMPARISON_UPSERT_BATCH_SIZE):
+                    await session.execute(self._build_comparison_upsert(rows[i:i + COMPARISON_UPSERT_BATCH_SIZE]))
+                await session.commit()
+                processed = len(rows)
+            except Exception as e:
+                logger.error(f"Failed to upsert {len(rows)} comparisons for {target_date}: {e}")
+                failed += len(rows)
+        
+        if processed:
+            for asin_main in {row['asin_main'] for row in rows}:
+                await cache.delete_pattern(f"competition:{asin_main}:*")
+                await cache.delete_pattern(f"competition:latest:{asin_main}")
         
         logger.info(f"Completed daily comparison calculation: {processed} processed, {failed} failed")
         return processed, failed
     
-    async def _calculate_single_comparison(self, session: AsyncSession, link: CompetitorLink, target_date: date):
-        """Calculate comparison metrics for a single competitor pair on a specific date."""
-        # Get metrics for main product on target date
-        main_stmt = select(ProductMetricsDaily).where(
-            and_(
-                ProductMetricsDaily.asin == link.asin_main,
-                ProductMetricsDaily.date == target_date
-            )
-        )
-        main_result = await session.execute(main_stmt)
-        main_metrics = main_result.scalar_one_or_none()
-        
-        # Get metrics for competitor on target date
-        comp_stmt = select(ProductMetricsDaily).where(
-            and_(
-                ProductMetricsDaily.asin == link.asin_comp,
-                ProductMetricsDaily.date == target_date
-            )
-        )
-        comp_result = await session.execute(comp_stmt)
-        comp_metrics = comp_result.scalar_one_or_none()
-        
+    @staticmethod
+    def _build_comparison_row(
+        asin_main: str,
+        asin_comp: str,
+        main_metrics: Optional[ProductMetricsDaily],
+        comp_metrics: Optional[ProductMetricsDaily],
+        target_date: date,
+    ) -> Optional[Dict[str, Any]]:
+        """Build the comparison row for a competitor pair, or None if neither side has metrics."""
         if not main_metrics and not comp_metrics:
-            logger.warning(f"No metrics found for either {link.asin_main} or {link.asin_comp} on {target_date}")
-            return
+            logger.warning(f"No metrics found for either {asin_main} or {asin_comp} on {target_date}")
+            return None
         
         # Calculate differences (main - competitor)
         comparison_data = {
-            'asin_main': link.asin_main,
-            'asin_comp': link.asin_comp,
+            'asin_main': asin_main,
+            'asin_comp': asin_comp,
             'date': target_date,
             'price_diff': None,
             'bsr_gap': None,
@@ -207,9 +250,13 @@ class CompetitorComparisonService:
                 'reason': 'partial_data'
             }
         
-        # Insert or update comparison record
-        stmt = pg_insert(CompetitorComparisonDaily).values(**comparison_data)
-        stmt = stmt.on_conflict_do_update(
+        return comparison_data
+    
+    @staticmethod
+    def _build_comparison_upsert(rows: List[Dict[str, Any]]):
+        """Multi-row INSERT ... ON CONFLICT DO UPDATE for a batch of comparison rows."""
+        stmt = pg_insert(CompetitorComparisonDaily).values(rows)
+        return stmt.on_conflict_do_update(
             index_elements=['asin_main', 'asin_comp', 'date'],
             set_={
                 'price_diff': stmt.excluded.price_diff,
@@ -220,9 +267,6 @@ class CompetitorComparisonService:
                 'extras': stmt.excluded.extras
             }
         )
-        
-        await session.execute(stmt)
-        logger.debug(f"Updated comparison: {link.asin_main} -> {link.asin_comp} for {target_date}")
     
     async def get_competition_data(self, asin_main: str, days_back: int = 30) -> List[Dict[str, Any]]:
         """
@@ -241,7 +285,19 @@ class CompetitorComparisonService:
         start_date = end_date - timedelta(days=days_back)
         
         async with get_db_session() as session:
-            stmt = select(CompetitorComparisonDaily).where(
+            # Rows come back in their final shape: float8/text casts are decoded natively by asyncpg
+            # (no Decimal or date objects), streamed from a server-side cursor with bounded memory
+            stmt = select(
+                CompetitorComparisonDaily.asin_main,
+                CompetitorComparisonDaily.asin_comp,
+                func.to_char(CompetitorComparisonDaily.date, 'YYYY-MM-DD').label('date'),
+                cast(CompetitorComparisonDaily.price_diff, Float).label('price_diff'),
+                CompetitorComparisonDaily.bsr_gap,
+                cast(CompetitorComparisonDaily.rating_diff, Float).label('rating_diff'),
+                CompetitorComparisonDaily.reviews_gap,
+                cast(CompetitorComparisonDaily.buybox_diff, Float).label('buybox_diff'),
+                CompetitorComparisonDaily.extras,
+            ).where(
                 and_(
                     CompetitorComparisonDaily.asin_main == asin_main,
                     CompetitorComparisonDaily.date >= start_date,
@@ -249,23 +305,8 @@ class CompetitorComparisonService:
                 )
             ).order_by(CompetitorComparisonDaily.date.desc(), CompetitorComparisonDaily.asin_comp)
             
-            result = await session.execute(stmt)
-            comparisons = result.scalars().all()
-        
-        # Convert to dict format
-        competition_data = []
-        for comp in comparisons:
-            competition_data.append({
-                'asin_main': comp.asin_main,
-                'asin_comp': comp.asin_comp,
-                'date': comp.date.isoformat(),
-                'price_diff': float(comp.price_diff) if comp.price_diff else None,
-                'bsr_gap': comp.bsr_gap,
-                'rating_diff': float(comp.rating_diff) if comp.rating_diff else None,
-                'reviews_gap': comp.reviews_gap,
-                'buybox_diff': float(comp.buybox_diff) if comp.buybox_diff else None,
-                'extras': comp.extras
-            })
+            result = await session.stream(stmt)
+            competition_data = [dict(row._mapping) async for row in result]
         
         # Cache for 4 hours - temporarily disabled
         # await cache.set(cache_key, competition_data, ttl=14400)
@@ -282,20 +323,21 @@ class CompetitorComparisonService:
         # if cached_data:
         #     return cached_data
         
-        # Get latest date with comparison data
+        # Latest date resolved by a scalar subquery, so the gaps come back in one round trip
+        latest_date = select(func.max(CompetitorComparisonDaily.date)).where(
+            CompetitorComparisonDaily.asin_main == asin_main
+        ).scalar_subquery()
+        
         async with get_db_session() as session:
-            latest_date_stmt = select(CompetitorComparisonDaily.date).where(
-                CompetitorComparisonDaily.asin_main == asin_main
-            ).order_by(CompetitorComparisonDaily.date.desc()).limit(1)
-            
-            latest_date_result = await session.execute(latest_date_stmt)
-            latest_date = latest_date_result.scalar_one_or_none()
-            
-            if not latest_date:
-                return []
-            
-            # Get all comparisons for that latest date
-            stmt = select(CompetitorComparisonDaily).where(
+            # Get all comparisons for that latest date, selecting only the gap columns
+            stmt = select(
+                CompetitorComparisonDaily.asin_comp,
+                CompetitorComparisonDaily.price_diff,
+                CompetitorComparisonDaily.bsr_gap,
+                CompetitorComparisonDaily.rating_diff,
+                CompetitorComparisonDaily.reviews_gap,
+                CompetitorComparisonDaily.buybox_diff,
+            ).where(
                 and_(
                     CompetitorComparisonDaily.asin_main == asin_main,
                     CompetitorComparisonDaily.date == latest_date
@@ -303,7 +345,7 @@ class CompetitorComparisonService:
             ).order_by(CompetitorComparisonDaily.asin_comp)
             
             result = await session.execute(stmt)
-            comparisons = result.scalars().all()
+            comparisons = result.all()
         
         peer_gaps = []
         for comp in comparisons:
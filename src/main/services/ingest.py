@@ -1,14 +1,49 @@
 """Data ingestion service for raw events."""
 
 import uuid
-from datetime import datetime
+from datetime import datetime, timezone
 from typing import Dict, Any, List, Optional, Union
-from sqlalchemy import select, update
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update, func, cast, bindparam
+from sqlalchemy.dialects.postgresql import JSONB
 
 from src.main.database import get_db_session
 from src.main.models.staging import RawEvents, IngestRuns
-from src.main.models.staging import RawEventRequest, IngestRunRequest
+
+# Hot job/event statements built once at import; each call only binds parameters, so the
+# statement is neither reconstructed nor recompiled (its cache key hits the compiled cache).
+# Session-level bulk sync is skipped: each session here is short-lived and loads no runs.
+# UPDATE bind names must not collide with column names (SQLAlchemy reserves those for SET),
+# hence b_job_id.
+_GET_JOB_STMT = select(IngestRuns).where(IngestRuns.job_id == bindparam('job_id'))
+
+_START_JOB_STMT = (
+    update(IngestRuns)
+    .where(IngestRuns.job_id == bindparam('b_job_id'))
+    .values(status='RUNNING')
+    .execution_options(synchronize_session=False)
+)
+
+# Stats are merged into meta server-side with jsonb ||, so no read-modify-write round trip
+_COMPLETE_JOB_STMT = (
+    update(IngestRuns)
+    .where(IngestRuns.job_id == bindparam('b_job_id'))
+    .values(
+        status=bindparam('new_status'),
+        finished_at=bindparam('new_finished_at'),
+        cost=bindparam('new_cost'),
+        meta=func.coalesce(IngestRuns.meta, cast({}, JSONB)).op('||', return_type=JSONB)(
+            bindparam('meta_patch', type_=JSONB)
+        )
+    )
+    .execution_options(synchronize_session=False)
+)
+
+_EVENTS_BY_JOB_STMT = (
+    select(RawEvents)
+    .where(RawEvents.job_id == bindparam('job_id'))
+    .order_by(RawEvents.fetched_at)
+    .limit(bindparam('limit'))
+)
 
 
 class IngestionService:
@@ -23,7 +58,7 @@ class IngestionService:
                 job_id=job_id,
                 source=source,
                 source_run_id=source_run_id,
-                started_at=datetime.utcnow(),
+                started_at=datetime.now(timezone.utc),
                 status='PENDING',
                 meta=job_metadata or {}
             )
@@ -35,11 +70,7 @@ class IngestionService:
     async def start_job(self, job_id: str) -> bool:
         """Mark job as running and return success status."""
         async with get_db_session() as session:
-            result = await session.execute(
-                update(IngestRuns)
-                .where(IngestRuns.job_id == job_id)
-                .values(status='RUNNING')
-            )
+            result = await session.execute(_START_JOB_STMT, {'b_job_id': job_id})
             await session.commit()
             return result.rowcount > 0
     
@@ -48,42 +79,30 @@ class IngestionService:
         """Mark job as completed or failed."""
         status = 'FAILED' if error_message else 'SUCCESS' if records_failed == 0 else 'PARTIAL'
 
+        meta_patch = {
+            'records_processed': records_processed,
+            'records_failed': records_failed,
+            'error_message': error_message
+        }
+
         async with get_db_session() as session:
-            # Update meta with processing stats
             result = await session.execute(
-                select(IngestRuns).where(IngestRuns.job_id == job_id)
+                _COMPLETE_JOB_STMT,
+                {
+                    'b_job_id': job_id,
+                    'new_status': status,
+                    'new_finished_at': datetime.now(timezone.utc),
+                    'new_cost': float(cost) if cost else 0.0,
+                    'meta_patch': meta_patch,
+                }
             )
-            job = result.scalar_one_or_none()
-
-            if job:
-                meta = job.meta or {}
-                meta.update({
-                    'records_processed': records_processed,
-                    'records_failed': records_failed,
-                    'error_message': error_message
-                })
-
-                update_result = await session.execute(
-                    update(IngestRuns)
-                    .where(IngestRuns.job_id == job_id)
-                    .values(
-                        status=status,
-                        finished_at=datetime.utcnow(),
-                        cost=float(cost) if cost else 0.0,
-                        meta=meta
-                    )
-                )
-                await session.commit()
-                return update_result.rowcount > 0
-
-            return False
+            await session.commit()
+            return result.rowcount > 0
     
     async def get_job(self, job_id: str) -> Optional[IngestRuns]:
         """Get ingest run by job_id."""
         async with get_db_session() as session:
-            result = await session.execute(
-                select(IngestRuns).where(IngestRuns.job_id == job_id)
-            )
+            result = await session.execute(_GET_JOB_STMT, {'job_id': job_id})
             return result.scalar_one_or_none()
     
     async def ingest_raw_event(self, source: str, asin: Optional[str], url: Optional[str], payload: Dict[str, Any], job_id: Optional[str] = None) -> int:
@@ -92,7 +111,7 @@ class IngestionService:
             event = RawEvents(
                 job_id=job_id,
                 source=source,
-                fetched_at=datetime.utcnow(),
+                fetched_at=datetime.now(timezone.utc),
                 asin=asin,
                 url=url,
                 payload=payload
@@ -104,39 +123,45 @@ class IngestionService:
         return event.id
     
     async def ingest_raw_events_batch(self, source: str, events_data: List[Dict[str, Any]], job_id: Optional[str] = None) -> List[int]:
-        """Ingest multiple raw events in a single transaction."""
-        event_ids = []
+        """
+        Ingest multiple raw events in a single transaction.
+        Ids are reserved from the sequence up front so the rows can be loaded with one COPY.
+        """
+        rows = [
+            {
+                'job_id': job_id,
+                'source': source,
+                'asin': event_data.get('asin'),
+                'url': event_data.get('url'),
+                'payload': event_data,
+            }
+            for event_data in events_data
+        ]
+        if not rows:
+            return []
 
         async with get_db_session() as session:
-            for event_data in events_data:
-                event = RawEvents(
-                    job_id=job_id,
-                    source=source,
-                    fetched_at=datetime.utcnow(),
-                    asin=event_data.get('asin'),
-                    url=event_data.get('url'),
-                    payload=event_data
-                )
-                session.add(event)
-
+            event_ids = await RawEvents.allocate_ids(session, len(rows))
+            await RawEvents.bulk_insert(session, rows, ids=event_ids)
             await session.commit()
 
-            # Get the generated IDs
-            for event in session.new:
-                if isinstance(event, RawEvents):
-                    event_ids.append(event.id)
-
         return event_ids
     
+    async def bulk_ingest_raw_events(self, events: List[Dict[str, Any]]) -> int:
+        """
+        Ingest pre-built raw event rows (see RawProductEventCreate.to_raw_event) with a single COPY.
+        Returns number of events ingested.
+        """
+        async with get_db_session() as session:
+            count = await RawEvents.bulk_insert(session, events)
+            await session.commit()
+
+        return count
+    
     async def get_events_by_job(self, job_id: str, limit: int = 1000) -> List[RawEvents]:
         """Get all events for a specific job."""
         async with get_db_session() as session:
-            result = await session.execute(
-                select(RawEvents)
-                .where(RawEvents.job_id == job_id)
-                .order_by(RawEvents.fetched_at)
-                .limit(limit)
-            )
+            result = await session.execute(_EVENTS_BY_JOB_STMT, {'job_id': job_id, 'limit': limit})
             return result.scalars().all()
     
     async def get_events_by_source(self, source: str, limit: int = 1000) -> List[RawEvents]:
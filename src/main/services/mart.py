@@ -1,30 +1,204 @@
 """Mart layer population service for analytics and reporting."""
 
+import asyncio
 from datetime import datetime, date, timedelta
 from typing import Dict, Any, List, Optional
 from sqlalchemy import select, insert, update, text, func
-from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.postgresql import JSONB, insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 import logging
 
+from src.main.config import settings
 from src.main.database import get_db_session
 from src.main.models.product import Product, ProductMetricsDaily
 from src.main.models.mart import (
     ProductMetricsRollup, ProductMetricsDeltaDaily,
     CompetitorComparisonDaily, CompetitionReports
 )
+from src.main.services.cache import cache
 
 logger = logging.getLogger(__name__)
 
+# Population statements are built once at import; each call only binds parameters, so the
+# compiled form is reused from SQLAlchemy's cache and asyncpg's per-connection prepared
+# statement cache hits across every day of a backfill.
+
+# All windows are aggregated in one statement over a single scan of the widest range:
+# each daily row is fanned out to every window it falls in and grouped by (asin, duration).
+# Change percentages compare the first and last non-null value in the window and are
+# clamped to the Numeric(6, 2) column range.
+_ROLLUP_STMT = text("""
+    WITH windows (duration, start_date) AS (
+        SELECT * FROM (VALUES
+            ('7d', CAST(:start_7d AS date)),
+            ('30d', CAST(:start_30d AS date)),
+            ('90d', CAST(:start_90d AS date))
+        ) AS w (duration, start_date)
+    ),
+    windowed AS (
+        SELECT
+            m.asin,
+            w.duration,
+            COUNT(*) as days,
+            AVG(m.price) as price_avg,
+            MIN(m.price) as price_min,
+            MAX(m.price) as price_max,
+            AVG(m.bsr) as bsr_avg,
+            AVG(m.rating) as rating_avg,
+            MAX(m.reviews_count) - MIN(m.reviews_count) as reviews_delta,
+            (array_agg(m.price ORDER BY m.date) FILTER (WHERE m.price IS NOT NULL))[1] as price_first,
+            (array_agg(m.price ORDER BY m.date DESC) FILTER (WHERE m.price IS NOT NULL))[1] as price_last,
+            (array_agg(m.bsr ORDER BY m.date) FILTER (WHERE m.bsr IS NOT NULL))[1] as bsr_first,
+            (array_agg(m.bsr ORDER BY m.date DESC) FILTER (WHERE m.bsr IS NOT NULL))[1] as bsr_last
+        FROM core.product_metrics_daily m
+        JOIN windows w ON m.date >= w.start_date
+        WHERE m.date >= :start_90d AND m.date <= :as_of_date
+        GROUP BY m.asin, w.duration
+        HAVING COUNT(*) >= 2
+    )
+    INSERT INTO mart.product_metrics_rollup
+    (asin, duration, as_of, price_avg, price_min, price_max, bsr_avg, rating_avg, reviews_delta, price_change_pct, bsr_change_pct)
+    SELECT
+        asin,
+        duration,
+        :as_of_date,
+        ROUND(price_avg::numeric, 2),
+        ROUND(price_min::numeric, 2),
+        ROUND(price_max::numeric, 2),
+        ROUND(bsr_avg::numeric, 2),
+        ROUND(rating_avg::numeric, 2),
+        reviews_delta,
+        CASE
+            WHEN price_first > 0
+            THEN GREATEST(LEAST(ROUND(((price_last - price_first) / price_first * 100)::numeric, 2), 9999.99), -9999.99)
+            ELSE NULL
+        END as price_change_pct,
+        CASE
+            WHEN bsr_first > 0
+            THEN GREATEST(LEAST(ROUND(((bsr_last - bsr_first)::numeric / bsr_first * 100)::numeric, 2), 9999.99), -9999.99)
+            ELSE NULL
+        END as bsr_change_pct
+    FROM windowed
+    ON CONFLICT (asin, duration, as_of) DO UPDATE SET
+        price_avg = EXCLUDED.price_avg,
+        price_min = EXCLUDED.price_min,
+        price_max = EXCLUDED.price_max,
+        bsr_avg = EXCLUDED.bsr_avg,
+        rating_avg = EXCLUDED.rating_avg,
+        reviews_delta = EXCLUDED.reviews_delta,
+        price_change_pct = EXCLUDED.price_change_pct,
+        bsr_change_pct = EXCLUDED.bsr_change_pct
+""")
+
+
+_DELTA_STMT = text("""
+    INSERT INTO mart.product_metrics_delta_daily
+    (asin, date, price_delta, price_change_pct, bsr_delta, bsr_change_pct, rating_delta, reviews_delta, buybox_delta)
+    SELECT
+        curr.asin,
+        curr.date,
+        ROUND((curr.price - prev.price)::numeric, 2) as price_delta,
+        CASE
+            WHEN prev.price > 0
+            THEN ROUND(((curr.price - prev.price) / prev.price * 100)::numeric, 2)
+            ELSE NULL
+        END as price_change_pct,
+        curr.bsr - prev.bsr as bsr_delta,
+        CASE
+            WHEN prev.bsr > 0
+            THEN ROUND(((curr.bsr - prev.bsr)::numeric / prev.bsr * 100)::numeric, 2)
+            ELSE NULL
+        END as bsr_change_pct,
+        ROUND((curr.rating - prev.rating)::numeric, 2) as rating_delta,
+        curr.reviews_count - prev.reviews_count as reviews_delta,
+        ROUND((curr.buybox_price - prev.buybox_price)::numeric, 2) as buybox_delta
+    FROM core.product_metrics_daily curr
+    LEFT JOIN core.product_metrics_daily prev
+        ON curr.asin = prev.asin AND prev.date = :previous_date
+    WHERE curr.date = :target_date
+    ON CONFLICT (asin, date) DO UPDATE SET
+        price_delta = EXCLUDED.price_delta,
+        price_change_pct = EXCLUDED.price_change_pct,
+        bsr_delta = EXCLUDED.bsr_delta,
+        bsr_change_pct = EXCLUDED.bsr_change_pct,
+        rating_delta = EXCLUDED.rating_delta,
+        reviews_delta = EXCLUDED.reviews_delta,
+        buybox_delta = EXCLUDED.buybox_delta
+""")
+
+
+_COMPARISON_STMT = text("""
+    INSERT INTO mart.competitor_comparison_daily
+    (asin_main, asin_comp, date, price_diff, bsr_gap, rating_diff, reviews_gap, buybox_diff)
+    SELECT
+        cl.asin_main,
+        cl.asin_comp,
+        :target_date,
+        ROUND((main_metrics.price - comp_metrics.price)::numeric, 2) as price_diff,
+        main_metrics.bsr - comp_metrics.bsr as bsr_gap,
+        ROUND((main_metrics.rating - comp_metrics.rating)::numeric, 2) as rating_diff,
+        main_metrics.reviews_count - comp_metrics.reviews_count as reviews_gap,
+        ROUND((main_metrics.buybox_price - comp_metrics.buybox_price)::numeric, 2) as buybox_diff
+    FROM core.competitor_links cl
+    JOIN core.product_metrics_daily main_metrics
+        ON cl.asin_main = main_metrics.asin AND main_metrics.date = :target_date
+    JOIN core.product_metrics_daily comp_metrics
+        ON cl.asin_comp = comp_metrics.asin AND comp_metrics.date = :target_date
+    ON CONFLICT (asin_main, asin_comp, date) DO UPDATE SET
+        price_diff = EXCLUDED.price_diff,
+        bsr_gap = EXCLUDED.bsr_gap,
+        rating_diff = EXCLUDED.rating_diff,
+        reviews_gap = EXCLUDED.reviews_gap,
+        buybox_diff = EXCLUDED.buybox_diff
+""")
+
+_REFRESH_VIEW_STMT = text("REFRESH MATERIALIZED VIEW CONCURRENTLY mart.mv_product_latest")
+
+# Every stat in one round trip; each table is scanned once for its count and latest date
+_MART_STATS_STMT = text("""
+    WITH rollup_stats AS (
+        SELECT duration, COUNT(*) as count, MAX(as_of) as latest_date
+        FROM mart.product_metrics_rollup
+        GROUP BY duration
+    ),
+    delta_stats AS (
+        SELECT COUNT(*) as count, MAX(date) as latest_date FROM mart.product_metrics_delta_daily
+    ),
+    comparison_stats AS (
+        SELECT COUNT(*) as count, MAX(date) as latest_date FROM mart.competitor_comparison_daily
+    )
+    SELECT
+        (SELECT COALESCE(jsonb_object_agg(duration, count), '{}'::jsonb) FROM rollup_stats) as rollup_counts,
+        (SELECT MAX(latest_date) FROM rollup_stats) as latest_rollup_date,
+        delta_stats.count as delta_count,
+        delta_stats.latest_date as latest_delta_date,
+        comparison_stats.count as comparison_count,
+        comparison_stats.latest_date as latest_comparison_date
+    FROM delta_stats, comparison_stats
+""").columns(rollup_counts=JSONB)
+
 
 class MartService:
     """Service for populating mart layer tables."""
 
+    async def _execute(self, statement, params: Dict[str, Any], session: Optional[AsyncSession] = None):
+        """
+        Execute statement on session, leaving the commit to its owner; without one, run it
+        in a fresh session and commit.
+        """
+        if session is not None:
+            return await session.execute(statement, params)
+
+        async with get_db_session() as own_session:
+            result = await own_session.execute(statement, params)
+            await own_session.commit()
+            return result
+
     async def refresh_materialized_view(self) -> bool:
         """Refresh the materialized view for latest product data."""
         try:
             async with get_db_session() as session:
-                await session.execute(text("REFRESH MATERIALIZED VIEW CONCURRENTLY mart.mv_product_latest"))
+                await session.execute(_REFRESH_VIEW_STMT)
                 await session.commit()
                 logger.info("Successfully refreshed mart.mv_product_latest materialized view")
                 return True
@@ -32,165 +206,62 @@ class MartService:
             logger.error(f"Failed to refresh materialized view: {e}")
             return False
 
-    async def populate_metrics_rollups(self, as_of_date: Optional[date] = None) -> int:
+    async def populate_metrics_rollups(self, as_of_date: Optional[date] = None,
+                                       session: Optional[AsyncSession] = None) -> int:
         """Populate product metrics rollups for different time periods."""
         if as_of_date is None:
             as_of_date = date.today()
 
-        records_created = 0
-        durations = ['7d', '30d', '90d']
+        durations = {'7d': 7, '30d': 30, '90d': 90}
 
-        async with get_db_session() as session:
-            for duration in durations:
-                days = int(duration[:-1])
-                start_date = as_of_date - timedelta(days=days)
-
-                # Calculate rollup metrics
-                rollup_query = text("""
-                    INSERT INTO mart.product_metrics_rollup
-                    (asin, duration, as_of, price_avg, price_min, price_max, bsr_avg, rating_avg, reviews_delta, price_change_pct, bsr_change_pct)
-                    SELECT
-                        asin,
-                        :duration,
-                        :as_of_date,
-                        ROUND(AVG(price)::numeric, 2) as price_avg,
-                        ROUND(MIN(price)::numeric, 2) as price_min,
-                        ROUND(MAX(price)::numeric, 2) as price_max,
-                        ROUND(AVG(bsr)::numeric, 2) as bsr_avg,
-                        ROUND(AVG(rating)::numeric, 2) as rating_avg,
-                        MAX(reviews_count) - MIN(reviews_count) as reviews_delta,
-                        CASE
-                            WHEN LAG(AVG(price)) OVER (PARTITION BY asin ORDER BY MIN(date)) IS NOT NULL
-                            THEN ROUND(((AVG(price) - LAG(AVG(price)) OVER (PARTITION BY asin ORDER BY MIN(date))) /
-                                      LAG(AVG(price)) OVER (PARTITION BY asin ORDER BY MIN(date)) * 100)::numeric, 2)
-                            ELSE NULL
-                        END as price_change_pct,
-                        CASE
-                            WHEN LAG(AVG(bsr)) OVER (PARTITION BY asin ORDER BY MIN(date)) IS NOT NULL
-                            THEN ROUND(((AVG(bsr) - LAG(AVG(bsr)) OVER (PARTITION BY asin ORDER BY MIN(date))) /
-                                      LAG(AVG(bsr)) OVER (PARTITION BY asin ORDER BY MIN(date)) * 100)::numeric, 2)
-                            ELSE NULL
-                        END as bsr_change_pct
-                    FROM core.product_metrics_daily
-                    WHERE date >= :start_date AND date <= :as_of_date
-                    GROUP BY asin
-                    HAVING COUNT(*) >= 2
-                    ON CONFLICT (asin, duration, as_of) DO UPDATE SET
-                        price_avg = EXCLUDED.price_avg,
-                        price_min = EXCLUDED.price_min,
-                        price_max = EXCLUDED.price_max,
-                        bsr_avg = EXCLUDED.bsr_avg,
-                        rating_avg = EXCLUDED.rating_avg,
-                        reviews_delta = EXCLUDED.reviews_delta,
-                        price_change_pct = EXCLUDED.price_change_pct,
-                        bsr_change_pct = EXCLUDED.bsr_change_pct
-                """)
-
-                result = await session.execute(rollup_query, {
-                    'duration': duration,
-                    'as_of_date': as_of_date,
-                    'start_date': start_date
-                })
-                records_created += result.rowcount
+        params = {'as_of_date': as_of_date}
+        for duration, days in durations.items():
+            params[f'start_{duration}'] = as_of_date - timedelta(days=days)
 
-            await session.commit()
+        result = await self._execute(_ROLLUP_STMT, params, session)
+        records_created = result.rowcount
 
         logger.info(f"Created/updated {records_created} rollup records for {as_of_date}")
         return records_created
 
-    async def populate_daily_deltas(self, target_date: Optional[date] = None) -> int:
+    async def populate_daily_deltas(self, target_date: Optional[date] = None,
+                                    session: Optional[AsyncSession] = None) -> int:
         """Populate daily delta metrics comparing day-over-day changes."""
         if target_date is None:
             target_date = date.today()
 
         previous_date = target_date - timedelta(days=1)
 
-        async with get_db_session() as session:
-            delta_query = text("""
-                INSERT INTO mart.product_metrics_delta_daily
-                (asin, date, price_delta, price_change_pct, bsr_delta, bsr_change_pct, rating_delta, reviews_delta, buybox_delta)
-                SELECT
-                    curr.asin,
-                    curr.date,
-                    ROUND((curr.price - prev.price)::numeric, 2) as price_delta,
-                    CASE
-                        WHEN prev.price > 0
-                        THEN ROUND(((curr.price - prev.price) / prev.price * 100)::numeric, 2)
-                        ELSE NULL
-                    END as price_change_pct,
-                    curr.bsr - prev.bsr as bsr_delta,
-                    CASE
-                        WHEN prev.bsr > 0
-                        THEN ROUND(((curr.bsr - prev.bsr)::numeric / prev.bsr * 100)::numeric, 2)
-                        ELSE NULL
-                    END as bsr_change_pct,
-                    ROUND((curr.rating - prev.rating)::numeric, 2) as rating_delta,
-                    curr.reviews_count - prev.reviews_count as reviews_delta,
-                    ROUND((curr.buybox_price - prev.buybox_price)::numeric, 2) as buybox_delta
-                FROM core.product_metrics_daily curr
-                LEFT JOIN core.product_metrics_daily prev
-                    ON curr.asin = prev.asin AND prev.date = :previous_date
-                WHERE curr.date = :target_date
-                ON CONFLICT (asin, date) DO UPDATE SET
-                    price_delta = EXCLUDED.price_delta,
-                    price_change_pct = EXCLUDED.price_change_pct,
-                    bsr_delta = EXCLUDED.bsr_delta,
-                    bsr_change_pct = EXCLUDED.bsr_change_pct,
-                    rating_delta = EXCLUDED.rating_delta,
-                    reviews_delta = EXCLUDED.reviews_delta,
-                    buybox_delta = EXCLUDED.buybox_delta
-            """)
-
-            result = await session.execute(delta_query, {
-                'target_date': target_date,
-                'previous_date': previous_date
-            })
-            await session.commit()
+
+        result = await self._execute(_DELTA_STMT, {
+            'target_date': target_date,
+            'previous_date': previous_date
+        }, session)
 
         logger.info(f"Created/updated {result.rowcount} daily delta records for {target_date}")
         return result.rowcount
 
-    async def populate_competitor_comparisons(self, target_date: Optional[date] = None) -> int:
+    async def populate_competitor_comparisons(self, target_date: Optional[date] = None,
+                                              session: Optional[AsyncSession] = None) -> int:
         """Populate competitor comparison data based on competitor links."""
         if target_date is None:
             target_date = date.today()
 
-        async with get_db_session() as session:
-            comparison_query = text("""
-                INSERT INTO mart.competitor_comparison_daily
-                (asin_main, asin_comp, date, price_diff, bsr_gap, rating_diff, reviews_gap, buybox_diff)
-                SELECT
-                    cl.asin_main,
-                    cl.asin_comp,
-                    :target_date,
-                    ROUND((main_metrics.price - comp_metrics.price)::numeric, 2) as price_diff,
-                    main_metrics.bsr - comp_metrics.bsr as bsr_gap,
-                    ROUND((main_metrics.rating - comp_metrics.rating)::numeric, 2) as rating_diff,
-                    main_metrics.reviews_count - comp_metrics.reviews_count as reviews_gap,
-                    ROUND((main_metrics.buybox_price - comp_metrics.buybox_price)::numeric, 2) as buybox_diff
-                FROM core.competitor_links cl
-                JOIN core.product_metrics_daily main_metrics
-                    ON cl.asin_main = main_metrics.asin AND main_metrics.date = :target_date
-                JOIN core.product_metrics_daily comp_metrics
-                    ON cl.asin_comp = comp_metrics.asin AND comp_metrics.date = :target_date
-                ON CONFLICT (asin_main, asin_comp, date) DO UPDATE SET
-                    price_diff = EXCLUDED.price_diff,
-                    bsr_gap = EXCLUDED.bsr_gap,
-                    rating_diff = EXCLUDED.rating_diff,
-                    reviews_gap = EXCLUDED.reviews_gap,
-                    buybox_diff = EXCLUDED.buybox_diff
-            """)
-
-            result = await session.execute(comparison_query, {
-                'target_date': target_date
-            })
-            await session.commit()
+
+        result = await self._execute(_COMPARISON_STMT, {
+            'target_date': target_date
+        }, session)
 
         logger.info(f"Created/updated {result.rowcount} competitor comparison records for {target_date}")
         return result.rowcount
 
-    async def populate_full_mart_layer(self, target_date: Optional[date] = None) -> Dict[str, int]:
-        """Populate all mart layer tables for a given date."""
+    async def populate_full_mart_layer(self, target_date: Optional[date] = None,
+                                       refresh_view: bool = True) -> Dict[str, int]:
+        """
+        Populate all mart layer tables for a given date.
+        mv_product_latest does not depend on target_date, so callers populating several
+        dates pass refresh_view=False and refresh it once afterwards.
+        """
         if target_date is None:
             target_date = date.today()
 
@@ -199,17 +270,23 @@ class MartService:
         results = {}
 
         # 1. Refresh materialized view
-        view_success = await self.refresh_materialized_view()
-        results['materialized_view_refreshed'] = 1 if view_success else 0
-
-        # 2. Populate rollups
-        results['rollup_records'] = await self.populate_metrics_rollups(target_date)
+        if refresh_view:
+            view_success = await self.refresh_materialized_view()
+            results['materialized_view_refreshed'] = 1 if view_success else 0
+        else:
+            results['materialized_view_refreshed'] = 0
 
-        # 3. Populate daily deltas
-        results['delta_records'] = await self.populate_daily_deltas(target_date)
+        # 2-4. Rollups, daily deltas and competitor comparisons share one connection and commit
+        async with get_db_session() as session:
+            results['rollup_records'] = await self.populate_metrics_rollups(target_date, session)
+            results['delta_records'] = await self.populate_daily_deltas(target_date, session)
+            results['comparison_records'] = await self.populate_competitor_comparisons(target_date, session)
+            await session.commit()
 
-        # 4. Populate competitor comparisons
-        results['comparison_records'] = await self.populate_competitor_comparisons(target_date)
+        if results['comparison_records']:
+            # Cached competition responses and peer gaps embed the comparisons; the statement covers
+            # every link, so all of them are cleared
+            await cache.delete_pattern("competition:*")
 
         logger.info(f"Completed mart layer population: {results}")
         return results
@@ -226,18 +303,35 @@ class MartService:
             'rollup_records': 0,
             'delta_records': 0,
             'comparison_records': 0,
-            'days_processed': 0
+            'days_processed': 0,
+            'days_failed': 0
         }
 
-        current_date = start_date
-        while current_date <= end_date:
-            day_results = await self.populate_full_mart_layer(current_date)
+        # Days only read core tables and write their own date's mart rows, so they run
+        # concurrently, bounded to leave pool connections for the API
+        semaphore = asyncio.Semaphore(settings.mart_backfill_concurrency)
 
-            for key, value in day_results.items():
+        async def _populate_day(day: date) -> Dict[str, int]:
+            async with semaphore:
+                return await self.populate_full_mart_layer(day, refresh_view=False)
+
+        days = [start_date + timedelta(days=i) for i in range((end_date - start_date).days + 1)]
+        # A failing day rolls back only its own transaction; the others still complete
+        day_results = await asyncio.gather(*(_populate_day(day) for day in days), return_exceptions=True)
+        for day, results in zip(days, day_results):
+            if isinstance(results, Exception):
+                logger.error(f"Mart backfill failed for {day}: {results}")
+                total_results['days_failed'] += 1
+                continue
+
+            for key, value in results.items():
                 total_results[key] += value
 
             total_results['days_processed'] += 1
-            current_date += timedelta(days=1)
+
+        # The view only holds each product's latest row: one full refresh covers every backfilled day
+        view_success = await self.refresh_materialized_view()
+        total_results['materialized_view_refreshed'] = 1 if view_success else 0
 
         logger.info(f"Completed mart layer backfill: {total_results}")
         return total_results
@@ -245,43 +339,16 @@ class MartService:
     async def get_mart_stats(self) -> Dict[str, Any]:
         """Get statistics about mart layer population."""
         async with get_db_session() as session:
-            stats = {}
-
-            # Count rollup records by duration
-            rollup_result = await session.execute(
-                text("SELECT duration, COUNT(*) as count FROM mart.product_metrics_rollup GROUP BY duration")
-            )
-            stats['rollup_counts'] = dict(rollup_result.fetchall())
-
-            # Count delta records
-            delta_result = await session.execute(
-                text("SELECT COUNT(*) as count FROM mart.product_metrics_delta_daily")
-            )
-            stats['delta_count'] = delta_result.scalar()
-
-            # Count comparison records
-            comparison_result = await session.execute(
-                text("SELECT COUNT(*) as count FROM mart.competitor_comparison_daily")
-            )
-            stats['comparison_count'] = comparison_result.scalar()
-
-            # Latest data dates
-            latest_rollup = await session.execute(
-                text("SELECT MAX(as_of) as latest_date FROM mart.product_metrics_rollup")
-            )
-            stats['latest_rollup_date'] = latest_rollup.scalar()
-
-            latest_delta = await session.execute(
-                text("SELECT MAX(date) as latest_date FROM mart.product_metrics_delta_daily")
-            )
-            stats['latest_delta_date'] = latest_delta.scalar()
-
-            latest_comparison = await session.execute(
-                text("SELECT MAX(date) as latest_date FROM mart.competitor_comparison_daily")
-            )
-            stats['latest_comparison_date'] = latest_comparison.scalar()
-
-        return stats
+            row = (await session.execute(_MART_STATS_STMT)).one()
+
+        return {
+            'rollup_counts': row.rollup_counts,
+            'delta_count': row.delta_count,
+            'comparison_count': row.comparison_count,
+            'latest_rollup_date': row.latest_rollup_date,
+            'latest_delta_date': row.latest_delta_date,
+            'latest_comparison_date': row.latest_comparison_date
+        }
 
 
 # Global service instance
@@ -1,8 +1,8 @@
 """Core metrics processing service for ETL pipeline."""
 
-from datetime import datetime, date
+from datetime import date
 from typing import Dict, Any, List, Optional, Tuple
-from sqlalchemy import select, insert, update
+from sqlalchemy import select, insert, update, func
 from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 import logging
@@ -11,6 +11,7 @@ from src.main.database import get_db_session
 from src.main.models.product import Product, ProductMetricsDaily, ProductFeatures
 from src.main.models.staging import RawEvents, IngestRuns
 from src.main.services.ingest import ingest_service
+from src.main.services.cache import cache
 from tools.offline.apify_mapper import ApifyDataMapper
 
 logger = logging.getLogger(__name__)
@@ -31,6 +32,7 @@ class CoreMetricsProcessor:
         """
         processed = 0
         failed = 0
+        written_asins = set()
 
         # Get unprocessed events for this job
         events = await ingest_service.get_events_by_job(job_id)
@@ -44,7 +46,7 @@ class CoreMetricsProcessor:
         async with get_db_session() as session:
             for event in events:
                 try:
-                    await self._process_single_event(session, event, job_id)
+                    written_asins.add(await self._process_single_event(session, event, job_id))
                     processed += 1
                 except Exception as e:
                     logger.error(f"Failed to process event {event.id}: {e}")
@@ -52,11 +54,15 @@ class CoreMetricsProcessor:
 
             await session.commit()
 
+        # Cached product responses are tagged per ASIN; clear those of every product just written
+        for asin in written_asins:
+            await cache.invalidate_product_cache(asin)
+
         logger.info(f"Job {job_id} processed: {processed} success, {failed} failed")
         return processed, failed
     
-    async def _process_single_event(self, session: AsyncSession, event: RawEvents, job_id: str):
-        """Process a single raw event into core tables."""
+    async def _process_single_event(self, session: AsyncSession, event: RawEvents, job_id: str) -> str:
+        """Process a single raw event into core tables and return its ASIN."""
         payload = event.payload
         
         # For Apify sources, map the data using the ApifyDataMapper
@@ -91,6 +97,8 @@ class CoreMetricsProcessor:
         print(f"Creating daily metrics for {asin}")
         if any(key in processing_data for key in ['price', 'bsr', 'rating', 'reviews_count', 'buybox_price']):
             await self._create_daily_metrics(session, event, processing_data, job_id)
+
+        return asin
     
     async def _upsert_product(self, session: AsyncSession, event: RawEvents, processing_data: Dict[str, Any]):
         """Upsert product record from raw event."""
@@ -141,15 +149,15 @@ class CoreMetricsProcessor:
         stmt = pg_insert(ProductFeatures).values(
             asin=asin,
             bullets=features_data.get('bullets'),
-            attributes=features_data.get('attributes'),
-            extracted_at=datetime.utcnow()
+            attributes=features_data.get('attributes')
         )
+        # extracted_at uses the column's server default on insert
         stmt = stmt.on_conflict_do_update(
             index_elements=['asin'],
             set_={
                 'bullets': stmt.excluded.bullets,
                 'attributes': stmt.excluded.attributes,
-                'extracted_at': stmt.excluded.extracted_at
+                'extracted_at': func.now()
             }
         )
 
@@ -2,7 +2,8 @@
 
 import json
 import logging
-from datetime import datetime, date, timedelta
+import orjson
+from datetime import datetime, date, timedelta, timezone
 from typing import Dict, List, Optional, Any
 from dataclasses import dataclass
 
@@ -11,13 +12,17 @@ from sqlalchemy.ext.asyncio import AsyncSession
 import openai
 
 from src.main.config import settings
-from src.main.models.competition import CompetitionReport, CompetitorComparisonDaily
 from src.main.models.product import Product, ProductMetricsDaily
-from src.main.models.mart import ProductSummary
+from src.main.models.mart import ProductMetricsRollup, CompetitorComparisonDaily, CompetitionReports
 from src.main.database import get_db_session
+from src.main.services.cache import cache
 
 logger = logging.getLogger(__name__)
 
+# Stored as raw JSON via cache.set_raw (the :raw suffix keeps it apart from earlier CacheEntry-wrapped values)
+LATEST_REPORT_CACHE_KEY = "report:{asin_main}:latest:raw"
+LATEST_REPORT_CACHE_TTL = 86400  # Safety net only; save_report writes through
+
 
 @dataclass
 class CompetitionEvidence:
@@ -144,9 +149,9 @@ class ReportGenerationService:
             async with get_db_session() as session:
                 # Get next version number
                 result = await session.execute(
-                    select(CompetitionReport.version)
-                    .where(CompetitionReport.asin_main == report.asin_main)
-                    .order_by(CompetitionReport.version.desc())
+                    select(CompetitionReports.version)
+                    .where(CompetitionReports.asin_main == report.asin_main)
+                    .order_by(CompetitionReports.version.desc())
                     .limit(1)
                 )
                 
@@ -154,7 +159,7 @@ class ReportGenerationService:
                 next_version = (last_version or 0) + 1
                 
                 # Create report record
-                db_report = CompetitionReport(
+                db_report = CompetitionReports(
                     asin_main=report.asin_main,
                     version=next_version,
                     summary={
@@ -167,14 +172,31 @@ class ReportGenerationService:
                     },
                     evidence=report.evidence,
                     model=report.model_used,
-                    generated_at=datetime.now()
+                    generated_at=datetime.now(timezone.utc)
                 )
                 
                 session.add(db_report)
                 await session.commit()
                 
                 logger.info(f"Saved report version {next_version} for {report.asin_main}")
-                return next_version
+            
+            # Write-through: reports are immutable once saved, so the new row becomes the cached latest
+            latest_key = LATEST_REPORT_CACHE_KEY.format(asin_main=report.asin_main)
+            cached = await cache.set_raw(
+                latest_key,
+                orjson.dumps({
+                    'asin_main': db_report.asin_main,
+                    'version': db_report.version,
+                    'summary': db_report.summary,
+                    'generated_at': db_report.generated_at,
+                }),
+                ttl=LATEST_REPORT_CACHE_TTL
+            )
+            if not cached:
+                # Never leave the previous version cached as "latest"
+                await cache.delete(latest_key)
+            
+            return next_version
                 
         except Exception as e:
             logger.error(f"Error saving report for {report.asin_main}: {e}")
@@ -438,10 +460,15 @@ Focus on actionable insights and quantify differences where possible.
     ) -> Dict[str, Any]:
         """Calculate market-level analysis metrics."""
         try:
-            # Get summary data for all ASINs if available
+            # Latest 30-day rollup per ASIN (DISTINCT ON) for all ASINs if available
             result = await session.execute(
-                select(ProductSummary)
-                .where(ProductSummary.asin.in_(all_asins))
+                select(ProductMetricsRollup)
+                .where(
+                    ProductMetricsRollup.asin.in_(all_asins),
+                    ProductMetricsRollup.duration == '30d'
+                )
+                .order_by(ProductMetricsRollup.asin, ProductMetricsRollup.as_of.desc())
+                .distinct(ProductMetricsRollup.asin)
             )
             
             summaries = result.scalars().all()
@@ -450,9 +477,9 @@ Focus on actionable insights and quantify differences where possible.
                 return {'status': 'insufficient_data'}
             
             # Calculate market statistics
-            prices = [float(s.avg_price_30d) for s in summaries if s.avg_price_30d]
-            bsrs = [float(s.avg_bsr_30d) for s in summaries if s.avg_bsr_30d]
-            ratings = [float(s.latest_rating) for s in summaries if s.latest_rating]
+            prices = [float(s.price_avg) for s in summaries if s.price_avg]
+            bsrs = [float(s.bsr_avg) for s in summaries if s.bsr_avg]
+            ratings = [float(s.rating_avg) for s in summaries if s.rating_avg]
             
             return {
                 'market_price_range': {
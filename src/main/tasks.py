@@ -52,6 +52,10 @@ celery_app.conf.beat_schedule = {
     "process-alerts": {
         "task": "src.main.tasks.process_daily_alerts",
         "schedule": crontab(hour=4, minute=0),  # Run at 4:00 AM UTC daily
+    },
+    "maintain-time-partitions": {
+        "task": "src.main.tasks.maintain_time_partitions",
+        "schedule": crontab(hour=1, minute=30),  # Run at 1:30 AM UTC daily, before ingestion
     }
 }
 
@@ -300,6 +304,29 @@ def backfill_data(self, start_date_str: str, end_date_str: str):
         raise self.retry(exc=e, countdown=60, max_retries=3)
 
 
+@celery_app.task(bind=True, name="src.main.tasks.maintain_time_partitions")
+def maintain_time_partitions(self):
+    """Pre-create upcoming time partitions and drop partitions past retention."""
+    async def _maintain_partitions():
+        # Initialize database connection for this worker process
+        from src.main.database import init_db, maintain_time_partitions as _maintain
+        # _maintain ensures the partitions itself; skip init_db's pass so it runs once
+        await init_db(ensure_partitions=False)
+        
+        result = await _maintain()
+        result["status"] = "completed"
+        
+        logger.info(f"Time partitions maintained: {result}")
+        return result
+    
+    try:
+        return run_async_task(_maintain_partitions)
+        
+    except Exception as e:
+        logger.error(f"Time partition maintenance failed: {e}")
+        raise self.retry(exc=e, countdown=60, max_retries=3)
+
+
 # Health check task
 @celery_app.task(name="src.main.tasks.health_check")
 def health_check():
@@ -325,17 +352,14 @@ def calculate_daily_competitor_comparisons(self, target_date_str: str = None):
         await init_db()
         
         from src.main.services.comparison import comparison_service
-        from src.main.services.cache import cache
         
         target_date = datetime.fromisoformat(target_date_str).date() if target_date_str else date.today()
         
         logger.info(f"Calculating competitor comparisons for {target_date}")
         
+        # Clears the affected competition caches itself once the comparisons are written
         processed, failed = await comparison_service.calculate_daily_comparisons(target_date)
         
-        # Clear related caches after calculation
-        await cache.delete_pattern("competition:*")
-        
         result = {
             "target_date": target_date.isoformat(),
             "comparisons_processed": processed,
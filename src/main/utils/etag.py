@@ -16,9 +16,9 @@ def generate_etag(data: Any) -> str:
     """
     try:
         # Convert data to JSON string for consistent hashing
-        if hasattr(data, 'dict'):
+        if hasattr(data, 'model_dump'):
             # Pydantic model
-            json_str = json.dumps(data.dict(), sort_keys=True, default=str)
+            json_str = json.dumps(data.model_dump(), sort_keys=True, default=str)
         elif isinstance(data, dict):
             # Dictionary
             json_str = json.dumps(data, sort_keys=True, default=str)
@@ -104,7 +104,7 @@ class ETagData:
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary for cache storage."""
         return {
-            'data': self.data.dict() if hasattr(self.data, 'dict') else self.data,
+            'data': self.data.model_dump() if hasattr(self.data, 'model_dump') else self.data,
             'etag': self.etag,
             'timestamp': self.timestamp.isoformat()
         }
@@ -45,7 +45,7 @@ class ETLWorker:
             "B0F6BJSTSQ"
         ]
         
-        events_ingested = 0
+        events = []
         
         for i, asin in enumerate(sample_asins[:sample_size]):
             # Create sample product event
@@ -71,8 +71,10 @@ class ETLWorker:
                 job_id=job_id
             )
             
-            await ingest_service.ingest_raw_event(sample_event)
-            events_ingested += 1
+            events.append(sample_event.to_raw_event())
+        
+        # Single COPY for the whole batch instead of one INSERT per event
+        events_ingested = await ingest_service.bulk_ingest_raw_events(events)
         
         logger.info(f"Simulated ingestion completed: {events_ingested} events")
         return events_ingested
@@ -133,7 +135,7 @@ class ETLWorker:
             "proxyConfiguration": {"useApifyProxy": True}
         }
 
-        events_ingested = 0
+        events = []
 
         try:
             # Run the Apify actor
@@ -189,16 +191,18 @@ class ETLWorker:
                         job_id=job_id
                     )
 
-                    await ingest_service.ingest_raw_event(event)
-                    events_ingested += 1
+                    events.append(event.to_raw_event())
 
-                    logger.debug(f"Ingested event for ASIN: {mapped_data['asin']}")
+                    logger.debug(f"Prepared event for ASIN: {mapped_data['asin']}")
 
                 except Exception as e:
                     logger.error(f"Failed to process Apify item: {e}")
                     logger.debug(f"Problematic item: {item}")
                     continue
 
+            # Single COPY for the whole dataset instead of one INSERT per item
+            events_ingested = await ingest_service.bulk_ingest_raw_events(events)
+
             logger.info(f"Real Apify ingestion completed: {events_ingested} events")
             return events_ingested
 
@@ -197,7 +197,7 @@ class TestETLPipeline:
                 mock_alert.previous_value = 49.99
                 mock_alert.change_percent = 20.0
                 mock_alert.message = "Price spike detected"
-                mock_alert.is_resolved = "false"
+                mock_alert.is_resolved = False
                 mock_alert.created_at = datetime.now()
                 
                 mock_get_alerts.return_value = [mock_alert]
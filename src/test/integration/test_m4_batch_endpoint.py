@@ -155,8 +155,8 @@ class TestBatchProductsEndpoint:
         await init_db()
         
         # Mock cache to simulate unavailability
-        with patch('src.main.api.products.cache.get') as mock_cache_get:
-            mock_cache_get.return_value = None  # Cache miss
+        with patch('src.main.api.products.cache.get_many') as mock_cache_get_many:
+            mock_cache_get_many.return_value = {}  # Cache miss
             
             async with AsyncClient(app=app, base_url="http://test") as ac:
                 request_data = {"asins": [RealTestData.PRIMARY_TEST_ASIN]}
@@ -1,29 +1,196 @@
 """Unit tests for alerts service."""
 
+import uuid
 import pytest
 from unittest.mock import AsyncMock, patch, MagicMock
-from datetime import datetime, date, timedelta
+from datetime import datetime, date
 
+from sqlalchemy import create_engine, event, select, insert
+from sqlalchemy.schema import CreateTable
+
+from src.main.models.product import ProductMetricsDaily
+from src.main.models.mart import ProductMetricsRollup, PriceAlerts
 from src.main.services.alerts import AlertService, AlertRule
-from src.test.fixtures.real_test_data import RealTestData, get_test_asin
+from src.test.fixtures.real_test_data import RealTestData
 
+TARGET_DATE = date(2024, 1, 15)
+PREVIOUS_DATE = date(2024, 1, 14)
 
-class TestAlertService:
-    """Test AlertService functionality."""
+
+@pytest.fixture
+def alerts_db():
+    """
+    In-memory SQLite with the core/mart schemas attached and the tables the detection
+    statement reads and writes, so the generated INSERT ... SELECT actually runs.
+    """
+    engine = create_engine("sqlite://")
+    
+    @event.listens_for(engine, "connect")
+    def _setup(dbapi_connection, _):
+        dbapi_connection.execute("ATTACH DATABASE ':memory:' AS core")
+        dbapi_connection.execute("ATTACH DATABASE ':memory:' AS mart")
+        dbapi_connection.create_function("gen_random_uuid", 0, lambda: str(uuid.uuid4()))
+    
+    # Foreign keys are left out: their parent tables are not needed by the statement
+    tables = [ProductMetricsDaily.__table__, ProductMetricsRollup.__table__, PriceAlerts.__table__]
+    with engine.begin() as conn:
+        for table in tables:
+            conn.execute(CreateTable(table, include_foreign_key_constraints=[]))
+    
+    yield engine
+    engine.dispose()
+
+
+def _run_detection(engine, service, today, yesterday, baselines=()):
+    """
+    Load (asin, price, bsr) metrics for TARGET_DATE/PREVIOUS_DATE and (asin, price_avg, bsr_avg)
+    30-day baselines, run the detection statement and return the stored alerts.
+    """
+    with engine.begin() as conn:
+        rows = [
+            {'asin': asin, 'date': day, 'price': price, 'bsr': bsr}
+            for day, metrics in ((TARGET_DATE, today), (PREVIOUS_DATE, yesterday))
+            for asin, price, bsr in metrics
+        ]
+        if rows:
+            conn.execute(insert(ProductMetricsDaily.__table__), rows)
+        if baselines:
+            conn.execute(insert(ProductMetricsRollup.__table__), [
+                {'asin': asin, 'duration': '30d', 'as_of': TARGET_DATE, 'price_avg': price_avg, 'bsr_avg': bsr_avg}
+                for asin, price_avg, bsr_avg in baselines
+            ])
+        
+        conn.execute(service._build_alert_insert(TARGET_DATE, PREVIOUS_DATE, datetime(2024, 1, 15, 4, 0, 0)))
+        
+        alerts = conn.execute(
+            select(PriceAlerts.__table__).order_by(
+                PriceAlerts.asin, PriceAlerts.alert_type, PriceAlerts.threshold_exceeded
+            )
+        ).mappings().all()
+    return [dict(alert) for alert in alerts]
+
+
+class TestAlertDetection:
+    """Rule thresholds and comparisons, checked by executing the detection INSERT ... SELECT."""
     
     @pytest.fixture
     def alert_service(self):
-        # Use default alert rules
         return AlertService()
     
     @pytest.fixture
     def custom_alert_service(self):
-        # Custom rules for testing
-        custom_rules = [
+        return AlertService(alert_rules=[
             AlertRule("price_spike", 10.0, "low"),
             AlertRule("bsr_jump", 25.0, "medium")
+        ])
+    
+    def test_price_spike_hits_lower_threshold_only(self, alerts_db, alert_service):
+        """Test that a 25% price increase triggers the 15% rule but not the 30% rule."""
+        alerts = _run_detection(
+            alerts_db, alert_service,
+            today=[("B000000001", 50.0, 1000)], yesterday=[("B000000001", 40.0, 1000)],
+            baselines=[("B000000001", 42.0, 1100.0)]
+        )
+        
+        assert [(a['alert_type'], a['severity']) for a in alerts] == [("price_spike", "medium")]
+        assert float(alerts[0]['change_percent']) == 25.0
+        assert float(alerts[0]['baseline_value']) == 42.0
+        assert float(alerts[0]['current_value']) == 50.0
+        assert float(alerts[0]['previous_value']) == 40.0
+        assert alerts[0]['is_resolved'] in (False, 0)
+        assert uuid.UUID(alerts[0]['id'])
+    
+    def test_price_drop_at_threshold_hits_both_rules(self, alerts_db, alert_service):
+        """Test that a -40% drop meets the -20% and (inclusively) the -40% rule."""
+        alerts = _run_detection(
+            alerts_db, alert_service,
+            today=[("B000000001", 30.0, 1000)], yesterday=[("B000000001", 50.0, 1000)]
+        )
+        
+        assert [(a['alert_type'], a['severity']) for a in alerts] == [
+            ("price_drop", "high"), ("price_drop", "medium")
         ]
-        return AlertService(alert_rules=custom_rules)
+        assert all(float(a['change_percent']) == -40.0 for a in alerts)
+        assert all(a['baseline_value'] is None for a in alerts)
+    
+    def test_bsr_jump_and_improvement(self, alerts_db, alert_service):
+        """Test BSR rules: +100% hits both jump rules, -33.33% hits the improvement rule."""
+        alerts = _run_detection(
+            alerts_db, alert_service,
+            today=[("B000000001", 50.0, 2000), ("B000000002", 50.0, 1000)],
+            yesterday=[("B000000001", 50.0, 1000), ("B000000002", 50.0, 1500)],
+            baselines=[("B000000002", 50.0, 1400.0)]
+        )
+        
+        assert [(a['asin'], a['alert_type'], a['severity']) for a in alerts] == [
+            ("B000000001", "bsr_jump", "medium"),
+            ("B000000001", "bsr_jump", "high"),
+            ("B000000002", "bsr_improve", "low"),
+        ]
+        assert float(alerts[0]['change_percent']) == 100.0
+        assert float(alerts[2]['change_percent']) == -33.33
+        assert float(alerts[2]['baseline_value']) == 1400.0
+    
+    def test_custom_rules_checked_per_product(self, alerts_db, custom_alert_service):
+        """Test that every product is checked against every configured rule."""
+        alerts = _run_detection(
+            alerts_db, custom_alert_service,
+            today=[("B000000001", 60.0, 1100), ("B000000002", 21.0, 1500), ("B000000003", 99.0, 10)],
+            yesterday=[("B000000001", 50.0, 1000), ("B000000002", 20.0, 1000)],
+            baselines=[("B000000002", None, 1200.0)]
+        )
+        
+        assert [(a['asin'], a['alert_type'], a['severity']) for a in alerts] == [
+            ("B000000001", "price_spike", "low"),
+            ("B000000002", "bsr_jump", "medium"),
+        ]
+        assert float(alerts[0]['change_percent']) == 20.0
+        assert float(alerts[1]['baseline_value']) == 1200.0
+        assert alerts[1]['message'] is None
+        assert custom_alert_service.format_alert_message(MagicMock(**alerts[1])) == \
+            "BSR decline detected for B000000002: #1000 → #1500 (+50.0%)"
+    
+    def test_missing_or_zero_previous_values_are_skipped(self, alerts_db, alert_service):
+        """Test that products without a usable previous-day value produce no alerts."""
+        alerts = _run_detection(
+            alerts_db, alert_service,
+            today=[("B000000001", 50.0, 1000), ("B000000002", 50.0, None)],
+            yesterday=[("B000000002", 0, None)]
+        )
+        
+        assert alerts == []
+    
+    def test_alerts_share_timestamp_and_unique_ids(self, alerts_db, alert_service):
+        """Test that one detection run stamps every alert with the same time and a distinct id."""
+        alerts = _run_detection(
+            alerts_db, alert_service,
+            today=[(f"B00000000{i}", 50.0, 2000) for i in range(5)],
+            yesterday=[(f"B00000000{i}", 40.0, 1000) for i in range(5)]
+        )
+        
+        assert len(alerts) == 15  # price_spike medium + bsr_jump medium/high per product
+        assert len({a['created_at'] for a in alerts}) == 1
+        assert len({a['id'] for a in alerts}) == len(alerts)
+    
+    def test_no_rules_detects_nothing(self, alerts_db):
+        """Test that a service without applicable rules inserts no alerts."""
+        service = AlertService(alert_rules=[AlertRule("unknown_rule", 1.0, "low")])
+        
+        alerts = _run_detection(
+            alerts_db, service,
+            today=[("B000000001", 50.0, 2000)], yesterday=[("B000000001", 40.0, 1000)]
+        )
+        
+        assert alerts == []
+
+
+class TestAlertService:
+    """Test AlertService functionality."""
+    
+    @pytest.fixture
+    def alert_service(self):
+        # Use default alert rules
+        return AlertService()
     
     @pytest.mark.asyncio
     async def test_process_daily_alerts_success(self, alert_service):
@@ -34,135 +201,34 @@ class TestAlertService:
             mock_db = AsyncMock()
             mock_session.return_value.__aenter__.return_value = mock_db
             
-            # Mock current metrics query
-            mock_current = MagicMock()
-            mock_current.asin = RealTestData.PRIMARY_TEST_ASIN
-            mock_current.current_price = 21.99
-            mock_current.current_bsr = 1500
-            
-            mock_result = AsyncMock()
-            mock_result.__iter__.return_value = [mock_current]
-            mock_db.execute.return_value = mock_result
-            
-            # Mock alert detection
-            with patch.object(alert_service, '_detect_product_alerts') as mock_detect, \
-                 patch.object(alert_service, '_create_alert') as mock_create:
-                
-                # Mock 2 alerts detected
-                mock_detect.return_value = [{"alert": "data1"}, {"alert": "data2"}]
-                
-                alerts_created = await alert_service.process_daily_alerts(target_date)
-                
-                assert alerts_created == 2
-                assert mock_detect.call_count == 1
-                assert mock_create.call_count == 2
-    
-    @pytest.mark.asyncio
-    async def test_detect_product_alerts_price_spike(self, alert_service):
-        """Test detecting price spike alerts."""
-        with patch('src.main.services.alerts.get_db_session') as mock_session:
-            mock_db = AsyncMock()
-            mock_session.return_value.__aenter__.return_value = mock_db
-            
-            # Mock previous metrics (price was $40, now $50 = 25% increase)
-            mock_previous = MagicMock()
-            mock_previous.price = 40.0
-            mock_previous.bsr = 1000
-            
-            prev_result = MagicMock()
-            prev_result.scalar_one_or_none.return_value = mock_previous
-            
-            # Mock product summary (for baseline)
-            mock_summary = MagicMock()
-            mock_summary.avg_price_30d = 42.0
-            mock_summary.avg_bsr_30d = 1100.0
-            
-            summary_result = MagicMock()
-            summary_result.scalar_one_or_none.return_value = mock_summary
-            
-            mock_db.execute = AsyncMock(side_effect=[prev_result, summary_result])
-            
-            alerts = await alert_service._detect_product_alerts(
-                mock_db, RealTestData.PRIMARY_TEST_ASIN, date.today(), date.today() - timedelta(days=1),
-                50.0, 1000  # current_price, current_bsr
-            )
-            
-            # Should detect price spike (25% > 15% threshold)
-            assert len(alerts) >= 1
-            price_spike_alerts = [a for a in alerts if a['alert_type'] == 'price_spike']
-            assert len(price_spike_alerts) >= 1
-            assert price_spike_alerts[0]['change_percent'] == 25.0
-    
-    @pytest.mark.asyncio
-    async def test_detect_product_alerts_bsr_improvement(self, alert_service):
-        """Test detecting BSR improvement alerts."""
-        with patch('src.main.services.alerts.get_db_session') as mock_session:
-            mock_db = AsyncMock()
-            mock_session.return_value.__aenter__.return_value = mock_db
-            
-            # Mock previous metrics (BSR was 1500, now 1000 = -33% = improvement)
-            mock_previous = MagicMock()
-            mock_previous.price = 50.0
-            mock_previous.bsr = 1500
-            
-            prev_result = MagicMock()
-            prev_result.scalar_one_or_none.return_value = mock_previous
-            
-            # Mock product summary
-            mock_summary = MagicMock()
-            mock_summary.avg_price_30d = 50.0
-            mock_summary.avg_bsr_30d = 1400.0
-            
-            summary_result = MagicMock()
-            summary_result.scalar_one_or_none.return_value = mock_summary
+            # Mock INSERT ... SELECT result
+            mock_result = MagicMock()
+            mock_result.rowcount = 2
+            mock_db.execute = AsyncMock(return_value=mock_result)
             
-            mock_db.execute = AsyncMock(side_effect=[prev_result, summary_result])
+            alerts_created = await alert_service.process_daily_alerts(target_date)
             
-            alerts = await alert_service._detect_product_alerts(
-                mock_db, RealTestData.PRIMARY_TEST_ASIN, date.today(), date.today() - timedelta(days=1),
-                50.0, 1000  # current_price, current_bsr
-            )
-            
-            # Should detect BSR improvement (-33.3% < -30% threshold)
-            bsr_improve_alerts = [a for a in alerts if a['alert_type'] == 'bsr_improve']
-            assert len(bsr_improve_alerts) >= 1
-            assert bsr_improve_alerts[0]['change_percent'] < -30.0
-    
-    def test_check_price_alerts_spike(self, alert_service):
-        """Test price spike detection logic."""
-        alerts = alert_service._check_price_alerts(
-            RealTestData.PRIMARY_TEST_ASIN, 50.0, 40.0, 42.0  # current, previous, baseline
-        )
-        
-        # 25% increase should trigger both 15% medium and 30% thresholds (but only 15%)
-        price_spike_alerts = [a for a in alerts if a['alert_type'] == 'price_spike']
-        assert len(price_spike_alerts) >= 1
-        assert price_spike_alerts[0]['change_percent'] == 25.0
-        assert price_spike_alerts[0]['severity'] == 'medium'  # 15% threshold
+            assert alerts_created == 2
+            # Detection and insert run server-side in one statement
+            mock_db.execute.assert_called_once()
+            mock_db.commit.assert_called_once()
     
-    def test_check_price_alerts_drop(self, alert_service):
-        """Test price drop detection logic."""
-        alerts = alert_service._check_price_alerts(
-            RealTestData.PRIMARY_TEST_ASIN, 30.0, 50.0, 45.0  # current, previous, baseline
-        )
+    def test_build_alert_insert(self, alert_service):
+        """Test that the detection statement compiles for Postgres as one INSERT ... SELECT."""
+        from sqlalchemy.dialects import postgresql
         
-        # -40% drop should trigger the -20% threshold
-        price_drop_alerts = [a for a in alerts if a['alert_type'] == 'price_drop']
-        assert len(price_drop_alerts) >= 1
-        assert price_drop_alerts[0]['change_percent'] == -40.0
-        assert price_drop_alerts[0]['severity'] == 'medium'  # -20% threshold
-    
-    def test_check_bsr_alerts_jump(self, alert_service):
-        """Test BSR jump detection logic."""
-        alerts = alert_service._check_bsr_alerts(
-            RealTestData.PRIMARY_TEST_ASIN, 2000, 1000, 1100.0  # current, previous, baseline
+        statement = alert_service._build_alert_insert(
+            date(2024, 1, 15), date(2024, 1, 14), datetime(2024, 1, 15, 4, 0, 0)
         )
+        sql = str(statement.compile(dialect=postgresql.dialect()))
         
-        # 100% increase (worse ranking) should trigger both 50% and 100% thresholds
-        bsr_jump_alerts = [a for a in alerts if a['alert_type'] == 'bsr_jump']
-        assert len(bsr_jump_alerts) >= 1
-        assert bsr_jump_alerts[0]['change_percent'] == 100.0
-        assert bsr_jump_alerts[0]['severity'] in ['medium', 'high']
+        assert sql.count("INSERT INTO") == 1
+        assert "UNION ALL" in sql
+        assert "gen_random_uuid()" in sql
+        assert "INSERT INTO mart.price_alerts (id, asin, alert_type, severity" in sql
+        assert "mart.product_metrics_rollup AS baseline" in sql
+        # One literal SELECT per configured rule, plus the two metric branches
+        assert sql.count("UNION ALL") == (len(alert_service.alert_rules) - 1) + 1
     
     def test_generate_alert_message(self, alert_service):
         """Test alert message generation."""
@@ -174,6 +240,19 @@ class TestAlertService:
         for part in expected_parts:
             assert part.lower() in message.lower()
     
+    def test_format_alert_message_from_stored_columns(self, alert_service):
+        """Test that messages are formatted from a stored alert's columns."""
+        alert = MagicMock(
+            alert_type="price_drop", asin=RealTestData.PRIMARY_TEST_ASIN,
+            current_value=30.0, previous_value=50.0, change_percent=-40.0
+        )
+        
+        message = alert_service.format_alert_message(alert)
+        
+        assert message == alert_service._generate_alert_message(
+            "price_drop", RealTestData.PRIMARY_TEST_ASIN, 30.0, 50.0, -40.0
+        )
+    
     def test_generate_bsr_alert_message(self, alert_service):
         """Test BSR alert message generation."""
         message = alert_service._generate_bsr_alert_message(
@@ -229,17 +308,16 @@ class TestAlertService:
             mock_db = AsyncMock()
             mock_session.return_value.__aenter__.return_value = mock_db
             
-            # Mock breakdown query
-            mock_breakdown = [
-                MagicMock(alert_type="price_spike", severity="medium", count=5),
-                MagicMock(alert_type="bsr_jump", severity="high", count=2)
+            # Mock breakdown rows plus the grand-total grouping set row (level 3)
+            mock_rows = [
+                MagicMock(alert_type="price_spike", severity="medium", level=0, count=5, active=2),
+                MagicMock(alert_type="bsr_jump", severity="high", level=0, count=2, active=1),
+                MagicMock(alert_type=None, severity=None, level=3, count=10, active=3)
             ]
             
-            # Mock total and active counts
             mock_execute_result = MagicMock()
-            mock_execute_result.all.return_value = mock_breakdown
+            mock_execute_result.all.return_value = mock_rows
             mock_db.execute = AsyncMock(return_value=mock_execute_result)
-            mock_db.scalar = AsyncMock(side_effect=[10, 3])  # total_alerts, active_alerts
             
             summary = await alert_service.get_alert_summary(days=7)
             
@@ -254,4 +332,5 @@ class TestAlertService:
                 'period_days': 7
             }
             
-            assert summary == expected_summary
\ No newline at end of file
+            assert summary == expected_summary
+            mock_db.execute.assert_called_once()
\ No newline at end of file
@@ -1,11 +1,15 @@
 """Unit tests for cache service."""
 
+import asyncio
 import pytest
 from datetime import datetime, timedelta
 from unittest.mock import AsyncMock, patch, MagicMock
 import json
+from decimal import Decimal
 
-from src.main.services.cache import CacheEntry, CacheService
+from src.main.services.cache import (
+    CacheEntry, CacheService, CACHE_FORMAT_VERSION, CACHE_FLAG_ZSTD, CACHE_COMPRESS_MIN_BYTES
+)
 
 
 class TestCacheEntry:
@@ -29,7 +33,7 @@ class TestCacheEntry:
         assert entry.stale_at == now + timedelta(seconds=1800)
     
     def test_cache_entry_is_expired(self):
-        """Test is_expired property."""
+        """Test is_expired check."""
         past_time = datetime.now() - timedelta(hours=2)
         entry = CacheEntry(
             data={"test": "data"}, 
@@ -37,10 +41,10 @@ class TestCacheEntry:
             ttl_seconds=3600, 
             stale_seconds=1800
         )
-        assert entry.is_expired is True
+        assert entry.is_expired() is True
     
     def test_cache_entry_is_stale(self):
-        """Test is_stale property."""
+        """Test is_stale check."""
         past_time = datetime.now() - timedelta(minutes=45)
         entry = CacheEntry(
             data={"test": "data"}, 
@@ -48,8 +52,11 @@ class TestCacheEntry:
             ttl_seconds=3600, 
             stale_seconds=1800
         )
-        assert entry.is_stale is True
-        assert entry.is_expired is False
+        assert entry.is_stale() is True
+        assert entry.is_expired() is False
+        # Callers pass one shared epoch timestamp per cache operation
+        assert entry.is_stale(past_time.timestamp() + 1799) is False
+        assert entry.is_stale(past_time.timestamp() + 1801) is True
     
     def test_cache_entry_serialization(self):
         """Test to_dict and from_dict methods."""
@@ -69,14 +76,78 @@ class TestCacheEntry:
         assert reconstructed.ttl_seconds == entry.ttl_seconds
         assert reconstructed.stale_seconds == entry.stale_seconds
 
+    
+    def test_cache_entry_wire_round_trip(self):
+        """Test that entries survive the Redis wire encoding, including datetime and Decimal data."""
+        now = datetime.now()
+        entry = CacheEntry(
+            data={"price": Decimal("19.99"), "last_updated": now, "items": [1, 2]},
+            cached_at=now,
+            ttl_seconds=3600,
+            stale_seconds=1800
+        )
+        
+        raw = entry.to_bytes()
+        reconstructed = CacheEntry.from_bytes(raw)
+        
+        assert raw[:1] == CACHE_FORMAT_VERSION
+        # Freshness checks work off the binary header; data and cached_at are only decoded when read
+        assert reconstructed.is_stale() is False
+        assert reconstructed._payload is not None
+        assert reconstructed._cached_at is None
+        assert reconstructed.cached_at == now
+        assert reconstructed.data["price"] == "19.99"
+        assert datetime.fromisoformat(reconstructed.data["last_updated"]) == now
+        assert reconstructed.data["items"] == [1, 2]
+    
+    def test_cache_entry_compresses_large_payloads(self):
+        """Test that large entries are zstd-compressed and small ones are stored as-is."""
+        pytest.importorskip("zstandard")
+        now = datetime.now()
+        large = CacheEntry(
+            data={"rows": [{"asin": f"B{i:09d}", "price": 19.99} for i in range(500)]},
+            cached_at=now,
+            ttl_seconds=3600,
+            stale_seconds=1800
+        )
+        small = CacheEntry(data={"a": 1}, cached_at=now, ttl_seconds=3600, stale_seconds=1800)
+        
+        large_raw = large.to_bytes()
+        
+        assert large_raw[:1] == CACHE_FORMAT_VERSION
+        assert large_raw[1] & CACHE_FLAG_ZSTD
+        assert len(large_raw) < CACHE_COMPRESS_MIN_BYTES
+        assert CacheEntry.from_bytes(large_raw).data == large.data
+        assert not small.to_bytes()[1] & CACHE_FLAG_ZSTD
+    
+    def test_cache_entry_reads_legacy_json(self):
+        """Test that entries written in the previous JSON layout are still readable."""
+        now = datetime.now()
+        entry = CacheEntry(
+            data={"test": "data"}, 
+            cached_at=now, 
+            ttl_seconds=3600, 
+            stale_seconds=1800
+        )
+        
+        reconstructed = CacheEntry.from_bytes(json.dumps(entry.to_dict(), default=str))
+        
+        assert reconstructed.data == {"test": "data"}
+        assert reconstructed.cached_at == now
+        assert reconstructed.stale_at == entry.stale_at
 
 class TestCacheService:
     """Test CacheService class."""
     
     @pytest.fixture
-    def cache_service(self):
-        """Create CacheService instance."""
-        return CacheService()
+    async def cache_service(self):
+        """Create CacheService instance, stopping its background workers afterwards."""
+        service = CacheService()
+        yield service
+        tasks = list(service._background_tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
     
     @pytest.mark.asyncio
     async def test_cache_miss(self, cache_service, mock_redis):
@@ -173,9 +244,213 @@ class TestCacheService:
             assert data == {"data": "fresh_from_db"}
             assert cached is False
             assert stale_at is None
-            mock_redis.delete.assert_called_once_with("test_key")
+            # GET + SETEX only: the refetch overwrites the expired entry, no DELETE round trip
+            mock_redis.delete.assert_not_called()
             mock_redis.setex.assert_called()
     
+    @pytest.mark.asyncio
+    async def test_invalid_entry_is_overwritten(self, cache_service, mock_redis):
+        """Test that an undecodable entry is refetched and overwritten without a DELETE."""
+        mock_redis.get.return_value = b"not a cache entry"
+        
+        with patch('src.main.services.cache.redis_client', mock_redis):
+            async def fetch_func():
+                return {"data": "fresh_from_db"}
+            
+            data, cached, _ = await cache_service.get_or_set(
+                "test_key", fetch_func, ttl_seconds=3600, stale_seconds=1800
+            )
+        
+        assert data == {"data": "fresh_from_db"}
+        assert cached is False
+        mock_redis.delete.assert_not_called()
+        mock_redis.setex.assert_called_once()
+    
+    @pytest.mark.asyncio
+    async def test_raw_values_skip_envelope(self, cache_service, mock_redis):
+        """Test that set_raw/get_raw store and return bytes as-is with a Redis TTL."""
+        mock_redis.get.return_value = b'{"version": 3}'
+        
+        with patch('src.main.services.cache.redis_client', mock_redis):
+            assert await cache_service.set_raw("report:B0:latest:raw", b'{"version": 3}', ttl=60) is True
+            assert await cache_service.get_raw("report:B0:latest:raw") == b'{"version": 3}'
+        
+        mock_redis.setex.assert_called_once_with("report:B0:latest:raw", 60, b'{"version": 3}')
+    
+    @pytest.mark.asyncio
+    async def test_l1_serves_fresh_hits_until_invalidated(self, cache_service, mock_redis):
+        """Test that fresh entries are served from the in-process L1 and dropped by delete_pattern."""
+        entry = CacheEntry(
+            data={"data": "from_cache"},
+            cached_at=datetime.now(),
+            ttl_seconds=3600,
+            stale_seconds=1800
+        )
+        mock_redis.get.return_value = entry.to_bytes()
+        
+        async def fetch_func():
+            return {"data": "fresh_from_db"}
+        
+        async def scan_iter(match=None, count=None):
+            yield "product:B0:summary"
+        
+        mock_pipe = MagicMock()
+        mock_pipe.execute = AsyncMock(return_value=[1])
+        mock_redis.scan_iter = scan_iter
+        mock_redis.pipeline = MagicMock(return_value=mock_pipe)
+        
+        with patch('src.main.services.cache.redis_client', mock_redis):
+            for _ in range(3):
+                data, cached, _ = await cache_service.get_or_set("product:B0:summary", fetch_func)
+                assert data == {"data": "from_cache"}
+                assert cached is True
+            
+            assert mock_redis.get.call_count == 1
+            
+            await cache_service.delete_pattern("product:*")
+            await cache_service.get_or_set("product:B0:summary", fetch_func)
+        
+        assert mock_redis.get.call_count == 2
+    
+    @pytest.mark.asyncio
+    async def test_indexed_keys_are_deleted_by_tag_set(self, cache_service, mock_redis):
+        """Test that indexed writes record the key in its tag set and delete_by_index removes them."""
+        mock_pipe = MagicMock()
+        mock_pipe.execute = AsyncMock(return_value=[2, 1])
+        mock_redis.pipeline = MagicMock(return_value=mock_pipe)
+        mock_redis.smembers = AsyncMock(return_value={b"product:B0:summary", b"product:B0:history"})
+        
+        async def fetch_func():
+            return {"data": "fresh_from_db"}
+        
+        with patch('src.main.services.cache.redis_client', mock_redis):
+            await cache_service.get_or_set(
+                "product:B0:summary", fetch_func, ttl_seconds=3600, stale_seconds=1800,
+                index_keys=("idx:product:B0",)
+            )
+            
+            mock_pipe.sadd.assert_called_once_with("idx:product:B0", "product:B0:summary")
+            mock_pipe.expire.assert_called_once_with("idx:product:B0", 3600)
+            assert "product:B0:summary" in cache_service._l1
+            
+            deleted = await cache_service.delete_by_index("idx:product:B0")
+        
+        assert deleted == 2
+        assert "product:B0:summary" not in cache_service._l1
+        assert sorted(len(call.args) for call in mock_pipe.unlink.call_args_list) == [1, 2]
+        mock_redis.scan_iter.assert_not_called()
+    
+    @pytest.mark.asyncio
+    async def test_invalidation_notifies_listeners_concurrently(self, cache_service):
+        """Test that one failing listener does not stop the others from being notified."""
+        good_listener = AsyncMock()
+        bad_listener = AsyncMock(side_effect=RuntimeError("listener failed"))
+        cache_service.add_invalidation_listener(good_listener)
+        cache_service.add_invalidation_listener(bad_listener)
+        
+        with patch.object(cache_service, 'delete_pattern', AsyncMock(return_value=3)) as mock_delete:
+            await cache_service._process_invalidation(
+                json.dumps({"pattern": "product:*", "reason": "test"})
+            )
+        
+        mock_delete.assert_awaited_once_with("product:*")
+        good_listener.assert_awaited_once_with("product:*", "test", 3)
+        bad_listener.assert_awaited_once_with("product:*", "test", 3)
+    
+    @pytest.mark.asyncio
+    async def test_keyed_invalidation_only_clears_l1(self, cache_service, mock_redis):
+        """Test that a message carrying the deleted keys clears L1 without touching Redis."""
+        cache_service._l1["product:B0:summary"] = MagicMock()
+        cache_service._l1["product:B1:summary"] = MagicMock()
+        
+        with patch('src.main.services.cache.redis_client', mock_redis):
+            await cache_service._process_invalidation(json.dumps({
+                "pattern": "idx:product:B0", "reason": "test", "keys": ["product:B0:summary"]
+            }))
+        
+        assert "product:B0:summary" not in cache_service._l1
+        assert "product:B1:summary" in cache_service._l1
+        mock_redis.smembers.assert_not_called()
+        mock_redis.scan_iter.assert_not_called()
+    
+    @pytest.mark.asyncio
+    async def test_invalidation_reader_coalesces_when_queue_full(self, cache_service, mock_redis):
+        """Test that messages overflowing the queue are coalesced by pattern and still applied."""
+        patterns = ["product:0", "product:1", "product:1", "product:2", "product:1"]
+        
+        async def listen():
+            # Messages arrive faster than the workers run, overflowing the one-slot queue
+            for pattern in patterns:
+                yield {'type': 'message', 'data': json.dumps({"pattern": pattern})}
+            await asyncio.sleep(0.05)
+        
+        pubsub = MagicMock()
+        pubsub.subscribe = AsyncMock()
+        pubsub.listen = listen
+        mock_redis.pubsub = MagicMock(return_value=pubsub)
+        
+        with patch('src.main.services.cache.redis_client', mock_redis), \
+             patch('src.main.services.cache.INVALIDATION_QUEUE_SIZE', 1), \
+             patch.object(cache_service, 'delete_pattern', AsyncMock(return_value=1)) as mock_delete:
+            await asyncio.wait_for(cache_service.subscribe_to_invalidations(), timeout=1)
+        
+        deleted = [call.args[0] for call in mock_delete.await_args_list]
+        assert deleted[0] == "product:0"
+        assert sorted(deleted[1:]) == ["product:1", "product:2"]
+    
+    @pytest.mark.asyncio
+    async def test_coalesced_pattern_delete_supersedes_keys(self, cache_service):
+        """Test that keyed overflow messages merge, and a pattern delete replaces them."""
+        coalesced = {}
+        
+        cache_service._coalesce_invalidation(coalesced, json.dumps({"pattern": "idx:product:B0", "keys": ["a"]}))
+        cache_service._coalesce_invalidation(coalesced, json.dumps({"pattern": "idx:product:B0", "keys": ["b"]}))
+        assert coalesced == {"idx:product:B0": {"a", "b"}}
+        
+        cache_service._coalesce_invalidation(coalesced, json.dumps({"pattern": "idx:product:B0"}))
+        cache_service._coalesce_invalidation(coalesced, json.dumps({"pattern": "idx:product:B0", "keys": ["c"]}))
+        assert coalesced == {"idx:product:B0": None}
+    
+    @pytest.mark.asyncio
+    async def test_background_refreshes_are_bounded(self, cache_service, mock_redis):
+        """Test that stale refreshes for many keys never exceed the refresh worker count."""
+        running = 0
+        peak = 0
+        
+        async def fetch_func():
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0)
+            running -= 1
+            return {"data": "fresh_from_db"}
+        
+        with patch('src.main.services.cache.redis_client', mock_redis), \
+             patch('src.main.services.cache.BACKGROUND_REFRESH_WORKERS', 2):
+            for i in range(10):
+                cache_service._schedule_background_refresh(f"key:{i}", fetch_func, 3600, 1800)
+            await cache_service._refresh_queue.join()
+        
+        assert peak == 2
+        assert mock_redis.setex.call_count == 10
+        assert cache_service._refreshing == set()
+    
+    @pytest.mark.asyncio
+    async def test_background_refresh_dropped_when_queue_full(self, cache_service, mock_redis):
+        """Test that a refresh is dropped, not queued as pending, once the refresh queue is full."""
+        async def fetch_func():
+            return {"data": "fresh_from_db"}
+        
+        with patch('src.main.services.cache.redis_client', mock_redis), \
+             patch('src.main.services.cache.REFRESH_QUEUE_SIZE', 1):
+            cache_service._schedule_background_refresh("key:1", fetch_func, 3600, 1800)
+            cache_service._schedule_background_refresh("key:2", fetch_func, 3600, 1800)
+            
+            assert cache_service._refreshing == {"key:1"}
+            await cache_service._refresh_queue.join()
+        
+        assert mock_redis.setex.call_count == 1
+    
     @pytest.mark.asyncio
     async def test_redis_unavailable(self, cache_service):
         """Test behavior when Redis is unavailable."""
@@ -189,4 +464,183 @@ class TestCacheService:
             
             assert data == {"data": "direct_from_db"}
             assert cached is False
-            assert stale_at is None
\ No newline at end of file
+            assert stale_at is None
+
+    
+    @pytest.mark.asyncio
+    async def test_delete_pattern_scans_and_unlinks_in_batches(self, cache_service):
+        """Test that delete_pattern uses SCAN + batched UNLINK instead of KEYS."""
+        keys = [f"product:B{i:09d}:summary" for i in range(1200)]
+        
+        async def scan_iter(match=None, count=None):
+            for key in keys:
+                yield key
+        
+        mock_pipe = MagicMock()
+        mock_pipe.execute = AsyncMock(return_value=[500, 500, 200])
+        mock_client = MagicMock()
+        mock_client.scan_iter = scan_iter
+        mock_client.pipeline.return_value = mock_pipe
+        mock_client.keys = AsyncMock()
+        
+        with patch('src.main.services.cache.redis_client', mock_client):
+            deleted = await cache_service.delete_pattern("product:*")
+        
+        assert deleted == 1200
+        mock_client.keys.assert_not_called()
+        mock_client.pipeline.assert_called_once_with(transaction=False)
+        assert [len(call.args) for call in mock_pipe.unlink.call_args_list] == [500, 500, 200]
+        mock_pipe.execute.assert_awaited_once()
+    
+    @pytest.mark.asyncio
+    async def test_get_many_batches_reads_fetches_and_writes(self, cache_service):
+        """Test that get_many uses one MGET, one fetch for all misses and one pipelined write."""
+        fresh = CacheEntry(
+            data={"data": "from_cache"},
+            cached_at=datetime.now(),
+            ttl_seconds=3600,
+            stale_seconds=1800
+        )
+        expired = CacheEntry(
+            data={"data": "expired"},
+            cached_at=datetime.now() - timedelta(hours=2),
+            ttl_seconds=3600,
+            stale_seconds=1800
+        )
+        
+        mock_pipe = MagicMock()
+        mock_pipe.execute = AsyncMock(return_value=[True, True])
+        mock_client = MagicMock()
+        mock_client.mget = AsyncMock(return_value=[fresh.to_bytes(), None, expired.to_bytes()])
+        mock_client.pipeline.return_value = mock_pipe
+        
+        fetched_keys = []
+        
+        async def fetch_many(keys):
+            fetched_keys.append(keys)
+            return {key: {"data": f"fresh:{key}"} for key in keys}
+        
+        with patch('src.main.services.cache.redis_client', mock_client):
+            results = await cache_service.get_many(["a", "b", "c"], fetch_many, ttl_seconds=3600)
+        
+        assert results == {
+            "a": {"data": "from_cache"},
+            "b": {"data": "fresh:b"},
+            "c": {"data": "fresh:c"},
+        }
+        mock_client.mget.assert_awaited_once_with(["a", "b", "c"])
+        assert fetched_keys == [["b", "c"]]
+        assert [call.args[:2] for call in mock_pipe.setex.call_args_list] == [("b", 3600), ("c", 3600)]
+        mock_pipe.execute.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_get_many_without_fetch_is_read_only(self, cache_service):
+        """Test that get_many without fetch_many_func only returns live hits and writes nothing."""
+        fresh = CacheEntry(
+            data={"data": "from_cache"},
+            cached_at=datetime.now(),
+            ttl_seconds=3600,
+            stale_seconds=1800
+        )
+        expired = CacheEntry(
+            data={"data": "expired"},
+            cached_at=datetime.now() - timedelta(hours=2),
+            ttl_seconds=3600,
+            stale_seconds=1800
+        )
+        
+        mock_client = MagicMock()
+        mock_client.mget = AsyncMock(return_value=[fresh.to_bytes(), None, expired.to_bytes()])
+        
+        with patch('src.main.services.cache.redis_client', mock_client):
+            results = await cache_service.get_many(["a", "b", "c"])
+        
+        assert results == {"a": {"data": "from_cache"}}
+        mock_client.pipeline.assert_not_called()
+
+    
+    @pytest.mark.asyncio
+    async def test_concurrent_misses_fetch_once(self, cache_service, mock_redis):
+        """Test that concurrent misses for the same key share a single fetch."""
+        calls = 0
+        release = asyncio.Event()
+        
+        async def fetch_func():
+            nonlocal calls
+            calls += 1
+            await release.wait()
+            return {"data": "fresh_from_db"}
+        
+        with patch('src.main.services.cache.redis_client', mock_redis):
+            mock_redis.get.return_value = None
+            
+            requests = [
+                asyncio.create_task(cache_service.get_or_set("test_key", fetch_func, ttl_seconds=300, stale_seconds=60))
+                for _ in range(5)
+            ]
+            await asyncio.sleep(0)
+            release.set()
+            results = await asyncio.gather(*requests)
+        
+        assert calls == 1
+        assert all(result == ({"data": "fresh_from_db"}, False, None) for result in results)
+        mock_redis.setex.assert_called_once()
+        assert cache_service._inflight == {}
+
+    
+    @pytest.mark.asyncio
+    async def test_stale_hits_schedule_single_refresh(self, cache_service, mock_redis):
+        """Test that repeated stale hits only schedule one background refresh per key."""
+        past_time = datetime.now() - timedelta(minutes=45)
+        entry = CacheEntry(
+            data={"data": "stale_from_cache"}, 
+            cached_at=past_time, 
+            ttl_seconds=3600, 
+            stale_seconds=1800
+        )
+        mock_redis.get.return_value = entry.to_bytes()
+        
+        calls = 0
+        release = asyncio.Event()
+        
+        async def fetch_func():
+            nonlocal calls
+            calls += 1
+            await release.wait()
+            return {"data": "fresh_from_db"}
+        
+        with patch('src.main.services.cache.redis_client', mock_redis):
+            for _ in range(3):
+                data, cached, _ = await cache_service.get_or_set(
+                    "test_key", fetch_func, ttl_seconds=3600, stale_seconds=1800
+                )
+                assert data == {"data": "stale_from_cache"}
+                assert cached is True
+            
+            assert cache_service._refreshing == {"test_key"}
+            release.set()
+            await cache_service._refresh_queue.join()
+        
+        assert calls == 1
+        assert cache_service._refreshing == set()
+
+
+class TestRedisPool:
+    """Test Redis connection pool setup."""
+    
+    @pytest.mark.asyncio
+    async def test_init_redis_uses_blocking_pool(self):
+        """Test that the shared pool waits for a free connection instead of raising at the cap."""
+        import redis.asyncio as redis
+        from src.main.services import cache
+        
+        with patch.object(redis.Redis, 'ping', AsyncMock(return_value=True)), \
+             patch('src.main.services.cache.settings.redis_max_connections', 8), \
+             patch('src.main.services.cache.settings.redis_pool_timeout', 2.5):
+            await cache.init_redis()
+            pool = cache.redis_client.connection_pool
+            await cache.close_redis()
+        
+        assert isinstance(pool, redis.BlockingConnectionPool)
+        assert pool.max_connections == 8
+        assert pool.timeout == 2.5
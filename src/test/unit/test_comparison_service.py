@@ -8,6 +8,20 @@ from src.main.services.comparison import CompetitorComparisonService, Comparison
 from src.test.fixtures.real_test_data import RealTestData, get_test_asin
 
 
+class MockStreamResult:
+    """Async-iterable stand-in for the AsyncResult returned by session.stream()."""
+    
+    def __init__(self, rows):
+        self._rows = list(rows)
+    
+    def __aiter__(self):
+        return self._aiter()
+    
+    async def _aiter(self):
+        for row in self._rows:
+            yield row
+
+
 class TestCompetitorComparisonService:
     """Test CompetitorComparisonService functionality."""
     
@@ -37,9 +51,9 @@ class TestCompetitorComparisonService:
             mock_db = AsyncMock()
             mock_session.return_value.__aenter__.return_value = mock_db
             
-            # Mock execute to return successful rowcount for 2 out of 5 competitors
-            mock_result = AsyncMock()
-            mock_result.rowcount = 1  # Simulate successful insert
+            # Mock RETURNING rows for 2 out of 5 competitors
+            mock_result = MagicMock()
+            mock_result.scalars.return_value.all.return_value = real_competitor_asins[:2]
             mock_db.execute.return_value = mock_result
             
             created_count = await service.setup_competitor_links(real_main_asin, real_competitor_asins)
@@ -50,7 +64,8 @@ class TestCompetitorComparisonService:
             
             # Verify database operations
             mock_session.assert_called_once()
-            assert mock_db.execute.call_count >= 1  # Should execute at least one INSERT
+            assert mock_db.execute.call_count == 2  # Advisory lock + single multi-row INSERT
+            assert "pg_advisory_xact_lock" in str(mock_db.execute.call_args_list[0].args[0])
             mock_db.commit.assert_called_once()  # Should commit transaction
     
     @pytest.mark.asyncio
@@ -64,13 +79,13 @@ class TestCompetitorComparisonService:
             
             # Mock successful insertions
             mock_result = MagicMock()
-            mock_result.rowcount = 1
+            mock_result.scalars.return_value.all.return_value = mock_competitor_asins
             mock_db.execute = AsyncMock(return_value=mock_result)
             
             created_count = await service.setup_competitor_links(main_asin, mock_competitor_asins)
             
             assert created_count == 5
-            assert mock_db.execute.call_count == 5
+            assert mock_db.execute.call_count == 2
             mock_db.commit.assert_called_once()
     
     @pytest.mark.asyncio
@@ -82,20 +97,15 @@ class TestCompetitorComparisonService:
             mock_db = AsyncMock()
             mock_session.return_value.__aenter__.return_value = mock_db
             
-            # Mock mixed results - some succeed, some already exist
-            mock_results = [
-                MagicMock(rowcount=1),  # New link
-                MagicMock(rowcount=0),  # Duplicate
-                MagicMock(rowcount=1),  # New link
-                MagicMock(rowcount=0),  # Duplicate
-                MagicMock(rowcount=1),  # New link
-            ]
-            mock_db.execute = AsyncMock(side_effect=mock_results)
+            # Mock mixed results - RETURNING only yields the links that did not exist yet
+            mock_result = MagicMock()
+            mock_result.scalars.return_value.all.return_value = mock_competitor_asins[::2]
+            mock_db.execute = AsyncMock(return_value=mock_result)
             
             created_count = await service.setup_competitor_links(main_asin, mock_competitor_asins)
             
             assert created_count == 3  # Only 3 new links created
-            assert mock_db.execute.call_count == 5
+            assert mock_db.execute.call_count == 2
     
     @pytest.mark.asyncio
     async def test_setup_competitor_links_skips_self_reference(self, service):
@@ -108,13 +118,39 @@ class TestCompetitorComparisonService:
             mock_session.return_value.__aenter__.return_value = mock_db
             
             mock_result = MagicMock()
-            mock_result.rowcount = 1
+            mock_result.scalars.return_value.all.return_value = [competitor_asins[0], competitor_asins[2]]
             mock_db.execute = AsyncMock(return_value=mock_result)
             
             created_count = await service.setup_competitor_links(main_asin, competitor_asins)
             
             assert created_count == 2  # Only 2 links created (self skipped)
             assert mock_db.execute.call_count == 2
+            
+            # Self-reference is filtered before the statement is built
+            params = mock_db.execute.call_args_list[1].args[0].compile().params
+            assert main_asin not in [v for k, v in params.items() if k.startswith('asin_comp')]
+    
+    @pytest.mark.asyncio
+    async def test_remove_competitor_links_single_delete(self, service):
+        """Test that removing links issues one DELETE and reports its rowcount."""
+        main_asin = "B08TEST123"
+        
+        with patch('src.main.services.comparison.get_db_session') as mock_session:
+            mock_db = AsyncMock()
+            mock_session.return_value.__aenter__.return_value = mock_db
+            mock_db.execute = AsyncMock(return_value=MagicMock(rowcount=2))
+            
+            removed_count = await service.remove_competitor_links(
+                main_asin, RealTestData.ALTERNATIVE_TEST_ASINS[:3]
+            )
+            
+            assert removed_count == 2
+            mock_db.execute.assert_called_once()
+            sql = str(mock_db.execute.call_args.args[0])
+            assert sql.startswith("DELETE FROM core.competitor_links")
+            assert "asin_comp IN" in sql
+            mock_db.delete.assert_not_called()
+            mock_db.commit.assert_called_once()
     
     @pytest.mark.asyncio
     async def test_get_competitor_links_success(self, service):
@@ -138,23 +174,22 @@ class TestCompetitorComparisonService:
     
     @pytest.mark.asyncio
     async def test_get_competitor_links_cached(self, service):
-        """Test getting competitor ASINs (note: caching not implemented yet)."""
+        """Test getting competitor ASINs from cache without touching the database."""
         main_asin = "B08TEST123"
         expected_competitors = [RealTestData.ALTERNATIVE_TEST_ASINS[0], RealTestData.ALTERNATIVE_TEST_ASINS[1]]
         
-        # Mock database since get_competitor_links doesn't use caching yet
-        with patch('src.main.services.comparison.get_db_session') as mock_session:
-            mock_db = AsyncMock()
-            mock_session.return_value.__aenter__.return_value = mock_db
+        with patch('src.main.services.comparison.get_db_session') as mock_session, \
+             patch('src.main.services.comparison.cache') as mock_cache:
             
-            # Mock query result
-            mock_result = MagicMock()
-            mock_result.fetchall.return_value = [(comp,) for comp in expected_competitors]
-            mock_db.execute = AsyncMock(return_value=mock_result)
+            mock_cache.get = AsyncMock(return_value=expected_competitors)
+            mock_cache.set = AsyncMock(return_value=True)
             
             competitors = await service.get_competitor_links(main_asin)
             
             assert competitors == expected_competitors
+            mock_cache.get.assert_awaited_once_with(f"competitor_links:{main_asin}")
+            mock_session.assert_not_called()
+            mock_cache.set.assert_not_called()
     
     @pytest.mark.asyncio
     async def test_get_competitor_links_no_competitors(self, service):
@@ -165,6 +200,7 @@ class TestCompetitorComparisonService:
              patch('src.main.services.comparison.cache') as mock_cache:
             
             mock_cache.get = AsyncMock(return_value=None)
+            mock_cache.set = AsyncMock(return_value=True)
             
             mock_db = AsyncMock()
             mock_session.return_value.__aenter__.return_value = mock_db
@@ -200,30 +236,72 @@ class TestCompetitorComparisonService:
             mock_links_result.scalars.return_value.all.return_value = [mock_link1, mock_link2]
             
             # Mock metrics data
-            mock_main_metrics = MagicMock()
-            mock_main_metrics.price = 49.99
-            mock_main_metrics.rating = 4.5
-            mock_main_metrics.reviews_count = 100
-            
-            mock_comp_metrics = MagicMock()
-            mock_comp_metrics.price = 59.99
-            mock_comp_metrics.rating = 4.0
-            mock_comp_metrics.reviews_count = 80
+            mock_main_metrics = MagicMock(
+                asin="B08TEST123", price=49.99, bsr=None, rating=4.5,
+                reviews_count=100, buybox_price=None, created_at=None
+            )
+            mock_comp_metrics = MagicMock(
+                asin=RealTestData.ALTERNATIVE_TEST_ASINS[0], price=59.99, bsr=None, rating=4.0,
+                reviews_count=80, buybox_price=None, created_at=None
+            )
+            mock_metrics_result = MagicMock()
+            mock_metrics_result.scalars.return_value.all.return_value = [mock_main_metrics, mock_comp_metrics]
             
             mock_results = [
                 mock_links_result,  # Links query
-                MagicMock(scalar_one_or_none=MagicMock(return_value=mock_main_metrics)),  # Main metrics
-                MagicMock(scalar_one_or_none=MagicMock(return_value=mock_comp_metrics)),  # Comp metrics
-                MagicMock(scalar_one_or_none=MagicMock(return_value=mock_main_metrics)),  # Main metrics
-                MagicMock(scalar_one_or_none=MagicMock(return_value=mock_comp_metrics)),  # Comp metrics
+                mock_metrics_result,  # Metrics for every ASIN in one query
+                MagicMock(),  # Multi-row upsert
             ]
             mock_db.execute = AsyncMock(side_effect=mock_results)
             
             processed, failed = await service.calculate_daily_comparisons(target_date)
             
-            assert processed >= 1  # At least 1 competitor processed
-            assert failed >= 0    # Some may fail due to mocking complexity
-            assert processed + failed == 2  # Total should be 2
+            # Link 2 only has main metrics and is stored as partial data
+            assert processed == 2
+            assert failed == 0
+            assert mock_db.execute.call_count == 3
+    
+    @pytest.mark.asyncio
+    async def test_calculate_daily_comparisons_invalidates_competition_cache(self, service):
+        """Test that cached competition responses of each main product are cleared after the upsert."""
+        target_date = date.today()
+        
+        with patch('src.main.services.comparison.get_db_session') as mock_session, \
+             patch('src.main.services.comparison.cache') as mock_cache:
+            mock_db = AsyncMock()
+            mock_session.return_value.__aenter__.return_value = mock_db
+            mock_cache.delete_pattern = AsyncMock(return_value=1)
+            
+            mock_link = MagicMock(asin_main="B08TEST123", asin_comp="B09JVCL7JR")
+            mock_links_result = MagicMock()
+            mock_links_result.scalars.return_value.all.return_value = [mock_link]
+            
+            mock_metrics_result = MagicMock()
+            mock_metrics_result.scalars.return_value.all.return_value = [
+                MagicMock(asin="B08TEST123", price=49.99, bsr=None, rating=4.5,
+                          reviews_count=100, buybox_price=None, created_at=None)
+            ]
+            mock_db.execute = AsyncMock(side_effect=[mock_links_result, mock_metrics_result, MagicMock()])
+            
+            processed, _ = await service.calculate_daily_comparisons(target_date)
+            
+            assert processed == 1
+            patterns = [call.args[0] for call in mock_cache.delete_pattern.await_args_list]
+            assert patterns == ["competition:B08TEST123:*", "competition:latest:B08TEST123"]
+    
+    def test_build_comparison_row_diffs(self, service):
+        """Test that comparison rows hold main - competitor differences."""
+        main = MagicMock(price=49.99, bsr=100, rating=4.5, reviews_count=100, buybox_price=None, created_at=None)
+        comp = MagicMock(price=59.99, bsr=250, rating=4.0, reviews_count=80, buybox_price=55.0, created_at=None)
+        
+        row = service._build_comparison_row("B08TEST123", "B09JVCL7JR", main, comp, date.today())
+        
+        assert row['price_diff'] == pytest.approx(-10.0)
+        assert row['bsr_gap'] == -150
+        assert row['rating_diff'] == pytest.approx(0.5)
+        assert row['reviews_gap'] == 20
+        assert row['buybox_diff'] is None
+        assert service._build_comparison_row("B08TEST123", "B09JVCL7JR", None, None, date.today()) is None
     
     @pytest.mark.asyncio
     async def test_calculate_daily_comparisons_missing_metrics(self, service):
@@ -242,16 +320,19 @@ class TestCompetitorComparisonService:
             mock_links_result = MagicMock()
             mock_links_result.scalars.return_value.all.return_value = [mock_link1]
             
+            mock_metrics_result = MagicMock()
+            mock_metrics_result.scalars.return_value.all.return_value = []
+            
             mock_results = [
                 mock_links_result,  # Links query
-                MagicMock(scalar_one_or_none=MagicMock(return_value=None)),  # No main metrics
+                mock_metrics_result,  # No metrics for either side
             ]
             mock_db.execute = AsyncMock(side_effect=mock_results)
             
             processed, failed = await service.calculate_daily_comparisons(target_date)
             
             assert processed == 0
-            assert failed == 1  # Comparison failed due to missing main metrics
+            assert failed == 1  # Comparison failed due to missing metrics
     
     @pytest.mark.asyncio
     async def test_get_competition_data_success(self, service):
@@ -269,20 +350,21 @@ class TestCompetitorComparisonService:
             mock_session.return_value.__aenter__.return_value = mock_db
             
             # Mock comparison data
+            # Rows are already in their final shape (casts and to_char happen in SQL)
             mock_comparison = MagicMock()
-            mock_comparison.asin_main = main_asin
-            mock_comparison.asin_comp = RealTestData.ALTERNATIVE_TEST_ASINS[0]
-            mock_comparison.date = date.today()
-            mock_comparison.price_diff = -10.0
-            mock_comparison.rating_diff = 0.5
-            mock_comparison.bsr_gap = 100
-            mock_comparison.reviews_gap = 50
-            mock_comparison.buybox_diff = -5.0
-            mock_comparison.extras = {}
-            
-            mock_result = MagicMock()
-            mock_result.scalars.return_value.all.return_value = [mock_comparison]
-            mock_db.execute = AsyncMock(return_value=mock_result)
+            mock_comparison._mapping = {
+                'asin_main': main_asin,
+                'asin_comp': RealTestData.ALTERNATIVE_TEST_ASINS[0],
+                'date': date.today().isoformat(),
+                'price_diff': -10.0,
+                'bsr_gap': 100,
+                'rating_diff': 0.5,
+                'reviews_gap': 50,
+                'buybox_diff': -5.0,
+                'extras': {}
+            }
+            
+            mock_db.stream = AsyncMock(return_value=MockStreamResult([mock_comparison]))
             
             data = await service.get_competition_data(main_asin, days_back)
             
@@ -303,9 +385,7 @@ class TestCompetitorComparisonService:
             mock_session.return_value.__aenter__.return_value = mock_db
             
             # Mock empty query result (no comparison data)
-            mock_result = MagicMock()
-            mock_result.scalars.return_value.all.return_value = []
-            mock_db.execute = AsyncMock(return_value=mock_result)
+            mock_db.stream = AsyncMock(return_value=MockStreamResult([]))
             
             data = await service.get_competition_data(main_asin, days_back)
             
@@ -328,9 +408,7 @@ class TestCompetitorComparisonService:
             mock_session.return_value.__aenter__.return_value = mock_db
             
             # Mock empty result
-            mock_result = MagicMock()
-            mock_result.scalars.return_value.all.return_value = []
-            mock_db.execute = AsyncMock(return_value=mock_result)
+            mock_db.stream = AsyncMock(return_value=MockStreamResult([]))
             
             data = await service.get_competition_data(main_asin, days_back)
             
@@ -0,0 +1,125 @@
+"""Unit tests for time partition management."""
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from datetime import date
+
+from sqlalchemy.exc import ProgrammingError
+
+from src.main.database import ensure_time_partitions, ensure_payload_compression
+
+
+def _mock_conn(relkind: str, failing_ddl: str = None, default_has_rows: bool = False, failing_move: bool = False):
+    """
+    Connection whose catalog reports relkind for every table. DDL containing failing_ddl raises
+    until the DEFAULT partition is detached; failing_move makes moving rows out of it raise.
+    Executed SQL is recorded in conn.executed.
+    """
+    conn = MagicMock()
+    conn.begin_nested.return_value = AsyncMock()
+    conn.executed = []
+    detached = False
+
+    async def execute(statement, params=None):
+        nonlocal detached
+        sql = str(statement)
+        conn.executed.append(sql)
+        if "pg_class" in sql:
+            return MagicMock(scalar=MagicMock(return_value=relkind))
+        if "SELECT EXISTS" in sql:
+            return MagicMock(scalar=MagicMock(return_value=default_has_rows))
+        if "DETACH PARTITION" in sql:
+            detached = True
+        if failing_move and "WITH moved" in sql:
+            raise ProgrammingError(sql, None, Exception("could not extend file"))
+        if failing_ddl and failing_ddl in sql and not detached:
+            raise ProgrammingError(sql, None, Exception("would be violated by some row"))
+        return MagicMock(rowcount=3)
+
+    conn.execute = AsyncMock(side_effect=execute)
+    return conn
+
+
+class TestEnsureTimePartitions:
+    """Test ensure_time_partitions against partitioned and legacy tables."""
+
+    @pytest.mark.asyncio
+    async def test_skips_tables_that_are_not_partitioned(self):
+        """Test that plain heap tables left by create_all get no partition DDL."""
+        conn = _mock_conn(relkind="r")
+
+        statements = await ensure_time_partitions(conn, today=date(2025, 1, 15))
+
+        assert statements == []
+        assert not any("PARTITION OF" in sql for sql in conn.executed)
+
+    @pytest.mark.asyncio
+    async def test_rows_in_default_partition_are_moved_into_new_partition(self):
+        """Test that default rows in a new range are moved out so the range partition can be created."""
+        conn = _mock_conn(relkind="p", failing_ddl="product_metrics_daily_p2025_02", default_has_rows=True)
+
+        statements = await ensure_time_partitions(conn, today=date(2025, 1, 15))
+
+        assert any("product_metrics_daily_p2025_02" in statement for statement in statements)
+        move = conn.executed[conn.executed.index(
+            "ALTER TABLE core.product_metrics_daily DETACH PARTITION core.product_metrics_daily_default"
+        ):]
+        assert "core.product_metrics_daily_p2025_02 PARTITION OF" in move[1]
+        assert move[2].startswith("WITH moved AS (DELETE FROM core.product_metrics_daily_default")
+        assert "INSERT INTO core.product_metrics_daily SELECT * FROM moved" in move[2]
+        assert move[3] == (
+            "ALTER TABLE core.product_metrics_daily ATTACH PARTITION core.product_metrics_daily_default DEFAULT"
+        )
+        assert any("raw_events_default" in statement for statement in statements)
+
+    @pytest.mark.asyncio
+    async def test_failure_without_default_rows_is_skipped(self):
+        """Test that a partition failing for another reason is logged and does not abort the rest."""
+        conn = _mock_conn(relkind="p", failing_ddl="product_metrics_daily_p2025_02")
+
+        statements = await ensure_time_partitions(conn, today=date(2025, 1, 15))
+
+        assert not any("p2025_02" in statement for statement in statements)
+        assert not any("DETACH PARTITION" in sql for sql in conn.executed)
+        assert any("product_metrics_daily_p2025_01" in statement for statement in statements)
+        assert any("raw_events_default" in statement for statement in statements)
+
+    @pytest.mark.asyncio
+    async def test_failed_move_raises(self):
+        """Test that a failure while moving default rows surfaces as a clear error."""
+        conn = _mock_conn(
+            relkind="p", failing_ddl="product_metrics_daily_p2025_02", default_has_rows=True, failing_move=True
+        )
+
+        with pytest.raises(RuntimeError, match=r"product_metrics_daily_default rows in \[2025-02-01, 2025-03-01\)"):
+            await ensure_time_partitions(conn, today=date(2025, 1, 15))
+
+
+class TestEnsurePayloadCompression:
+    """Test that raw_events payload compression is only altered when it differs."""
+
+    @pytest.mark.asyncio
+    async def test_skips_alter_when_compression_matches(self):
+        """Test that no ACCESS EXCLUSIVE ALTER is issued when payload already uses lz4."""
+        conn = MagicMock()
+        conn.dialect.server_version_info = (16,)
+        conn.execute = AsyncMock(return_value=MagicMock(scalar=MagicMock(return_value="l")))
+
+        with patch('src.main.database.settings.raw_events_payload_compression', "lz4"):
+            statement = await ensure_payload_compression(conn)
+
+        assert statement is None
+        conn.execute.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_alters_when_compression_differs(self):
+        """Test that the ALTER is issued when payload still uses the server default."""
+        conn = MagicMock()
+        conn.dialect.server_version_info = (16,)
+        conn.execute = AsyncMock(return_value=MagicMock(scalar=MagicMock(return_value="")))
+
+        with patch('src.main.database.settings.raw_events_payload_compression', "lz4"):
+            statement = await ensure_payload_compression(conn)
+
+        assert statement == "ALTER TABLE staging_raw.raw_events ALTER COLUMN payload SET COMPRESSION lz4"
+        assert conn.execute.await_count == 2
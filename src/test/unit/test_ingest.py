@@ -67,6 +67,31 @@ class TestIngestionService:
             mock_db.execute.assert_called_once()
             mock_db.commit.assert_called_once()
     
+    @pytest.mark.asyncio
+    async def test_job_update_statements_compile_with_call_params(self, ingest_service):
+        """Test that start/complete UPDATE statements compile with the params the service binds."""
+        from sqlalchemy.dialects import postgresql
+        from src.main.services.ingest import _START_JOB_STMT, _COMPLETE_JOB_STMT
+
+        with patch('src.main.services.ingest.get_db_session') as mock_session:
+            mock_db = AsyncMock()
+            mock_session.return_value.__aenter__.return_value = mock_db
+            mock_db.execute.return_value = MagicMock(rowcount=1)
+
+            await ingest_service.start_job("test-job-123")
+            await ingest_service.complete_job("test-job-123", records_processed=1, cost=0.5)
+
+        (start_stmt, start_params), (complete_stmt, complete_params) = [
+            call.args for call in mock_db.execute.call_args_list
+        ]
+        assert start_stmt is _START_JOB_STMT
+        assert complete_stmt is _COMPLETE_JOB_STMT
+
+        # column_keys mirrors execution: bind names that shadow a column would raise CompileError
+        for stmt, params in ((start_stmt, start_params), (complete_stmt, complete_params)):
+            compiled = stmt.compile(dialect=postgresql.dialect(), column_keys=list(params))
+            assert set(params) <= set(compiled.params)
+
     @pytest.mark.asyncio
     async def test_complete_job_success(self, ingest_service):
         """Test completing a job successfully."""
@@ -107,9 +132,15 @@ class TestIngestionService:
             )
             
             assert success is True
-            # Verify the update call included error handling
-            call_args = mock_db.execute.call_args[0][0]
-            assert "error_message" in str(call_args)
+            # Verify the single UPDATE merges the error into meta
+            mock_db.execute.assert_called_once()
+            params = mock_db.execute.call_args[0][1]
+            assert params['new_status'] == 'FAILED'
+            assert params['meta_patch'] == {
+                'records_processed': 50,
+                'records_failed': 10,
+                'error_message': "Test error occurred"
+            }
     
     @pytest.mark.asyncio
     async def test_ingest_raw_event(self, ingest_service, sample_raw_event):
@@ -130,21 +161,63 @@ class TestIngestionService:
     @pytest.mark.asyncio
     async def test_ingest_raw_events_batch(self, ingest_service, sample_raw_event):
         """Test batch ingestion of raw events."""
-        events = [sample_raw_event, sample_raw_event]
+        events = [sample_raw_event.raw_data, sample_raw_event.raw_data]
+        
+        with patch('src.main.services.ingest.get_db_session') as mock_session:
+            mock_db = AsyncMock()
+            mock_session.return_value.__aenter__.return_value = mock_db
+            
+            # Ids reserved from the sequence before the COPY
+            mock_ids = MagicMock()
+            mock_ids.scalars.return_value.all.return_value = [101, 102]
+            mock_db.execute = AsyncMock(return_value=mock_ids)
+            
+            mock_raw = MagicMock()
+            mock_raw.driver_connection.copy_records_to_table = AsyncMock()
+            mock_connection = MagicMock()
+            mock_connection.get_raw_connection = AsyncMock(return_value=mock_raw)
+            mock_db.connection = AsyncMock(return_value=mock_connection)
+            
+            event_ids = await ingest_service.ingest_raw_events_batch("test_source", events, job_id="test-job-123")
+            
+            assert event_ids == [101, 102]
+            
+            # Verify batch database operations: one id query and one COPY carrying those ids
+            mock_db.execute.assert_called_once()
+            copy_call = mock_raw.driver_connection.copy_records_to_table
+            copy_call.assert_called_once()
+            assert copy_call.call_args.kwargs["columns"][0] == "id"
+            records = copy_call.call_args.kwargs["records"]
+            assert [record[0] for record in records] == [101, 102]
+            assert records[0][1] == "test-job-123"
+            mock_db.add.assert_not_called()
+            mock_db.commit.assert_called_once()
+    
+    @pytest.mark.asyncio
+    async def test_bulk_ingest_raw_events_uses_copy(self, ingest_service, sample_raw_event):
+        """Test bulk ingestion issues a single COPY with JSON-encoded payloads."""
+        events = [sample_raw_event.to_raw_event(), sample_raw_event.to_raw_event()]
         
         with patch('src.main.services.ingest.get_db_session') as mock_session:
             mock_db = AsyncMock()
             mock_session.return_value.__aenter__.return_value = mock_db
             
-            event_ids = await ingest_service.ingest_raw_events_batch(events)
+            mock_raw = MagicMock()
+            mock_raw.driver_connection.copy_records_to_table = AsyncMock()
+            mock_connection = MagicMock()
+            mock_connection.get_raw_connection = AsyncMock(return_value=mock_raw)
+            mock_db.connection = AsyncMock(return_value=mock_connection)
             
-            assert len(event_ids) == 2
-            # Verify all event IDs are valid UUIDs
-            for event_id in event_ids:
-                uuid.UUID(event_id)
+            count = await ingest_service.bulk_ingest_raw_events(events)
             
-            # Verify batch database operations
-            assert mock_db.add.call_count == 2
+            assert count == 2
+            copy_call = mock_raw.driver_connection.copy_records_to_table
+            copy_call.assert_called_once()
+            assert copy_call.call_args.kwargs["schema_name"] == "staging_raw"
+            records = copy_call.call_args.kwargs["records"]
+            assert records[0][1] == "test_source"
+            assert '"event_type":"product_update"' in records[0][5]
+            mock_db.add.assert_not_called()
             mock_db.commit.assert_called_once()
     
     @pytest.mark.asyncio
@@ -31,7 +31,14 @@ class TestBatchProductModels:
         """Test validation of invalid ASINs."""
         with pytest.raises(ValueError):
             BatchProductRequest(asins=["INVALID", RealTestData.ALTERNATIVE_TEST_ASINS[0]])
-    
+
+    def test_batch_product_request_rejects_non_ascii_asin(self):
+        """Test that only ASCII alphanumeric ASINs are accepted."""
+        with pytest.raises(ValueError):
+            BatchProductRequest(asins=["B0ÄJVCL7JR"])
+        with pytest.raises(ValueError):
+            BatchProductRequest(asins=["B09-VCL7JR"])
+
     def test_batch_product_request_too_many_asins(self):
         """Test limit on number of ASINs."""
         asins = [f"B{i:09d}" for i in range(51)]  # 51 ASINs
@@ -246,7 +253,7 @@ class TestCacheInvalidation:
     @pytest.mark.asyncio
     async def test_publish_invalidation(self, cache_service):
         """Test publishing cache invalidation events."""
-        with patch('src.main.services.cache.redis_pubsub_client') as mock_redis:
+        with patch('src.main.services.cache.redis_client') as mock_redis:
             mock_redis.publish = AsyncMock(return_value=1)
             
             result = await cache_service.publish_invalidation("product:*", "test_update")
@@ -260,15 +267,19 @@ class TestCacheInvalidation:
     @pytest.mark.asyncio 
     async def test_invalidate_product_cache(self, cache_service):
         """Test product-specific cache invalidation."""
-        with patch.object(cache_service, 'publish_invalidation') as mock_publish:
+        deleted_keys = [f"product:{RealTestData.PRIMARY_TEST_ASIN}:summary"]
+        with patch.object(cache_service, 'publish_invalidation') as mock_publish, \
+             patch.object(cache_service, '_unlink_index', AsyncMock(return_value=deleted_keys)) as mock_unlink:
             mock_publish.return_value = True
             
             result = await cache_service.invalidate_product_cache(RealTestData.PRIMARY_TEST_ASIN)
             
             assert result is True
+            mock_unlink.assert_awaited_once_with(f"idx:product:{RealTestData.PRIMARY_TEST_ASIN}")
             mock_publish.assert_called_once_with(
-                f"product:{RealTestData.PRIMARY_TEST_ASIN}:*", 
-                f"product_update:{RealTestData.PRIMARY_TEST_ASIN}"
+                f"idx:product:{RealTestData.PRIMARY_TEST_ASIN}", 
+                f"product_update:{RealTestData.PRIMARY_TEST_ASIN}",
+                keys=deleted_keys
             )
     
     @pytest.mark.asyncio
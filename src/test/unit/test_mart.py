@@ -0,0 +1,141 @@
+"""Unit tests for mart layer population service."""
+
+import pytest
+from unittest.mock import AsyncMock, patch
+from datetime import date
+
+from src.main.services.mart import MartService
+
+
+class TestMartService:
+    """Test MartService functionality."""
+
+    @pytest.fixture
+    def service(self):
+        return MartService()
+
+    @pytest.mark.asyncio
+    async def test_backfill_refreshes_view_once(self, service):
+        """Test that a backfill populates every day but refreshes the latest-row view only once."""
+        with patch.object(service, 'refresh_materialized_view', AsyncMock(return_value=True)) as mock_refresh, \
+             patch('src.main.services.mart.get_db_session', return_value=AsyncMock()), \
+             patch.object(service, 'populate_metrics_rollups', AsyncMock(return_value=3)), \
+             patch.object(service, 'populate_daily_deltas', AsyncMock(return_value=2)), \
+             patch.object(service, 'populate_competitor_comparisons', AsyncMock(return_value=1)):
+
+            results = await service.backfill_mart_data(date(2025, 1, 1), date(2025, 1, 3))
+
+        mock_refresh.assert_awaited_once()
+        assert results == {
+            'materialized_view_refreshed': 1,
+            'rollup_records': 9,
+            'delta_records': 6,
+            'comparison_records': 3,
+            'days_processed': 3,
+            'days_failed': 0
+        }
+
+    @pytest.mark.asyncio
+    async def test_backfill_counts_failed_days_and_still_refreshes_view(self, service):
+        """Test that one failing day is logged and counted without aborting the others or the refresh."""
+        async def populate_day(day, refresh_view=True):
+            if day == date(2025, 1, 2):
+                raise RuntimeError("deadlock detected")
+            return {'materialized_view_refreshed': 0, 'rollup_records': 1, 'delta_records': 1, 'comparison_records': 1}
+
+        with patch.object(service, 'populate_full_mart_layer', side_effect=populate_day), \
+             patch.object(service, 'refresh_materialized_view', AsyncMock(return_value=True)) as mock_refresh:
+
+            results = await service.backfill_mart_data(date(2025, 1, 1), date(2025, 1, 3))
+
+        mock_refresh.assert_awaited_once()
+        assert results['days_processed'] == 2
+        assert results['days_failed'] == 1
+        assert results['rollup_records'] == 2
+        assert results['materialized_view_refreshed'] == 1
+
+    @pytest.mark.asyncio
+    async def test_backfill_days_run_concurrently_within_limit(self, service):
+        """Test that backfill days overlap but never exceed the configured concurrency."""
+        import asyncio
+
+        running = 0
+        peak = 0
+
+        async def populate_day(day, refresh_view=True):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0)
+            running -= 1
+            return {'materialized_view_refreshed': 0, 'rollup_records': 1, 'delta_records': 1, 'comparison_records': 1}
+
+        with patch.object(service, 'populate_full_mart_layer', side_effect=populate_day), \
+             patch.object(service, 'refresh_materialized_view', AsyncMock(return_value=True)), \
+             patch('src.main.services.mart.settings.mart_backfill_concurrency', 2):
+
+            results = await service.backfill_mart_data(date(2025, 1, 1), date(2025, 1, 6))
+
+        assert peak == 2
+        assert results['days_processed'] == 6
+        assert results['rollup_records'] == 6
+
+    @pytest.mark.asyncio
+    async def test_full_mart_layer_uses_one_session_and_commit(self, service):
+        """Test that rollups, deltas and comparisons run on one session with a single commit."""
+        from unittest.mock import MagicMock
+
+        mock_session = AsyncMock()
+        mock_session.execute.return_value = MagicMock(rowcount=5)
+
+        mock_context = AsyncMock()
+        mock_context.__aenter__.return_value = mock_session
+
+        with patch('src.main.services.mart.get_db_session', return_value=mock_context) as mock_get_session, \
+             patch('src.main.services.mart.cache.delete_pattern', AsyncMock(return_value=0)) as mock_delete, \
+             patch.object(service, 'refresh_materialized_view', AsyncMock(return_value=True)):
+
+            results = await service.populate_full_mart_layer(date(2025, 1, 1))
+
+        mock_get_session.assert_called_once()
+        mock_delete.assert_awaited_once_with("competition:*")
+        assert mock_session.execute.await_count == 3
+        mock_session.commit.assert_awaited_once()
+        assert results == {
+            'materialized_view_refreshed': 1,
+            'rollup_records': 5,
+            'delta_records': 5,
+            'comparison_records': 5
+        }
+
+    @pytest.mark.asyncio
+    async def test_get_mart_stats_single_query(self, service):
+        """Test that mart stats are read with one statement."""
+        from unittest.mock import MagicMock
+
+        row = MagicMock(
+            rollup_counts={'7d': 10, '30d': 8},
+            delta_count=5,
+            comparison_count=3,
+            latest_rollup_date=date(2025, 1, 3),
+            latest_delta_date=date(2025, 1, 2),
+            latest_comparison_date=None
+        )
+        mock_session = AsyncMock()
+        mock_session.execute.return_value = MagicMock(one=MagicMock(return_value=row))
+
+        mock_context = AsyncMock()
+        mock_context.__aenter__.return_value = mock_session
+
+        with patch('src.main.services.mart.get_db_session', return_value=mock_context):
+            stats = await service.get_mart_stats()
+
+        mock_session.execute.assert_awaited_once()
+        assert stats == {
+            'rollup_counts': {'7d': 10, '30d': 8},
+            'delta_count': 5,
+            'comparison_count': 3,
+            'latest_rollup_date': date(2025, 1, 3),
+            'latest_delta_date': date(2025, 1, 2),
+            'latest_comparison_date': None
+        }
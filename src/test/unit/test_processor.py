@@ -71,6 +71,23 @@ class TestCoreMetricsProcessor:
                 assert mock_process.call_count == 2
                 mock_ingest.mark_events_processed.assert_called_once()
     
+    @pytest.mark.asyncio
+    async def test_process_product_events_invalidates_written_products(self, processor):
+        """Test that each written product's tagged cache entries are invalidated once after commit."""
+        with patch('src.main.services.processor.ingest_service') as mock_ingest, \
+             patch('src.main.services.processor.get_db_session') as mock_session, \
+             patch('src.main.services.processor.cache') as mock_cache:
+            mock_ingest.get_events_by_job = AsyncMock(return_value=[MagicMock(), MagicMock(), MagicMock()])
+            mock_session.return_value.__aenter__.return_value = AsyncMock()
+            mock_cache.invalidate_product_cache = AsyncMock(return_value=True)
+            
+            with patch.object(processor, '_process_single_event',
+                              AsyncMock(side_effect=["B0AAA", "B0AAA", ProcessingError("bad event")])):
+                processed, failed = await processor.process_product_events("job-123")
+            
+            assert (processed, failed) == (2, 1)
+            mock_cache.invalidate_product_cache.assert_awaited_once_with("B0AAA")
+    
     @pytest.mark.asyncio
     async def test_process_product_events_with_failures(self, processor):
         """Test processing with some failed events."""